@@ -17,3 +17,6 @@ DISABLED = False
 ADD_INSTALLED_APPS = [
     'apmec_horizon.openstack_dashboard.dashboards.mec',
 ]
+ADD_JS_FILES = [
+    'mec/js/mec.js',
+]
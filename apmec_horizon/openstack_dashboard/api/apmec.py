@@ -14,193 +14,689 @@
 
 from __future__ import absolute_import
 
+import collections
+import copy
+import functools
+import hashlib
+import itertools
+import json
+import threading
+import time
+import uuid
+
 from django.conf import settings
+from django.core.cache import cache
+from django import dispatch
+from django.utils import timezone
+from keystoneauth1 import session as ks_session
+from keystoneauth1 import token_endpoint
 from oslo_log import log as logging
 from apmecclient.v1_0 import client as apmec_client
 
-from horizon.utils.memoized import memoized  # noqa
+from horizon.utils import functions as utils
 from openstack_dashboard.api import base
 
+from apmec_horizon.openstack_dashboard.api import metrics
+from apmec_horizon.openstack_dashboard.api import trace
+
 
 LOG = logging.getLogger(__name__)
 
 
-@memoized
+class ClientPool(object):
+    """Process-wide LRU pool of apmec clients.
+
+    Clients are keyed on the token and the endpoints they talk to, so
+    consecutive page loads of the same user share one client and its
+    keep-alive HTTP session instead of opening new connections.
+    """
+
+    def __init__(self, max_size, max_ttl):
+        self.max_size = max_size
+        self.max_ttl = max_ttl
+        self._clients = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._clients.pop(key, None)
+            if entry is None:
+                return None
+            client, expires_at = entry
+            if expires_at <= time.time():
+                return None
+            # Re-insert to mark the entry as most recently used.
+            self._clients[key] = entry
+            return client
+
+    def put(self, key, client, ttl):
+        ttl = min(ttl, self.max_ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._clients.pop(key, None)
+            self._clients[key] = (client, time.time() + ttl)
+            while len(self._clients) > self.max_size:
+                self._clients.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+
+
+_client_pool = ClientPool(
+    getattr(settings, 'APMEC_CLIENT_POOL_SIZE', 64),
+    getattr(settings, 'APMEC_CLIENT_POOL_TTL', 3600))
+
+
+def _token_ttl(token):
+    expires = getattr(token, 'expires', None)
+    if expires is None:
+        return _client_pool.max_ttl
+    if timezone.is_naive(expires):
+        expires = timezone.make_aware(expires, timezone.utc)
+    return (expires - timezone.now()).total_seconds()
+
+
 def apmecclient(request):
     insecure = getattr(settings, 'OPENSTACK_SSL_NO_VERIFY', False)
     cacert = getattr(settings, 'OPENSTACK_SSL_CACERT', None)
-    c = apmec_client.Client(
-        token=request.user.token.id,
-        auth_url=base.url_for(request, 'identity'),
-        endpoint_url=base.url_for(request, 'mec-orchestration'),
-        insecure=insecure, ca_cert=cacert)
+    token = request.user.token
+    auth_url = base.url_for(request, 'identity')
+    endpoint_url = base.url_for(request, 'mec-orchestration')
+    key = (token.id, auth_url, endpoint_url, insecure, cacert)
+
+    c = _client_pool.get(key)
+    if c is None:
+        verify = False if insecure else (cacert or True)
+        session = ks_session.Session(
+            auth=token_endpoint.Token(endpoint_url, token.id),
+            verify=verify)
+        c = apmec_client.Client(session=session, auth_url=auth_url,
+                                endpoint_url=endpoint_url)
+        _client_pool.put(key, c, _token_ttl(token))
     return c
 
 
-def mea_list(request, **params):
-    LOG.debug("mea_list(): params=%s", params)
-    meas = apmecclient(request).list_meas(**params).get('meas')
-    return meas
-
-
-def mead_list(request, **params):
-    LOG.debug("mead_list(): params=%s", params)
-    meads = apmecclient(request).list_meads(**params).get('meads')
-    return meads
-
-
+def _list_cache_scopes(request, resource):
+    # Admins see resources of every tenant, so their listings are cached
+    # apart from those of regular members of the same project.
+    project_id = request.user.project_id
+    return dict((is_admin, 'apmec:%s:%s:%s' % (resource, project_id, is_admin))
+                for is_admin in (True, False))
+
+
+def _list_cache_generation(scope):
+    key = '%s:generation' % scope
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        generation = cache.get(key)
+    return generation
+
+
+def get_list_cache_generation(request, resource):
+    """Return a token changed by every write to a resource listing."""
+    return _list_cache_generation(_list_cache_scopes(request, resource)[
+        request.user.is_superuser])
+
+
+# Sent with the request and the resources written, so that listings kept
+# outside the Django cache can be invalidated too.
+lists_invalidated = dispatch.Signal()
+
+
+def invalidate_list_cache(request, *resources):
+    """Drop the cached listings of the given resources for this project."""
+    for resource in resources:
+        for scope in _list_cache_scopes(request, resource).values():
+            cache.set('%s:generation' % scope, uuid.uuid4().hex, None)
+    lists_invalidated.send(sender=None, request=request, resources=resources)
+
+
+def _cached_list(resource):
+    """Cache the result of a list call in the Django cache backend.
+
+    Entries are keyed on project and query params and live for
+    ``APMEC_LIST_CACHE_TTL[resource]`` seconds, e.g. ``{'meas': 5}``;
+    resources without a TTL are not cached. Writes through this module
+    invalidate the listings they affect, see invalidate_list_cache.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(request, **params):
+            ttl = getattr(settings, 'APMEC_LIST_CACHE_TTL', {}).get(resource)
+            if not ttl:
+                return func(request, **params)
+            scope = _list_cache_scopes(request, resource)[
+                request.user.is_superuser]
+            params_hash = hashlib.sha1(
+                json.dumps(params, sort_keys=True).encode('utf-8'))
+            key = '%s:%s:%s' % (scope, _list_cache_generation(scope),
+                                params_hash.hexdigest())
+            result = cache.get(key)
+            if result is None:
+                result = func(request, **params)
+                cache.set(key, result, ttl)
+            return result
+        return wrapper
+    return decorator
+
+
+class _Flight(object):
+    def __init__(self):
+        self.event = threading.Event()
+        self.waiters = 0
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """Coalesce concurrent identical calls into one upstream call.
+
+    The first caller for a key runs the call, callers arriving while it is
+    in flight wait for it and receive a copy of its result (or its
+    exception). ``stats`` counts calls and coalesced calls per name.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self.stats = collections.defaultdict(
+            lambda: {'calls': 0, 'coalesced': 0, 'shared_coalesced': 0})
+
+    def do(self, name, key, func):
+        with self._lock:
+            self.stats[name]['calls'] += 1
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                leader = True
+            else:
+                self.stats[name]['coalesced'] += 1
+                flight.waiters += 1
+                leader = False
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return copy.deepcopy(flight.result)
+
+        try:
+            result = func()
+        except Exception as e:
+            with self._lock:
+                del self._flights[key]
+            flight.error = e
+            flight.event.set()
+            raise
+        with self._lock:
+            del self._flights[key]
+        # No caller can join once the flight is unregistered; hand the
+        # waiters their own copy as the leader is free to mutate result.
+        if flight.waiters:
+            flight.result = copy.deepcopy(result)
+        flight.event.set()
+        return result
+
+    def do_shared(self, name, key, func):
+        """Coalesce ``func`` across worker processes through the cache.
+
+        The worker that takes the cache lock for ``key`` runs the call and
+        publishes its result, the others poll for it until
+        ``APMEC_SINGLE_FLIGHT_TIMEOUT`` expires and then call upstream
+        themselves.
+        """
+        timeout = getattr(settings, 'APMEC_SINGLE_FLIGHT_TIMEOUT', 10)
+        lock_key = 'apmec:flight:%s' % hashlib.sha1(
+            key.encode('utf-8')).hexdigest()
+        token = uuid.uuid4().hex
+        if cache.add(lock_key, token, timeout):
+            try:
+                result = func()
+                cache.set('%s:%s' % (lock_key, token), result, timeout)
+                return result
+            finally:
+                cache.delete(lock_key)
+
+        token = cache.get(lock_key)
+        deadline = time.time() + timeout
+        while token is not None and time.time() < deadline:
+            lock_released = cache.get(lock_key) != token
+            result = cache.get('%s:%s' % (lock_key, token), _MISSING)
+            if result is not _MISSING:
+                with self._lock:
+                    self.stats[name]['shared_coalesced'] += 1
+                return result
+            if lock_released:
+                break
+            time.sleep(0.05)
+        return func()
+
+
+_MISSING = object()
+_single_flight = SingleFlight()
+
+
+def get_single_flight_stats():
+    """Return the per-function call and coalesced call counters."""
+    with _single_flight._lock:
+        return dict((name, dict(counters)) for name, counters
+                    in _single_flight.stats.items())
+
+
+def _coalesced(func):
+    """Share one upstream call among concurrent identical reads.
+
+    Calls are identical when they come from the same project and admin
+    scope with the same arguments. Set APMEC_SINGLE_FLIGHT_SHARED to also
+    coalesce across worker processes through the Django cache.
+    """
+    @functools.wraps(func)
+    def wrapper(request, *args, **params):
+        key = json.dumps([func.__name__, request.user.project_id,
+                          request.user.is_superuser, args, params],
+                         sort_keys=True)
+        call = functools.partial(func, request, *args, **params)
+        if getattr(settings, 'APMEC_SINGLE_FLIGHT_SHARED', False):
+            call = functools.partial(_single_flight.do_shared,
+                                     func.__name__, key, call)
+        return _single_flight.do(func.__name__, key, call)
+    return wrapper
+
+
+def _endpoint(request):
+    try:
+        return base.url_for(request, 'mec-orchestration')
+    except Exception:
+        return 'unknown'
+
+
+def _count_items(result):
+    # Listings come back as a list, or as a page and a has-more flag.
+    if isinstance(result, tuple) and len(result) == 2:
+        result = result[0]
+    return len(result) if isinstance(result, list) else None
+
+
+def _record_call(request, name, call, args, params):
+    """Run ``call`` and record it as the API call ``name``.
+
+    Metrics are labelled with the function and the apmec endpoint and
+    exposed through metrics.registry; the call is also added to the
+    request trace, if any. A StopIteration, raised once a listing has
+    no page left, made no request and is not recorded.
+    """
+    labels = {'function': name, 'endpoint': _endpoint(request)}
+    start = time.time()
+
+    def observe(error=None):
+        duration = time.time() - start
+        metrics.registry.observe('apmec_api_call_duration_seconds',
+                                 labels, duration, metrics.LATENCY_BUCKETS)
+        trace.record(request, name, args, params, start, duration, error)
+
+    try:
+        result = call()
+    except StopIteration:
+        raise
+    except Exception as e:
+        error = type(e).__name__
+        metrics.registry.inc('apmec_api_call_errors_total',
+                             dict(labels, error=error))
+        observe(error)
+        raise
+    observe()
+    items = _count_items(result)
+    if items is not None:
+        metrics.registry.observe('apmec_api_call_items', labels, items,
+                                 metrics.SIZE_BUCKETS)
+    return result
+
+
+def _instrumented(func):
+    """Record the duration, listing size and errors of each API call.
+
+    Applied under the caching decorators, so only calls reaching the API
+    are measured.
+    """
+    @functools.wraps(func)
+    def wrapper(request, *args, **params):
+        return _record_call(request, func.__name__,
+                            lambda: func(request, *args, **params),
+                            args, params)
+    return wrapper
+
+
+def _list_resources(request, list_func, collection, marker=None,
+                    paginate=False, **params):
+    """Return a listing, or one page of it and whether more pages exist.
+
+    With ``paginate`` only the page following ``marker`` is requested,
+    using the user's page size as limit. The server may have pagination
+    disabled and ignore limit and marker, in which case the page is cut
+    out of the full listing here.
+    """
+    if not paginate:
+        return list_func(**params).get(collection)
+
+    page_size = utils.get_page_size(request)
+    params['limit'] = page_size + 1
+    if marker:
+        params['marker'] = marker
+    items = next(list_func(retrieve_all=False, **params)).get(collection)
+
+    # A server honouring the marker never returns the marker itself.
+    ids = [item['id'] for item in items]
+    if marker in ids:
+        items = items[ids.index(marker) + 1:]
+    return items[:page_size], len(items) > page_size
+
+
+def list_pages(request, collection, **params):
+    """Yield an apmec collection, such as 'meas' or 'events', page by page.
+
+    Pages of APMEC_EXPORT_PAGE_SIZE items are requested and the next
+    links of the API are followed lazily, so callers walking a large
+    collection only ever hold one page of it.
+    """
+    LOG.debug("list_pages(): collection=%s, params=%s", collection, params)
+    list_func = getattr(apmecclient(request), 'list_%s' % collection)
+    params['limit'] = getattr(settings, 'APMEC_EXPORT_PAGE_SIZE', 500)
+    pages = iter(list_func(retrieve_all=False, **params))
+    for index in itertools.count():
+        # Every page is a request of its own, so each one is recorded.
+        try:
+            items = _record_call(request, 'list_pages',
+                                 lambda: next(pages).get(collection),
+                                 (collection,), dict(params, page=index))
+        except StopIteration:
+            return
+        yield items
+
+
+@_cached_list('meas')
+@_coalesced
+@_instrumented
+def mea_list(request, marker=None, paginate=False, **params):
+    LOG.debug("mea_list(): marker=%s, paginate=%s, params=%s",
+              marker, paginate, params)
+    return _list_resources(request, apmecclient(request).list_meas,
+                           'meas', marker, paginate, **params)
+
+
+@_cached_list('meads')
+@_coalesced
+@_instrumented
+def mead_list(request, marker=None, paginate=False, **params):
+    LOG.debug("mead_list(): marker=%s, paginate=%s, params=%s",
+              marker, paginate, params)
+    return _list_resources(request, apmecclient(request).list_meads,
+                           'meads', marker, paginate, **params)
+
+
+@_instrumented
 def create_mead(request, tosca_body=None, **params):
     LOG.debug("create_mead(): params=%s", params)
     mead_instance = apmecclient(request).create_mead(body=tosca_body)
+    invalidate_list_cache(request, 'meads')
     return mead_instance
 
 
+@_instrumented
 def create_mea(request, mea_arg, **params):
     LOG.debug("create_mea(): mea_arg=%s", str(mea_arg))
     mea_instance = apmecclient(request).create_mea(body=mea_arg)
+    invalidate_list_cache(request, 'meas', 'meads')
     return mea_instance
 
 
+@_coalesced
+@_instrumented
 def get_mead(request, mead_id):
     LOG.debug("mead_get(): mead_id=%s", str(mead_id))
     mead = apmecclient(request).show_mead(mead_id)
     return mead
 
 
+@_coalesced
+@_instrumented
 def get_mea(request, mea_id):
     LOG.debug("mea_get(): mea_id=%s", str(mea_id))
     mea_instance = apmecclient(request).show_mea(mea_id)
     return mea_instance
 
 
+@_instrumented
 def delete_mea(request, mea_id):
     LOG.debug("delete_mea():mea_id=%s", str(mea_id))
     apmecclient(request).delete_mea(mea_id)
+    invalidate_list_cache(request, 'meas')
 
 
+@_instrumented
 def delete_mead(request, mead_id):
     LOG.debug("delete_mead():mead_id=%s", str(mead_id))
     apmecclient(request).delete_mead(mead_id)
+    invalidate_list_cache(request, 'meads')
 
 
+@_instrumented
 def create_vim(request, vim_arg):
     LOG.debug("create_vim(): vim_arg=%s", str(vim_arg))
     vim_instance = apmecclient(request).create_vim(body=vim_arg)
+    invalidate_list_cache(request, 'vims')
     return vim_instance
 
 
+@_coalesced
+@_instrumented
 def get_vim(request, vim_id):
     LOG.debug("vim_get(): vim_id=%s", str(vim_id))
     vim_instance = apmecclient(request).show_vim(vim_id)
     return vim_instance
 
 
+@_instrumented
 def delete_vim(request, vim_id):
     LOG.debug("delete_vim():vim_id=%s", str(vim_id))
     apmecclient(request).delete_vim(vim_id)
-
-
-def vim_list(request, **params):
-    LOG.debug("vim_list(): params=%s", params)
-    vims = apmecclient(request).list_vims(**params).get('vims')
-    return vims
-
-
-def events_list(request, resource_id):
-    params = {'resource_id': resource_id}
-    events = apmecclient(request).list_events(**params).get('events')
-    LOG.debug("events_list() params=%s events=%s l=%s", params, events,
-              len(events))
-    return events
-
-
+    invalidate_list_cache(request, 'vims')
+
+
+@_cached_list('vims')
+@_coalesced
+@_instrumented
+def vim_list(request, marker=None, paginate=False, **params):
+    LOG.debug("vim_list(): marker=%s, paginate=%s, params=%s",
+              marker, paginate, params)
+    return _list_resources(request, apmecclient(request).list_vims,
+                           'vims', marker, paginate, **params)
+
+
+def _event_id(event_id):
+    try:
+        return int(event_id)
+    except (TypeError, ValueError):
+        return None
+
+
+@_coalesced
+@_instrumented
+def events_list(request, resource_id, marker=None, paginate=False,
+                since=None):
+    """Return the events of a resource, newest first.
+
+    With ``paginate`` only the page of events older than the ``marker``
+    event is requested, and whether older events remain is returned too.
+    ``since`` limits the listing to the events newer than that event,
+    and takes precedence over ``paginate``. At most one more than a page
+    of them is requested; getting that many means the caller is better
+    off listing the newest page afresh.
+    Servers without sorting or pagination return every event, so the
+    listing is also ordered and cut here.
+    """
+    params = {'resource_id': resource_id, 'sort_key': 'id',
+              'sort_dir': 'desc'}
+    marker, since = _event_id(marker), _event_id(since)
+    if since is not None:
+        # Newer events follow the marker in ascending order.
+        params.update(sort_dir='asc', marker=since,
+                      limit=utils.get_page_size(request) + 1)
+        events = next(apmecclient(request).list_events(
+            retrieve_all=False, **params)).get('events')
+    elif paginate:
+        page_size = utils.get_page_size(request)
+        params['limit'] = page_size + 1
+        if marker is not None:
+            params['marker'] = marker
+        events = next(apmecclient(request).list_events(
+            retrieve_all=False, **params)).get('events')
+    else:
+        events = apmecclient(request).list_events(**params).get('events')
+    LOG.debug("events_list(): params=%s, events=%d", params, len(events))
+
+    events.sort(key=lambda event: _event_id(event['id']) or 0,
+                reverse=True)
+    if since is not None:
+        return [event for event in events
+                if _event_id(event['id']) > since]
+    if not paginate:
+        return events
+    if marker is not None:
+        events = [event for event in events
+                  if _event_id(event['id']) < marker]
+    return events[:page_size], len(events) > page_size
+
+
+@_instrumented
 def create_mesd(request, tosca_body=None, **params):
     LOG.debug("create_mesd(): params=%s", params)
     mesd_instance = apmecclient(request).create_mesd(body=tosca_body)
+    invalidate_list_cache(request, 'mesds')
     return mesd_instance
 
 
-def mesd_list(request, **params):
-    LOG.debug("mesd_list(): params=%s", params)
-    mesds = apmecclient(request).list_mesds(**params).get('mesds')
-    return mesds
+@_cached_list('mesds')
+@_coalesced
+@_instrumented
+def mesd_list(request, marker=None, paginate=False, **params):
+    LOG.debug("mesd_list(): marker=%s, paginate=%s, params=%s",
+              marker, paginate, params)
+    return _list_resources(request, apmecclient(request).list_mesds,
+                           'mesds', marker, paginate, **params)
 
 
+@_coalesced
+@_instrumented
 def get_mesd(request, mesd_id):
     LOG.debug("mesd_get(): mesd_id=%s", str(mesd_id))
     mesd = apmecclient(request).show_mesd(mesd_id)
     return mesd
 
 
+@_instrumented
 def delete_mesd(request, mesd_id):
     LOG.debug("delete_mesd():mesd_id=%s", str(mesd_id))
     apmecclient(request).delete_mesd(mesd_id)
+    invalidate_list_cache(request, 'mesds')
 
 
+@_coalesced
+@_instrumented
 def get_mes(request, mes_id):
     LOG.debug("mes_get(): mes_id=%s", str(mes_id))
     mes_instance = apmecclient(request).show_mes(mes_id)
     return mes_instance
 
 
+@_instrumented
 def delete_mes(request, mes_id):
     LOG.debug("delete_mes():mes_id=%s", str(mes_id))
     apmecclient(request).delete_mes(mes_id)
+    invalidate_list_cache(request, 'mess', 'meas')
 
 
-def mes_list(request, **params):
-    LOG.debug("mes_list(): params=%s", params)
-    mess = apmecclient(request).list_mess(**params).get('mess')
-    return mess
+@_cached_list('mess')
+@_coalesced
+@_instrumented
+def mes_list(request, marker=None, paginate=False, **params):
+    LOG.debug("mes_list(): marker=%s, paginate=%s, params=%s",
+              marker, paginate, params)
+    return _list_resources(request, apmecclient(request).list_mess,
+                           'mess', marker, paginate, **params)
 
 
+@_instrumented
 def create_mes(request, mes_arg, **params):
     LOG.debug("create_mes(): mes_arg=%s", str(mes_arg))
     mes_instance = apmecclient(request).create_mes(body=mes_arg)
+    invalidate_list_cache(request, 'mess', 'meas')
     return mes_instance
 
 
+@_instrumented
 def create_mecad(request, tosca_body=None, **params):
     LOG.debug("create_mecad(): params=%s", params)
     mecad_instance = apmecclient(request).create_mecad(body=tosca_body)
+    invalidate_list_cache(request, 'mecads')
     return mecad_instance
 
 
-def mecad_list(request, **params):
-    LOG.debug("mecad_list(): params=%s", params)
-    mecads = apmecclient(request).list_mecads(**params).get('mecads')
-    return mecads
+@_cached_list('mecads')
+@_coalesced
+@_instrumented
+def mecad_list(request, marker=None, paginate=False, **params):
+    LOG.debug("mecad_list(): marker=%s, paginate=%s, params=%s",
+              marker, paginate, params)
+    return _list_resources(request, apmecclient(request).list_mecads,
+                           'mecads', marker, paginate, **params)
 
 
+@_coalesced
+@_instrumented
 def get_mecad(request, mecad_id):
     LOG.debug("mecad_get(): mecad_id=%s", str(mecad_id))
     mecad = apmecclient(request).show_mecad(mecad_id)
     return mecad
 
 
+@_instrumented
 def delete_mecad(request, mecad_id):
     LOG.debug("delete_mecad():mecad_id=%s", str(mecad_id))
     apmecclient(request).delete_mecad(mecad_id)
+    invalidate_list_cache(request, 'mecads')
 
 
+@_coalesced
+@_instrumented
 def get_meca(request, meca_id):
     LOG.debug("meca_get(): meca_id=%s", str(meca_id))
     meca_instance = apmecclient(request).show_meca(meca_id)
     return meca_instance
 
 
+@_instrumented
 def delete_meca(request, meca_id):
     LOG.debug("delete_meca():meca_id=%s", str(meca_id))
     apmecclient(request).delete_meca(meca_id)
+    invalidate_list_cache(request, 'mecas', 'mess', 'meas')
 
 
-def meca_list(request, **params):
-    LOG.debug("meca_list(): params=%s", params)
-    mecas = apmecclient(request).list_mecas(**params).get('mecas')
-    return mecas
+@_cached_list('mecas')
+@_coalesced
+@_instrumented
+def meca_list(request, marker=None, paginate=False, **params):
+    LOG.debug("meca_list(): marker=%s, paginate=%s, params=%s",
+              marker, paginate, params)
+    return _list_resources(request, apmecclient(request).list_mecas,
+                           'mecas', marker, paginate, **params)
 
 
+@_instrumented
 def create_meca(request, meca_arg, **params):
     LOG.debug("create_meca(): meca_arg=%s", str(meca_arg))
     meca_instance = apmecclient(request).create_meca(body=meca_arg)
+    invalidate_list_cache(request, 'mecas', 'mess', 'meas')
     return meca_instance
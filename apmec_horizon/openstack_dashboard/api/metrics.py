@@ -0,0 +1,138 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""In-process metrics of the apmec API calls, in Prometheus text format.
+
+Metrics are kept per web server process. Each process serving the
+dashboard reports its own, as Prometheus client libraries do for
+multi-process servers without a shared directory.
+"""
+
+import bisect
+import threading
+
+# Upper bounds of the histogram buckets, besides +Inf.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+                   5.0, 10.0, 30.0)
+SIZE_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000)
+
+
+class Histogram(object):
+    __slots__ = ('bounds', 'counts', 'total', 'count')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class Registry(object):
+    """Counters and histograms, each keyed by name and label values."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help = {}
+        self._histograms = {}
+        self._counters = {}
+
+    def describe(self, name, kind, text):
+        self._help[name] = (kind, text)
+
+    def observe(self, name, labels, value, bounds):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(bounds)
+            histogram.observe(value)
+
+    def inc(self, name, labels, value=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def render(self, gauges=()):
+        """Return every metric in the Prometheus text exposition format.
+
+        ``gauges`` adds ``(name, help, value)`` samples computed by the
+        caller, such as cache statistics.
+        """
+        with self._lock:
+            histograms = [(key, (list(h.counts), h.total, h.count, h.bounds))
+                          for key, h in self._histograms.items()]
+            counters = list(self._counters.items())
+
+        lines = []
+        described = set()
+
+        def header(name):
+            if name not in described and name in self._help:
+                kind, text = self._help[name]
+                lines.append('# HELP %s %s' % (name, text))
+                lines.append('# TYPE %s %s' % (name, kind))
+            described.add(name)
+
+        for (name, labels), (counts, total, count, bounds) in sorted(
+                histograms):
+            header(name)
+            cumulative = 0
+            for bound, bucket_count in zip(bounds + ('+Inf',), counts):
+                cumulative += bucket_count
+                lines.append('%s_bucket%s %d' % (
+                    name, _labels(labels + (('le', _number(bound)),)),
+                    cumulative))
+            lines.append('%s_sum%s %s' % (name, _labels(labels),
+                                          _number(total)))
+            lines.append('%s_count%s %d' % (name, _labels(labels), count))
+        for (name, labels), value in sorted(counters):
+            header(name)
+            lines.append('%s%s %s' % (name, _labels(labels), _number(value)))
+        for name, text, value in gauges:
+            lines.append('# HELP %s %s' % (name, text))
+            lines.append('# TYPE %s gauge' % name)
+            lines.append('%s %s' % (name, _number(value)))
+        return '\n'.join(lines) + '\n'
+
+
+def _number(value):
+    if isinstance(value, float):
+        return repr(value)
+    return '%s' % value
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{%s}' % ','.join(
+        '%s="%s"' % (name, ('%s' % value).replace('\\', '\\\\')
+                     .replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels)
+
+
+registry = Registry()
+registry.describe('apmec_api_call_duration_seconds', 'histogram',
+                  'Time taken by apmec API calls.')
+registry.describe('apmec_api_call_items', 'histogram',
+                  'Items returned by apmec API listings.')
+registry.describe('apmec_api_call_errors_total', 'counter',
+                  'apmec API calls that raised, by exception class.')
@@ -0,0 +1,163 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+
+"""Per-request trace of the apmec API calls.
+
+ApiTraceMiddleware attaches a Trace to each request, and the API layer
+records into it every upstream call made while serving that request.
+"""
+
+import collections
+import hashlib
+import json
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+import six
+
+ATTRIBUTE = 'apmec_trace'
+
+# Keyword arguments whose values are shown in traces, besides ids. Other
+# values, such as request bodies, only show as "...".
+_SHOWN_PARAMS = ('marker', 'since', 'paginate', 'limit', 'sort_key',
+                 'sort_dir')
+_ID_RE = re.compile(r'^[\w.:-]{1,64}$')
+
+
+class Trace(object):
+    """The upstream calls made while serving one request.
+
+    Tabs are fetched from executor threads, so calls may be recorded
+    concurrently.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.started = time.time()
+        self.calls = []
+        self._lock = threading.Lock()
+        self._seen = collections.defaultdict(int)
+        self._names = {}
+
+    def record(self, function, call, digest, start, duration, error=None):
+        """Add a call, identified by the digest of its arguments."""
+        with self._lock:
+            self._seen[digest] += 1
+            self._names[digest] = call
+            self.calls.append({
+                'function': function,
+                'call': call,
+                'offset': start - self.started,
+                'duration': duration,
+                'error': error,
+                'repeated': self._seen[digest] > 1,
+            })
+
+    def repeated_calls(self):
+        """Return the calls made more than once, with their count."""
+        with self._lock:
+            return dict((self._names[digest], count) for digest, count
+                        in self._seen.items() if count > 1)
+
+    def server_timing(self):
+        """Return a Server-Timing header value, with a metric per function.
+
+        Calls are summed per function to keep the header short; the
+        calls themselves are in the debug panel.
+        """
+        totals = collections.OrderedDict()
+        with self._lock:
+            calls = list(self.calls)
+        for call in calls:
+            count, repeated, duration = totals.get(call['function'],
+                                                   (0, 0, 0.0))
+            totals[call['function']] = (count + 1,
+                                        repeated + call['repeated'],
+                                        duration + call['duration'])
+        entries = ['apmec;dur=%.1f;desc="%d calls, %d repeated"' % (
+            sum(call['duration'] for call in calls) * 1000, len(calls),
+            sum(call['repeated'] for call in calls))]
+        for function, (count, repeated, duration) in totals.items():
+            desc = '%d calls' % count
+            if repeated:
+                desc += ', %d repeated' % repeated
+            entries.append('apmec-%s;dur=%.1f;desc="%s"' % (
+                function, duration * 1000, desc))
+        return ', '.join(entries)
+
+    def as_dict(self):
+        with self._lock:
+            return {'path': self.path,
+                    'started': self.started,
+                    'calls': [dict(call) for call in self.calls]}
+
+
+def _shown(value):
+    if value is None or isinstance(value, (bool,) + six.integer_types):
+        return '%r' % (value,)
+    if isinstance(value, six.string_types) and _ID_RE.match(value):
+        return "'%s'" % value
+    return '...'
+
+
+def _describe(function, args, params):
+    """Return the call with its ids, leaving out bodies and credentials."""
+    values = [_shown(arg) for arg in args]
+    values.extend('%s=%s' % (name, _shown(value)
+                             if name in _SHOWN_PARAMS or name.endswith('_id')
+                             else '...')
+                  for name, value in sorted(params.items()))
+    return '%s(%s)' % (function, ', '.join(values))
+
+
+def _digest(function, args, params):
+    # Identical calls have the same digest; the arguments are not kept.
+    payload = json.dumps([function, args, params], sort_keys=True,
+                         default=repr)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def record(request, function, args, params, start, duration, error=None):
+    """Record an API call into the trace of ``request``, if it has one."""
+    request_trace = getattr(request, ATTRIBUTE, None)
+    if request_trace is not None:
+        request_trace.record(function, _describe(function, args, params),
+                             _digest(function, args, params), start,
+                             duration, error)
+
+
+def _history_key(request):
+    session_key = getattr(getattr(request, 'session', None),
+                          'session_key', None)
+    if session_key:
+        return 'apmec:traces:%s' % session_key
+
+
+def save(request, request_trace):
+    """Keep the trace among the latest ones of the user's session."""
+    key = _history_key(request)
+    if key is None:
+        return
+    size = getattr(settings, 'APMEC_TRACE_HISTORY', 20)
+    traces = cache.get(key, [])[-(size - 1):] if size > 1 else []
+    traces.append(request_trace.as_dict())
+    cache.set(key, traces, getattr(settings, 'APMEC_TRACE_TTL', 3600))
+
+
+def get_history(request):
+    """Return the latest traces of the user's session, oldest first."""
+    key = _history_key(request)
+    return cache.get(key, []) if key else []
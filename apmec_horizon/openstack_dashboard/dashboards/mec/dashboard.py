@@ -27,7 +27,7 @@ class Memgroup(horizon.PanelGroup):
 class Meogroup(horizon.PanelGroup):
     slug = "meogroup"
     name = _("MEC Orchestration")
-    panels = ('vim',)
+    panels = ('vim', 'events',)
 
 
 class Mesogroup(horizon.PanelGroup):
@@ -0,0 +1,52 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+
+from django.utils.translation import ugettext_lazy as _
+
+from horizon import tables
+
+from apmec_horizon.openstack_dashboard.dashboards.mec import utils
+
+
+class TimelineFilterAction(utils.ServerFilterAction):
+    filter_choices = (('event_type', _("Event Type ="), True),
+                      ('resource_type', _("Resource Type ="), True),
+                      ('resource_id', _("Resource Id ="), True),
+                      ('since', _("Since (UTC) ="), True),
+                      ('until', _("Until (UTC) ="), True))
+
+
+class TimelineItem(utils.BaseItem):
+    __slots__ = ('id', 'timestamp', 'resource_type', 'resource_id',
+                 'resource_state', 'event_type', 'event_details')
+
+    def __init__(self, event):
+        for name in self.__slots__:
+            setattr(self, name, event[name])
+
+
+class TimelineTable(tables.DataTable):
+    timestamp = tables.Column('timestamp', verbose_name=_("Timestamp"))
+    resource_type = tables.Column('resource_type',
+                                  verbose_name=_("Resource Type"))
+    resource_id = tables.Column('resource_id', verbose_name=_("Resource Id"))
+    resource_state = tables.Column('resource_state',
+                                   verbose_name=_("Resource State"))
+    event_type = tables.Column('event_type', verbose_name=_("Event Type"))
+    event_details = tables.Column('event_details',
+                                  verbose_name=_("Event Details"))
+
+    class Meta(object):
+        name = "timeline"
+        verbose_name = _("Events")
+        table_actions = (TimelineFilterAction,)
@@ -0,0 +1,151 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import os
+import shutil
+import sqlite3
+import stat
+import tempfile
+
+from django.core.cache import cache
+import mock
+
+from openstack_dashboard.test import helpers as test
+
+from apmec_horizon.openstack_dashboard import api
+from apmec_horizon.openstack_dashboard.dashboards.mec import store
+from apmec_horizon.openstack_dashboard.dashboards.mec import utils
+
+
+def _event(event_id, event_type, day):
+    return {'id': event_id, 'resource_id': 'mea-%d' % (event_id % 2),
+            'resource_type': 'mea', 'resource_state': 'ACTIVE',
+            'event_type': event_type,
+            'timestamp': '2018-01-%02d 00:00:00' % day,
+            'event_details': {'seq': event_id}}
+
+
+class EventStoreTests(test.TestCase):
+    def setUp(self):
+        super(EventStoreTests, self).setUp()
+        self.store = store.EventStore(':memory:')
+        self.feed = [_event(1, 'CREATE', 1), _event(2, 'MONITOR', 2),
+                     _event(3, 'MONITOR', 2), _event(4, 'DELETE', 3)]
+
+    @mock.patch.object(api.apmec, 'list_pages')
+    def test_sync_resumes_from_newest_event(self, list_pages):
+        list_pages.return_value = iter([self.feed[:2], self.feed[2:]])
+        self.assertTrue(store.sync_events(self.request, self.store))
+        # A server ignoring the marker sends events already stored.
+        list_pages.return_value = iter([self.feed])
+        self.assertTrue(store.sync_events(self.request, self.store))
+        list_pages.assert_called_with(self.request, 'events', sort_key='id',
+                                      sort_dir='asc', marker=4)
+        self.assertEqual(4, len(self.store.query(
+            utils.get_scope(self.request))))
+
+    def test_query_filters_and_pages_newest_first(self):
+        scope = utils.get_scope(self.request)
+        self.store.add(scope, self.feed)
+        self.store.add('other-project', [_event(5, 'MONITOR', 4)])
+        events = self.store.query(scope, limit=2)
+        self.assertEqual([4, 3], [event['id'] for event in events])
+        events = self.store.query(scope, marker=3)
+        self.assertEqual([2, 1], [event['id'] for event in events])
+        events = self.store.query(scope, event_type='MONITOR',
+                                  since='2018-01-02', until='2018-01-03')
+        self.assertEqual([3, 2], [event['id'] for event in events])
+        self.assertEqual('{"seq": 3}', events[0]['event_details'])
+
+    def test_store_file_is_private(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'events.sqlite3')
+        store.EventStore(path).add('scope', self.feed)
+        self.assertEqual(0o600, stat.S_IMODE(os.stat(path).st_mode))
+
+    def test_unscoped_store_is_rebuilt(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'events.sqlite3')
+        connection = sqlite3.connect(path)
+        connection.execute('CREATE TABLE events (project_id TEXT, id INT)')
+        connection.commit()
+        connection.close()
+        event_store = store.EventStore(path)
+        event_store.add('scope', self.feed)
+        self.assertEqual(4, event_store.last_id('scope'))
+
+
+class ResourceMirrorTests(test.TestCase):
+    def setUp(self):
+        super(ResourceMirrorTests, self).setUp()
+        self.mirror = store.ResourceMirror(':memory:')
+        self.events = store.EventStore(':memory:')
+        self.meas = {'a': {'id': 'a', 'name': 'one', 'status': 'ACTIVE'},
+                     'b': {'id': 'b', 'name': 'two', 'status': 'ERROR'}}
+        self.feed = []
+
+        def list_pages(request, collection, **params):
+            if collection == 'events':
+                return iter([self.feed])
+            return iter([list(self.meas.values())])
+
+        def get_mea(request, mea_id):
+            if mea_id not in self.meas:
+                raise store.NotFound()
+            return {'mea': self.meas[mea_id]}
+
+        for name, func in (('list_pages', list_pages), ('get_mea', get_mea)):
+            patcher = mock.patch.object(api.apmec, name, side_effect=func)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _reconcile(self):
+        store.reconcile(self.request, 'meas', self.mirror, self.events)
+        return self.mirror.list(utils.get_scope(self.request), 'meas')
+
+    def test_reconcile_applies_changed_resources(self):
+        self.assertEqual(['a', 'b'], [mea['id'] for mea in self._reconcile()])
+        self.meas['a'] = dict(self.meas['a'], status='ERROR')
+        del self.meas['b']
+        self.feed = [{'id': 1, 'resource_id': 'a', 'resource_type': 'mea'},
+                     {'id': 2, 'resource_id': 'b', 'resource_type': 'mea'}]
+        self.assertEqual([{'id': 'a', 'name': 'one', 'status': 'ERROR'}],
+                         self._reconcile())
+        self.assertEqual(1, api.apmec.list_pages.call_args_list.count(
+            mock.call(self.request, 'meas')))
+
+    def test_list_filters_like_the_api(self):
+        scope = utils.get_scope(self.request)
+        self.mirror.replace(scope, 'meas', list(self.meas.values()), None)
+        self.assertEqual(['b'], [mea['id'] for mea in self.mirror.list(
+            scope, 'meas', status='ERROR')])
+        self.assertEqual(['b'], [mea['id'] for mea in self.mirror.list(
+            scope, 'meas', marker='a', limit=1)])
+
+    @mock.patch.object(utils, 'run_in_background')
+    def test_mirror_bypassed_after_dashboard_write(self, run_in_background):
+        self._reconcile()
+        with self.settings(APMEC_MIRROR_ENABLED=True), \
+                mock.patch.object(store, 'get_mirror',
+                                  return_value=self.mirror):
+            items, has_more = store.mirror_list(self.request, 'meas')
+            self.assertEqual(['a', 'b'], [mea['id'] for mea in items])
+            # Other processes have their own Django cache.
+            cache.clear()
+            self.assertIsNotNone(store.mirror_list(self.request, 'meas'))
+            api.apmec.invalidate_list_cache(self.request, 'meas')
+            cache.clear()
+            self.assertIsNone(store.mirror_list(self.request, 'meas'))
+            self._reconcile()
+            self.assertIsNotNone(store.mirror_list(self.request, 'meas'))
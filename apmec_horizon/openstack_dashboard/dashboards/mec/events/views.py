@@ -0,0 +1,57 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+
+from django.utils.translation import ugettext_lazy as _
+
+from horizon import exceptions
+from horizon import messages
+from horizon import tables
+from horizon.utils import functions
+
+from apmec_horizon.openstack_dashboard.dashboards.mec.events \
+    import tables as events_tables
+from apmec_horizon.openstack_dashboard.dashboards.mec import store
+from apmec_horizon.openstack_dashboard.dashboards.mec import utils
+
+
+class IndexView(tables.DataTableView):
+    table_class = events_tables.TimelineTable
+    template_name = 'mec/events/index.html'
+    page_title = _("Events")
+
+    def has_more_data(self, table):
+        return self._has_more
+
+    def get_data(self):
+        self._has_more = False
+        event_store = store.get_event_store()
+        try:
+            if not store.sync_events(self.request, event_store):
+                messages.info(self.request,
+                              _("Older events are still being copied; "
+                                "the timeline may be incomplete."))
+        except Exception:
+            exceptions.handle(self.request,
+                              _('Unable to get new events, showing the '
+                                'events copied so far.'))
+
+        table = self.get_table()
+        filters = utils.get_filters(self.request, table)[0]
+        page_size = functions.get_page_size(self.request)
+        marker = self.request.GET.get(table._meta.pagination_param)
+        events = event_store.query(utils.get_scope(self.request),
+                                   marker=marker, limit=page_size + 1,
+                                   **filters)
+        self._has_more = len(events) > page_size
+        return [events_tables.TimelineItem(event)
+                for event in events[:page_size]]
@@ -11,15 +11,27 @@
 # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 # License for the specific language governing permissions and limitations
 # under the License.
+import functools
+import os
 
+import six
+import yaml
+
+from django.conf import settings
 from django.forms import ValidationError
 from django.utils.translation import ugettext_lazy as _
+from oslo_log import log as logging
 
 from horizon import exceptions
 from horizon import forms
 from horizon import messages
 
 from apmec_horizon.openstack_dashboard import api
+from apmec_horizon.openstack_dashboard.dashboards.mec import tosca as \
+    tosca_checks
+from apmec_horizon.openstack_dashboard.dashboards.mec import utils
+
+LOG = logging.getLogger(__name__)
 
 
 class OnBoardMEA(forms.SelfHandlingForm):
@@ -76,11 +88,18 @@ class OnBoardMEA(forms.SelfHandlingForm):
 
         try:
             if toscal_file:
-                toscal_str = self.files['toscal_file'].read()
+                if toscal_file.name.endswith('.csar'):
+                    toscal_str = utils.read_csar_definitions(toscal_file)
+                else:
+                    toscal_str = utils.read_upload(toscal_file)
             else:
                 toscal_str = data['direct_input']
-            # toscal = yaml.loads(toscal_str)
+            errors = tosca_checks.validate(toscal_str)
+            if errors:
+                raise ValidationError(errors)
             data['tosca'] = toscal_str
+        except ValidationError:
+            raise
         except Exception as e:
             msg = _('There was a problem loading the namespace: %s.') % e
             raise forms.ValidationError(msg)
@@ -105,3 +124,126 @@ class OnBoardMEA(forms.SelfHandlingForm):
             msg %= e.message.split('Failed validating', 1)[0]
             exceptions.handle(request, message=msg)
             return False
+
+
+TEMPLATE_EXTENSIONS = ('.yaml', '.yml')
+
+
+def _iter_templates(uploaded_file):
+    """Yield (path, size, opener) for each TOSCA template of an upload.
+
+    Zip archives are walked through their central directory and every
+    entry is only read once its opener is called, so the archive is
+    never extracted as a whole.
+    """
+    if uploaded_file.name.endswith('.zip'):
+        with utils.open_zip(uploaded_file) as archive:
+            for info in archive.infolist():
+                name = os.path.basename(info.filename)
+                if name.startswith('.') or \
+                        not name.endswith(TEMPLATE_EXTENSIONS):
+                    continue
+                yield (info.filename, info.file_size,
+                       functools.partial(archive.read, info))
+    elif uploaded_file.name.endswith(TEMPLATE_EXTENSIONS):
+        yield uploaded_file.name, uploaded_file.size, uploaded_file.read
+
+
+def _load_template(path, size, opener):
+    # Returns the MEAD name, description and TOSCA text of a template.
+    utils.check_upload_size(path, size,
+                            getattr(settings, 'APMEC_MEAD_MAX_TEMPLATE_SIZE',
+                                    1048576))
+    tosca = opener()
+    if isinstance(tosca, six.binary_type):
+        tosca = tosca.decode('utf-8')
+    errors = tosca_checks.validate(tosca)
+    if errors:
+        raise ValidationError(errors)
+    template = utils.load_yaml(tosca)
+    metadata = template.get('metadata') or {}
+    name = metadata.get('template_name') or \
+        os.path.splitext(os.path.basename(path))[0]
+    return name, template.get('description') or '', tosca
+
+
+class OnBoardMEABatch(forms.SelfHandlingForm):
+    templates = forms.FileField(
+        label=_("TOSCA Templates"),
+        help_text=_("A zip archive of TOSCA templates, or several "
+                    "template files."),
+        widget=forms.FileInput(attrs={'multiple': 'multiple'}))
+
+    def clean(self):
+        data = super(OnBoardMEABatch, self).clean()
+
+        uploads = self.files.getlist('templates')
+        for upload in uploads:
+            if not upload.name.endswith(('.zip',) + TEMPLATE_EXTENSIONS):
+                raise ValidationError(
+                    _("Only .zip or .yaml file uploads are supported"))
+
+        # Templates failing the local checks are reported along with the
+        # API failures instead of blocking the whole import.
+        data['meads'] = []
+        data['invalid'] = []
+        names = set()
+        max_templates = getattr(settings, 'APMEC_BULK_ONBOARD_MAX_TEMPLATES',
+                                100)
+        count = 0
+        for upload in uploads:
+            for path, size, opener in _iter_templates(upload):
+                count += 1
+                if count > max_templates:
+                    raise ValidationError(
+                        _("At most %d templates can be onboarded at "
+                          "once.") % max_templates)
+                try:
+                    name, description, tosca = _load_template(
+                        path, size, opener)
+                    if name in names:
+                        raise ValidationError(_("Duplicate name %s.") %
+                                              name)
+                    names.add(name)
+                    data['meads'].append((name, description, tosca))
+                except (ValidationError, ValueError, yaml.YAMLError) as e:
+                    message = ' '.join(e.messages) if isinstance(
+                        e, ValidationError) else e
+                    data['invalid'].append((path, message))
+
+        if not data['meads'] and not data['invalid']:
+            raise ValidationError(_("No TOSCA templates found."))
+        return data
+
+    def handle(self, request, data):
+        meads = data['meads']
+        outcomes = utils.call_with_deadline(
+            [functools.partial(api.apmec.create_mead, request,
+                               {'mead': {'name': name,
+                                         'description': description,
+                                         'attributes': {'mead': tosca}}})
+             for name, description, tosca in meads],
+            timeout=getattr(settings, 'APMEC_BULK_ACTION_TIMEOUT', 45))
+
+        failed = list(data['invalid'])
+        created = []
+        for (name, description, tosca), (mead, error) in zip(
+                meads, outcomes):
+            if error is None:
+                created.append(name)
+                continue
+            LOG.warning("Bulk onboarding of MEAD %s failed: %s", name, error)
+            failed.append((name, six.text_type(error).split(
+                'Failed validating', 1)[0]))
+
+        for name, reason in failed:
+            messages.error(request, _('Unable to onboard %(name)s: '
+                                      '%(reason)s') % {'name': name,
+                                                       'reason': reason})
+        if created:
+            messages.success(request,
+                             _('%(count)d MEA Catalog entries have been '
+                               'created.') % {'count': len(created)})
+        # The MEADs created stay created whatever failed, so the modal is
+        # not shown again, inviting a resubmit that would duplicate them.
+        return True
@@ -20,13 +20,20 @@ from horizon import tables
 
 from openstack_dashboard import policy
 from apmec_horizon.openstack_dashboard import api
+from apmec_horizon.openstack_dashboard.dashboards.mec import utils
 
 
-class MyFilterAction(tables.FilterAction):
+class MyFilterAction(utils.ServerFilterAction):
     name = "myfilter"
+    filter_choices = (('name', _("Name ="), True),
+                      ('description', _("Description"), False))
+    local_filters = {
+        'description': lambda mead: mead.get('description'),
+    }
 
 
-class DeleteMEAD(policy.PolicyTargetMixin, tables.DeleteAction):
+class DeleteMEAD(policy.PolicyTargetMixin, utils.ConcurrentBatchMixin,
+                 tables.DeleteAction):
     @staticmethod
     def action_present(count):
         return ungettext_lazy(
@@ -45,6 +52,7 @@ class DeleteMEAD(policy.PolicyTargetMixin, tables.DeleteAction):
 
     def action(self, request, obj_id):
         api.apmec.delete_mead(request, obj_id)
+        utils.purge_fragments(obj_id)
 
 
 class OnBoardMEA(tables.LinkAction):
@@ -55,7 +63,15 @@ class OnBoardMEA(tables.LinkAction):
     url = "horizon:mec:meacatalog:onboardmea"
 
 
-class MEACatalogTable(tables.DataTable):
+class OnBoardMEABatch(tables.LinkAction):
+    name = "onboardmeabatch"
+    verbose_name = _("Onboard MEAs in Bulk")
+    classes = ("ajax-modal",)
+    icon = "upload"
+    url = "horizon:mec:meacatalog:onboardmeabatch"
+
+
+class MEACatalogTable(utils.ScanMarkerMixin, tables.DataTable):
     name = tables.Column('name',
                          link="horizon:mec:meacatalog:detail",
                          verbose_name=_("Name"))
@@ -69,4 +85,6 @@ class MEACatalogTable(tables.DataTable):
     class Meta(object):
         name = "meacatalog"
         verbose_name = _("MEACatalog")
-        table_actions = (OnBoardMEA, DeleteMEAD, MyFilterAction,)
+        table_actions = (OnBoardMEA, OnBoardMEABatch, DeleteMEAD,
+                         utils.ExportAction, utils.ExportJSONAction,
+                         MyFilterAction,)
@@ -19,11 +19,15 @@ from horizon import exceptions
 from horizon import tabs
 
 from apmec_horizon.openstack_dashboard import api
+from apmec_horizon.openstack_dashboard.dashboards.mec import tosca
+from apmec_horizon.openstack_dashboard.dashboards.mec import store
 from apmec_horizon.openstack_dashboard.dashboards.mec import utils
 from apmec_horizon.openstack_dashboard.dashboards.mec.meacatalog import tables
 
 
-class MEACatalogItem(object):
+class MEACatalogItem(utils.BaseItem):
+    __slots__ = ('id', 'name', 'description', 'services')
+
     def __init__(self, name, description, services, mead_id):
         self.id = mead_id
         self.name = name
@@ -31,6 +35,16 @@ class MEACatalogItem(object):
         self.services = services
 
 
+def get_mead_items(meads):
+    """Build MEACatalogItems for a list of meads in one pass."""
+    new = MEACatalogItem
+    return [new(mead['name'], mead['description'],
+                ', '.join(str(s_type) for s_type in mead['service_types']
+                          if s_type != 'mead'),
+                mead['id'])
+            for mead in meads]
+
+
 class MEACatalogTab(tabs.TableTab):
     name = _("MEACatalog Tab")
     slug = "meacatalog_tab"
@@ -43,25 +57,15 @@ class MEACatalogTab(tabs.TableTab):
 
     def get_meacatalog_data(self):
         try:
-            # marker = self.request.GET.get(
-            #            tables.MEACatalogTable._meta.pagination_param, None)
-
-            self._has_more = False
-            catalogs = []
-            meads = api.apmec.mead_list(self.request,
-                                         template_source="onboarded")
-            for mead in meads:
-                s_types = [s_type for s_type in mead['service_types']
-                           if s_type != 'mead']
-                s_types_string = ""
-                if len(s_types) > 0:
-                    s_types_string = ', '.join(
-                        [str(item) for item in s_types])
-                item = MEACatalogItem(mead['name'],
-                                      mead['description'],
-                                      s_types_string, mead['id'])
-                catalogs.append(item)
-            return catalogs
+            marker = self.request.GET.get(
+                tables.MEACatalogTable._meta.pagination_param, None)
+            table = self._tables[tables.MEACatalogTable._meta.name]
+            filters, matches = utils.get_filters(self.request, table)
+            meads, self._has_more, table.scan_marker = store.list_page(
+                self.request, 'meads', api.apmec.mead_list, marker, matches,
+                template_source='onboarded', **filters)
+            tosca.cache_mead_inputs(meads)
+            return get_mead_items(meads)
         except Exception:
             self._has_more = False
             error_message = _('Unable to get mea catalogs')
@@ -76,44 +80,20 @@ class MEACatalogTabs(tabs.TabGroup):
     sticky = True
 
 
-class TemplateTab(tabs.Tab):
+class TemplateTab(utils.CachedFragmentMixin, tabs.Tab):
     name = _("Template")
     slug = "template"
     template_name = ("mec/meacatalog/template.html")
 
+    def get_resource(self):
+        return self.tab_group.kwargs['mead']['mead']
+
     def get_context_data(self, request):
         return {'mead': self.tab_group.kwargs['mead']}
 
 
-class MEADEventsTab(tabs.TableTab):
-    name = _("Events Tab")
-    slug = "events_tab"
-    table_classes = (utils.EventsTable,)
-    template_name = ("horizon/common/_detail_table.html")
-    preload = False
-
-    def has_more_data(self, table):
-        return self._has_more
-
-    def get_events_data(self):
-        try:
-            self._has_more = True
-            utils.EventItemList.clear_list()
-            events = api.apmec.events_list(self.request,
-                                            self.tab_group.kwargs['mead_id'])
-            for event in events:
-                evt_obj = utils.EventItem(
-                    event['id'], event['resource_state'],
-                    event['event_type'],
-                    event['timestamp'],
-                    event['event_details'])
-                utils.EventItemList.add_item(evt_obj)
-            return utils.EventItemList.EVTLIST_P
-        except Exception as e:
-            self._has_more = False
-            error_message = _('Unable to get events %s') % e
-            exceptions.handle(self.request, error_message)
-            return []
+class MEADEventsTab(utils.EventsTab):
+    resource_kwarg = 'mead_id'
 
 
 class MEADDetailTabs(tabs.TabGroup):
@@ -13,10 +13,156 @@
 # under the License.
 
 
+import io
+import zipfile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils.datastructures import MultiValueDict
+import mock
 from openstack_dashboard.test import helpers as test
 
+from apmec_horizon.openstack_dashboard.dashboards.mec.meacatalog \
+    import forms
+from apmec_horizon.openstack_dashboard.dashboards.mec.meacatalog \
+    import tabs
+from apmec_horizon.openstack_dashboard.dashboards.mec import tosca
+from apmec_horizon.openstack_dashboard.dashboards.mec import utils
+
 
 class MeacatalogTests(test.TestCase):
     # Unit tests for meacatalog.
     def test_me(self):
         self.assertTrue(1 + 1 == 2)
+
+    def test_bulk_onboard_reads_archive_entries(self):
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as zf:
+            zf.writestr('catalog/edge.yaml',
+                        'tosca_definitions_version: tosca_simple_1_0\n'
+                        'description: Edge MEA\n')
+            zf.writestr('catalog/named.yaml',
+                        'tosca_definitions_version: tosca_simple_1_0\n'
+                        'metadata: {template_name: core}\n')
+            zf.writestr('catalog/broken.yaml', 'description: [\n')
+            zf.writestr('catalog/README', 'not a template')
+        form = forms.OnBoardMEABatch(
+            self.request, data={},
+            files=MultiValueDict({'templates': [SimpleUploadedFile(
+                'catalog.zip', archive.getvalue())]}))
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(['edge', 'core'],
+                         [mead[0] for mead in form.cleaned_data['meads']])
+        self.assertEqual('Edge MEA', form.cleaned_data['meads'][0][1])
+        self.assertEqual(['catalog/broken.yaml'],
+                         [path for path, reason
+                          in form.cleaned_data['invalid']])
+
+    def test_bulk_onboard_limits_template_count(self):
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as zf:
+            for index in range(3):
+                zf.writestr('mead-%d.yaml' % index,
+                            'tosca_definitions_version: tosca_simple_1_0\n')
+        with self.settings(APMEC_BULK_ONBOARD_MAX_TEMPLATES=2):
+            form = forms.OnBoardMEABatch(
+                self.request, data={},
+                files=MultiValueDict({'templates': [SimpleUploadedFile(
+                    'catalog.zip', archive.getvalue())]}))
+            self.assertFalse(form.is_valid())
+        self.assertIn('At most 2 templates', str(form.errors))
+
+    def test_bulk_onboard_limits_template_size(self):
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as zf:
+            zf.writestr('mead.yaml',
+                        'tosca_definitions_version: tosca_simple_1_0\n'
+                        'description: %s\n' % ('x' * 64))
+        with self.settings(APMEC_MEAD_MAX_TEMPLATE_SIZE=64):
+            form = forms.OnBoardMEABatch(
+                self.request, data={},
+                files=MultiValueDict({'templates': [SimpleUploadedFile(
+                    'catalog.zip', archive.getvalue())]}))
+            self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual([], form.cleaned_data['meads'])
+        self.assertEqual(['mead.yaml'],
+                         [path for path, reason
+                          in form.cleaned_data['invalid']])
+
+    def test_read_csar_definitions_reads_entry_only(self):
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as zf:
+            zf.writestr('TOSCA-Metadata/TOSCA.meta',
+                        'TOSCA-Meta-File-Version: 1.0\n'
+                        'Entry-Definitions: Definitions/mead.yaml\n')
+            zf.writestr('Definitions/mead.yaml',
+                        'tosca_definitions_version: tosca_simple_1_0\n')
+            zf.writestr('Files/image.qcow2', b'\0' * 4096)
+        upload = SimpleUploadedFile('mead.csar', archive.getvalue())
+        self.assertEqual(b'tosca_definitions_version: tosca_simple_1_0\n',
+                         utils.read_csar_definitions(upload))
+
+    def test_tosca_validate_accepts_template(self):
+        self.assertEqual([], tosca.validate(
+            'tosca_definitions_version: tosca_simple_profile_for_mec_1_0_0\n'
+            'topology_template:\n'
+            '  inputs:\n'
+            '    image: {type: string}\n'
+            '  node_templates:\n'
+            '    VDU1:\n'
+            '      type: tosca.nodes.mec.VDU.Tacker\n'
+            '      properties: {image: {get_input: image}}\n'
+            '    CP1:\n'
+            '      type: tosca.nodes.mec.CP.Tacker\n'
+            '      requirements:\n'
+            '        - virtualBinding: VDU1\n'))
+
+    def test_tosca_validate_reports_positions(self):
+        errors = tosca.validate(
+            'tosca_definitions_version: tosca_simple_profile_for_mec_1_0_0\n'
+            'topology_template:\n'
+            '  node_templates:\n'
+            '    CP1:\n'
+            '      type: tosca.nodes.mec.CP.Tacker\n'
+            '      properties: {ip: {get_input: ip}}\n'
+            '      requirements:\n'
+            '        - virtualBinding: VDU9\n')
+        self.assertEqual(2, len(errors))
+        self.assertTrue(errors[0].startswith('Line 6, column 36:'))
+        self.assertIn('ip is not declared', errors[0])
+        self.assertTrue(errors[1].startswith('Line 8, column 27:'))
+        self.assertIn('VDU9', errors[1])
+
+    def test_tosca_validate_reports_unreadable_template(self):
+        errors = tosca.validate(b'a: \xff\xfe')
+        self.assertEqual(1, len(errors))
+        self.assertIn('unacceptable character', errors[0])
+        self.assertTrue(tosca.validate('a: [1\nb: 2')[0].startswith(
+            'Line 2, column 2:'))
+
+    @mock.patch.object(tosca, '_validate', wraps=tosca._validate)
+    def test_tosca_validate_parses_once(self, validate):
+        utils.get_yaml_cache().clear()
+        template = ('tosca_definitions_version: '
+                    'tosca_simple_profile_for_mec_1_0_0\n'
+                    'description: cached\n')
+        self.assertEqual([], tosca.validate(template))
+        self.assertEqual([], tosca.validate(template))
+        self.assertEqual(1, validate.call_count)
+        with mock.patch.object(utils.yaml, 'load') as load:
+            self.assertEqual('cached',
+                             utils.load_yaml(template)['description'])
+        self.assertFalse(load.called)
+
+    @mock.patch('horizon.tabs.Tab.render')
+    def test_template_tab_renders_once_per_version(self, render):
+        render.side_effect = ['v1', 'v1 again', 'v2']
+        mead = {'mead': {'id': 'fragment-mead', 'updated_at': 'v1'}}
+        tab = tabs.TemplateTab(mock.Mock(kwargs={'mead': mead}),
+                               self.request)
+        self.assertEqual('v1', tab.render())
+        self.assertEqual('v1', tab.render())
+        utils.purge_fragments('fragment-mead')
+        self.assertEqual('v1 again', tab.render())
+        mead['mead']['updated_at'] = 'v2'
+        self.assertEqual('v2', tab.render())
+        self.assertEqual(3, render.call_count)
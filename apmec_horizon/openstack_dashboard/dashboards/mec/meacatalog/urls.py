@@ -16,9 +16,15 @@
 from django.conf.urls import url
 
 from apmec_horizon.openstack_dashboard.dashboards.mec.meacatalog import views
+from apmec_horizon.openstack_dashboard.dashboards.mec import utils
 
 urlpatterns = [
     url(r'^$', views.IndexView.as_view(), name='index'),
+    url(r'^onboardmeabatch$', views.OnBoardMEABatchView.as_view(),
+        name='onboardmeabatch'),
     url(r'^onboardmea', views.OnBoardMEAView.as_view(), name='onboardmea'),
     url(r'^(?P<mead_id>[^/]+)/$', views.DetailView.as_view(), name='detail'),
+    url(r'^export$', views.ExportView.as_view(), name='export'),
+    url(r'^(?P<mead_id>[^/]+)/events/export$',
+        utils.ExportEventsView.as_view(), name='export_events'),
 ]
@@ -26,8 +26,11 @@ from horizon.utils import memoized
 from openstack_dashboard import api
 
 from apmec_horizon.openstack_dashboard import api as apmec_api
+from apmec_horizon.openstack_dashboard.dashboards.mec import utils
 from apmec_horizon.openstack_dashboard.dashboards.mec.meacatalog \
     import tabs as mec_tabs
+from apmec_horizon.openstack_dashboard.dashboards.mec.meacatalog \
+    import tables as mec_tables
 
 from apmec_horizon.openstack_dashboard.dashboards.mec.meacatalog \
     import forms as project_forms
@@ -43,6 +46,15 @@ class IndexView(tabs.TabbedTableView):
         return context
 
 
+class ExportView(utils.ExportView):
+    table_class = mec_tables.MEACatalogTable
+    collection = 'meads'
+    build_items = staticmethod(mec_tabs.get_mead_items)
+
+    def get_params(self):
+        return {'template_source': 'onboarded'}
+
+
 class OnBoardMEAView(forms.ModalFormView):
     form_class = project_forms.OnBoardMEA
     template_name = 'mec/meacatalog/onboardmea.html'
@@ -74,6 +86,21 @@ class OnBoardMEAView(forms.ModalFormView):
         return context
 
 
+class OnBoardMEABatchView(forms.ModalFormView):
+    form_class = project_forms.OnBoardMEABatch
+    template_name = 'mec/meacatalog/onboardmeabatch.html'
+    success_url = reverse_lazy("horizon:mec:meacatalog:index")
+    modal_id = "onboardmeabatch_modal"
+    modal_header = _("OnBoard MEAs in Bulk")
+    submit_label = _("OnBoard MEAs")
+    submit_url = "horizon:mec:meacatalog:onboardmeabatch"
+
+    def get_context_data(self, **kwargs):
+        context = super(OnBoardMEABatchView, self).get_context_data(**kwargs)
+        context['submit_url'] = reverse(self.submit_url)
+        return context
+
+
 class DetailView(tabs.TabView):
     tab_group_class = mec_tabs.MEADDetailTabs
     template_name = 'mec/meacatalog/detail.html'
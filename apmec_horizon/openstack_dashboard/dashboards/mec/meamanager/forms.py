@@ -12,8 +12,15 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import csv
+import functools
+import uuid
+
+import six
 import yaml
 
+from django.conf import settings
+from django.core.cache import cache
 from django.forms import ValidationError
 from django.utils.translation import ugettext_lazy as _
 from oslo_log import log as logging
@@ -23,10 +30,99 @@ from horizon import forms
 from horizon import messages
 
 from apmec_horizon.openstack_dashboard import api
+from apmec_horizon.openstack_dashboard.dashboards.mec import tosca
+from apmec_horizon.openstack_dashboard.dashboards.mec import utils
 
 LOG = logging.getLogger(__name__)
 
 
+def get_mead_and_vim_lists(request):
+    """Return the onboarded MEADs and the VIMs to deploy a MEA from.
+
+    Both are fetched in parallel. A failed or slow listing is reported
+    to the user and comes back empty.
+    """
+    (mead_list, mead_error), (vim_list, vim_error) = \
+        utils.call_with_deadline([
+            functools.partial(api.apmec.mead_list, request,
+                              template_source='onboarded'),
+            functools.partial(api.apmec.vim_list, request)])
+
+    if mead_error:
+        msg = _('Failed to retrieve available MEA Catalog names: %s') % \
+            mead_error
+        LOG.error(msg)
+        messages.error(request, msg)
+    else:
+        tosca.cache_mead_inputs(mead_list)
+
+    if vim_error:
+        msg = _('Failed to retrieve available VIM names: %s') % vim_error
+        LOG.error(msg)
+        messages.error(request, msg)
+
+    return mead_list or [], vim_list or []
+
+
+def check_param_values(request, meads, mead_id, mead_template,
+                       param_values):
+    """Check parameter values against the inputs of the MEAD deployed.
+
+    The inputs come from the inline template when there is one, else from
+    the cached schema of the catalog MEAD. Nothing is checked when that
+    schema cannot be fetched; the server still validates the request.
+    """
+    try:
+        params = utils.load_yaml(param_values)
+    except yaml.YAMLError as e:
+        raise ValidationError(
+            _("Unable to read the parameter values: %s") % e)
+    if not isinstance(params, dict):
+        raise ValidationError(_("Parameter values must be a YAML mapping."))
+
+    if mead_template is not None:
+        inputs = tosca.get_inputs(mead_template)
+    else:
+        mead = next((mead for mead in meads if mead['id'] == mead_id), None)
+        if mead is None:
+            return
+        try:
+            inputs = tosca.get_mead_inputs(request, mead)
+        except Exception as e:
+            LOG.warning("Unable to get the inputs of MEAD %s, leaving "
+                        "parameter checks to the server: %s", mead_id, e)
+            return
+    errors = tosca.validate_params(inputs, params)
+    if errors:
+        raise ValidationError(errors)
+
+
+def build_mea_arg(mea_name, description, mead_id, mead_template, vim_id,
+                  region_name, param_values, config_values):
+    """Build the create_mea request body of a MEA to deploy."""
+    if (mead_id == '') and (mead_template is None):
+        raise ValidationError(_("Both MEAD id and template cannot be "
+                                "empty. Please specify one of them"))
+
+    if (mead_id != '') and (mead_template is not None):
+        raise ValidationError(_("Both MEAD id and template cannot be "
+                                "specified. Please specify any one"))
+
+    mea_arg = {'mea': {'mead_id': mead_id, 'name':  mea_name,
+                       'description': description,
+                       'vim_id': vim_id,
+                       'mead_template': mead_template}}
+    if region_name:
+        mea_arg.setdefault('placement_attr', {})[
+            region_name] = region_name
+    mea_attr = mea_arg['mea'].setdefault('attributes', {})
+    if param_values:
+        mea_attr['param_values'] = param_values
+    if config_values:
+        mea_attr['config'] = config_values
+    return mea_arg
+
+
 class DeployMEA(forms.SelfHandlingForm):
     mea_name = forms.CharField(max_length=255, label=_("MEA Name"))
     description = forms.CharField(widget=forms.widgets.Textarea(
@@ -110,31 +206,14 @@ class DeployMEA(forms.SelfHandlingForm):
     def __init__(self, request, *args, **kwargs):
         super(DeployMEA, self).__init__(request, *args, **kwargs)
 
-        try:
-            mead_list = api.apmec.mead_list(request,
-                                             template_source='onboarded')
-            available_choices_mead = [(mea['id'], mea['name']) for mea in
-                                      mead_list]
-        except Exception as e:
-            available_choices_mead = []
-            msg = _('Failed to retrieve available MEA Catalog names: %s') % e
-            LOG.error(msg)
-
-        try:
-            vim_list = api.apmec.vim_list(request)
-            available_choices_vims = [(vim['id'], vim['name']) for vim in
-                                      vim_list]
-
-        except Exception as e:
-            available_choices_vims = []
-            msg = _('Failed to retrieve available VIM names: %s') % e
-            LOG.error(msg)
-
+        self.meads, vims = get_mead_and_vim_lists(request)
         self.fields['mead_id'].choices = [('', _('Select a MEA Catalog Name'))
-                                          ]+available_choices_mead
+                                          ] + [(mead['id'], mead['name'])
+                                               for mead in self.meads]
         self.fields['vim_id'].choices = [('',
                                           _('Select a VIM Name'))
-                                         ]+available_choices_vims
+                                         ] + [(vim['id'], vim['name'])
+                                              for vim in vims]
 
     def clean(self):
         data = super(DeployMEA, self).clean()
@@ -151,11 +230,16 @@ class DeployMEA(forms.SelfHandlingForm):
                 _("Please upload .yaml file only."))
 
         if template_file:
-            data['mead_template'] = yaml.load(template_file,
-                                              Loader=yaml.SafeLoader)
+            errors, key = tosca.validate_upload(template_file)
+            if errors:
+                raise ValidationError(errors)
+            data['mead_template'] = utils.load_yaml_upload(template_file,
+                                                           key=key)
         elif template_raw:
-            data['mead_template'] = yaml.load(data['template_input'],
-                                              Loader=yaml.SafeLoader)
+            errors = tosca.validate(template_raw)
+            if errors:
+                raise ValidationError(errors)
+            data['mead_template'] = utils.load_yaml(template_raw)
         else:
             data['mead_template'] = None
 
@@ -171,7 +255,7 @@ class DeployMEA(forms.SelfHandlingForm):
                 _("Please upload .yaml file only."))
 
         if param_file:
-            data['param_values'] = self.files['param_file'].read()
+            data['param_values'] = utils.read_upload(param_file)
         elif param_raw:
             data['param_values'] = data['direct_input']
         else:
@@ -188,12 +272,16 @@ class DeployMEA(forms.SelfHandlingForm):
             raise ValidationError(_("Only .yaml file uploads supported"))
 
         if config_file:
-            data['config_values'] = self.files['config_file'].read()
+            data['config_values'] = utils.read_upload(config_file)
         elif config_raw:
             data['config_values'] = data['config_input']
         else:
             data['config_values'] = None
 
+        if data['param_values']:
+            check_param_values(self.request, self.meads, data.get('mead_id'),
+                               data['mead_template'], data['param_values'])
+
         return data
 
     def handle(self, request, data):
@@ -207,27 +295,9 @@ class DeployMEA(forms.SelfHandlingForm):
             param_val = data['param_values']
             config_val = data['config_values']
 
-            if (mead_id == '') and (mead_template is None):
-                raise ValidationError(_("Both MEAD id and template cannot be "
-                                        "empty. Please specify one of them"))
-
-            if (mead_id != '') and (mead_template is not None):
-                raise ValidationError(_("Both MEAD id and template cannot be "
-                                        "specified. Please specify any one"))
-
-            mea_arg = {'mea': {'mead_id': mead_id, 'name':  mea_name,
-                               'description': description,
-                               'vim_id': vim_id,
-                               'mead_template': mead_template}}
-            if region_name:
-                mea_arg.setdefault('placement_attr', {})[
-                    region_name] = region_name
-            mea_attr = mea_arg['mea'].setdefault('attributes', {})
-            if param_val:
-                mea_attr['param_values'] = param_val
-            if config_val:
-                mea_attr['config'] = config_val
-
+            mea_arg = build_mea_arg(mea_name, description, mead_id,
+                                    mead_template, vim_id, region_name,
+                                    param_val, config_val)
             api.apmec.create_mea(request, mea_arg)
             messages.success(request,
                              _('MEA %s create operation initiated.') %
@@ -237,3 +307,197 @@ class DeployMEA(forms.SelfHandlingForm):
             exceptions.handle(request,
                               _('Failed to create MEA: %s') %
                               e.message)
+
+
+MANIFEST_FIELDS = ('name', 'description', 'mead_id', 'vim_id', 'region',
+                   'param_values', 'config')
+BATCH_RESULTS_SESSION_KEY = 'mec_meamanager_batch_results'
+
+
+def save_batch_results(request, results):
+    """Keep the results of a batch deployment for the results page.
+
+    The results are cached and only their key goes in the session, which
+    may be a size-limited signed cookie.
+    """
+    batch_id = uuid.uuid4().hex
+    cache.set('apmec:batch-results:%s' % batch_id, results,
+              getattr(settings, 'APMEC_BATCH_RESULTS_TTL', 3600))
+    request.session[BATCH_RESULTS_SESSION_KEY] = batch_id
+
+
+def get_batch_results(request):
+    """Return the results of the user's latest batch deployment."""
+    batch_id = request.session.get(BATCH_RESULTS_SESSION_KEY)
+    if not isinstance(batch_id, six.string_types):
+        return []
+    return cache.get('apmec:batch-results:%s' % batch_id, [])
+
+
+def _read_manifest(manifest_file):
+    """Return the rows of a YAML or CSV MEA manifest as dicts."""
+    content = utils.read_upload(manifest_file)
+    if isinstance(content, six.binary_type):
+        content = content.decode('utf-8')
+
+    if manifest_file.name.endswith('.csv'):
+        lines = content.splitlines(True)
+        if six.PY2:
+            lines = [line.encode('utf-8') for line in lines]
+        rows = list(csv.DictReader(lines))
+        if six.PY2:
+            rows = [dict((key.decode('utf-8'), (value or '').decode('utf-8'))
+                         for key, value in row.items() if key)
+                    for row in rows]
+        return rows
+
+    rows = utils.load_yaml(content)
+    if isinstance(rows, dict):
+        rows = rows.get('meas')
+    if not isinstance(rows, list) or \
+            not all(isinstance(row, dict) for row in rows):
+        raise ValidationError(_("The manifest must be a list of MEAs."))
+    return rows
+
+
+def _yaml_text(value):
+    # Parameter and configuration values are sent as YAML text, like the
+    # files uploaded through DeployMEA.
+    if value in (None, ''):
+        return None
+    if not isinstance(value, six.string_types):
+        return yaml.safe_dump(value, default_flow_style=False)
+    if not isinstance(utils.load_yaml(value), dict):
+        raise ValidationError(_("Values must be a YAML mapping."))
+    return value
+
+
+def _lookup(value, objs, kind):
+    # Manifest rows may refer to MEADs and VIMs by id or by unique name.
+    ids = [obj['id'] for obj in objs
+           if value in (obj['id'], obj.get('name'))]
+    if len(ids) != 1:
+        raise ValidationError(_("Unknown or ambiguous %(kind)s "
+                                "\"%(value)s\".") % {'kind': kind,
+                                                     'value': value})
+    return ids[0]
+
+
+class DeployMEABatch(forms.SelfHandlingForm):
+    manifest_file = forms.FileField(
+        label=_('MEA Manifest File'),
+        help_text=_('A YAML or CSV file with one MEA per row.'))
+
+    def __init__(self, request, *args, **kwargs):
+        super(DeployMEABatch, self).__init__(request, *args, **kwargs)
+        self.meads, self.vims = get_mead_and_vim_lists(request)
+
+    def clean(self):
+        data = super(DeployMEABatch, self).clean()
+
+        manifest_file = data.get('manifest_file', None)
+        if not manifest_file:
+            return data
+        if not manifest_file.name.endswith(('.yaml', '.yml', '.csv')):
+            raise ValidationError(
+                _("Please upload a .yaml or .csv file only."))
+
+        try:
+            rows = _read_manifest(manifest_file)
+        except (ValueError, csv.Error, yaml.YAMLError) as e:
+            raise ValidationError(_("Unable to read the manifest: %s") % e)
+        max_rows = getattr(settings, 'APMEC_BATCH_DEPLOY_MAX_ROWS', 500)
+        if not rows:
+            raise ValidationError(_("The manifest has no MEAs."))
+        if len(rows) > max_rows:
+            raise ValidationError(_("A manifest may hold at most %d MEAs.")
+                                  % max_rows)
+
+        # Every row is checked before any MEA is created, so a mistake in
+        # row 120 does not leave 119 MEAs deployed.
+        errors = []
+        names = set()
+        data['mea_args'] = []
+        for number, row in enumerate(rows, 1):
+            try:
+                unknown = set(row) - set(MANIFEST_FIELDS)
+                if unknown:
+                    raise ValidationError(_("Unknown fields: %s") %
+                                          ', '.join(sorted(unknown)))
+                name = six.text_type(row.get('name') or '')
+                if not name or len(name) > 255:
+                    raise ValidationError(_("A name of at most 255 "
+                                            "characters is required."))
+                if name in names:
+                    raise ValidationError(_("Duplicate name \"%s\".") %
+                                          name)
+                names.add(name)
+                mead_id = row.get('mead_id') or ''
+                if mead_id:
+                    mead_id = _lookup(mead_id, self.meads, _("MEAD"))
+                vim_id = row.get('vim_id') or ''
+                if vim_id:
+                    vim_id = _lookup(vim_id, self.vims, _("VIM"))
+                param_values = _yaml_text(row.get('param_values'))
+                if param_values and mead_id:
+                    check_param_values(self.request, self.meads, mead_id,
+                                       None, param_values)
+                data['mea_args'].append((name, build_mea_arg(
+                    name, row.get('description') or '', mead_id, None,
+                    vim_id, row.get('region') or '', param_values,
+                    _yaml_text(row.get('config')))))
+            except (ValidationError, yaml.YAMLError) as e:
+                message = ' '.join(e.messages) if isinstance(
+                    e, ValidationError) else e
+                errors.append(_("Row %(row)d: %(error)s") %
+                              {'row': number, 'error': message})
+        if errors:
+            raise ValidationError(errors)
+        return data
+
+    def handle(self, request, data):
+        mea_args = data['mea_args']
+        outcomes = utils.call_with_deadline(
+            [functools.partial(api.apmec.create_mea, request, mea_arg)
+             for name, mea_arg in mea_args],
+            timeout=getattr(settings, 'APMEC_BULK_ACTION_TIMEOUT', 45))
+
+        results = []
+        for number, ((name, mea_arg), (mea, error)) in enumerate(
+                zip(mea_args, outcomes), 1):
+            if error is None:
+                status = 'initiated'
+                detail = (mea or {}).get('mea', {}).get('id', '')
+            elif isinstance(error, utils.DeadlineExceeded):
+                status = 'timeout'
+                detail = six.text_type(error)
+            elif isinstance(error, utils.NotAttempted):
+                status = 'not_sent'
+                detail = six.text_type(error)
+            else:
+                LOG.warning("Batch create of MEA %s failed: %s", name, error)
+                status = 'failed'
+                detail = six.text_type(error)
+            results.append({'row': number, 'name': name,
+                            'status': status, 'detail': detail})
+        save_batch_results(request, results)
+
+        initiated = len([r for r in results if r['status'] == 'initiated'])
+        not_sent = len([r for r in results if r['status'] == 'not_sent'])
+        failed = len(results) - initiated - not_sent
+        if not_sent:
+            messages.error(request,
+                           _('%(not_sent)d of %(total)d MEAs were not sent '
+                             'before the deadline. Deploy them again from a '
+                             'manifest of the remaining rows.') %
+                           {'not_sent': not_sent, 'total': len(results)})
+        if failed:
+            messages.warning(request,
+                             _('%(failed)d of %(total)d MEA create '
+                               'operations did not succeed.') %
+                             {'failed': failed, 'total': len(results)})
+        elif initiated:
+            messages.success(request,
+                             _('%d MEA create operations initiated.') %
+                             initiated)
+        return True
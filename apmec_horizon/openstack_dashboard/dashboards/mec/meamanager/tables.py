@@ -23,10 +23,14 @@ from horizon import tables
 
 from openstack_dashboard import policy
 from apmec_horizon.openstack_dashboard import api
+from apmec_horizon.openstack_dashboard.dashboards.mec import utils
 from apmecclient.common.exceptions import NotFound
 
 
-class MEAManagerItem(object):
+class MEAManagerItem(utils.BaseItem):
+    __slots__ = ('name', 'description', 'meas', 'vim', 'status',
+                 'stack_status', 'id', 'error_reason')
+
     def __init__(self, name, description, meas, vim, status,
                  stack_status, stack_id, error_reason):
         self.name = name
@@ -39,26 +43,31 @@ class MEAManagerItem(object):
         self.error_reason = error_reason
 
 
-class MEAManagerItemList(object):
-    MEALIST_P = []
-
-    @classmethod
-    def get_obj_given_stack_id(cls, mea_id):
-        for obj in cls.MEALIST_P:
-            if obj.id == mea_id:
-                return obj
+def get_mea_items(meas):
+    """Build MEAManagerItems for a list of meas in one pass."""
+    new = MEAManagerItem
+    return [new(mea['name'], mea.get('description', ""),
+                mea.get('attributes', {}).get('service_type', ""),
+                str(mea['placement_attr']['vim_name']), mea['status'],
+                mea['status'], mea['id'], mea['error_reason'])
+            for mea in meas]
 
-    @classmethod
-    def add_item(cls, item):
-        cls.MEALIST_P.append(item)
 
-    @classmethod
-    def clear_list(cls):
-        cls.MEALIST_P = []
+def get_mea_item(mea):
+    """Build a MEAManagerItem from a mea returned by the apmec API."""
+    return get_mea_items([mea])[0]
 
 
-class MyFilterAction(tables.FilterAction):
+class MyFilterAction(utils.ServerFilterAction):
     name = "myfilter"
+    filter_choices = (('name', _("Name ="), True),
+                      ('status', _("Status ="), True),
+                      ('vim', _("VIM"), False),
+                      ('description', _("Description"), False))
+    local_filters = {
+        'vim': lambda mea: mea['placement_attr'].get('vim_name'),
+        'description': lambda mea: mea.get('description'),
+    }
 
 
 class StacksUpdateRow(tables.Row):
@@ -74,10 +83,9 @@ class StacksUpdateRow(tables.Row):
                 # returning 404 to the ajax call removes the
                 # row from the table on the ui
                 raise Http404
-            item = MEAManagerItemList.get_obj_given_stack_id(stack_id)
-            item.status = stack.status
-            item.stack_status = stack.stack_status
-            return item
+            return MEAManagerItem(stack.stack_name, stack.description, "",
+                                  "", stack.status, stack.stack_status,
+                                  stack_id, "")
         except Http404:
             raise
         except Exception as e:
@@ -85,9 +93,7 @@ class StacksUpdateRow(tables.Row):
             raise
 
 
-class MEAUpdateRow(tables.Row):
-    ajax = True
-
+class MEAUpdateRow(utils.BulkUpdateRow):
     def can_be_selected(self, datum):
         return datum.status != 'DELETE_COMPLETE'
 
@@ -98,40 +104,11 @@ class MEAUpdateRow(tables.Row):
                 # returning 404 to the ajax call removes the
                 # row from the table on the ui
             #    raise Http404
-            item = MEAManagerItemList.get_obj_given_stack_id(mea_id)
             mea_instance = api.apmec.get_mea(request, mea_id)
-
-            if not mea_instance and not item:
+            if not mea_instance:
                 # TODO(NAME) - bail with error
                 return None
-
-            if not mea_instance and item:
-                # API failure, just keep the current state
-                return item
-
-            mea = mea_instance['mea']
-            try:
-                mea_services_str = mea['attributes']['service_type']
-            except KeyError:
-                mea_services_str = ""
-            try:
-                mea_desc_str = mea['description']
-            except KeyError:
-                mea_desc_str = ""
-
-            vim = mea['placement_attr']['vim_name']
-            if not item:
-                # Add an item entry
-                item = MEAManagerItem(mea['name'], mea_desc_str,
-                                      mea_services_str, str(vim),
-                                      mea['status'], mea['status'], mea['id'],
-                                      mea['error_reason'])
-            else:
-                item.description = mea_desc_str
-                item.meas = mea_services_str
-                item.status = mea['status']
-                item.stack_status = mea['status']
-            return item
+            return get_mea_item(mea_instance['mea'])
         except (Http404, NotFound):
             raise Http404
         except Exception as e:
@@ -139,7 +116,8 @@ class MEAUpdateRow(tables.Row):
             raise
 
 
-class DeleteMEA(policy.PolicyTargetMixin, tables.DeleteAction):
+class DeleteMEA(policy.PolicyTargetMixin, utils.ConcurrentBatchMixin,
+                tables.DeleteAction):
     @staticmethod
     def action_present(count):
         return ungettext_lazy(
@@ -158,6 +136,7 @@ class DeleteMEA(policy.PolicyTargetMixin, tables.DeleteAction):
 
     def action(self, request, obj_id):
         api.apmec.delete_mea(request, obj_id)
+        utils.purge_fragments(obj_id)
 
 
 class DeployMEA(tables.LinkAction):
@@ -168,7 +147,16 @@ class DeployMEA(tables.LinkAction):
     url = "horizon:mec:meamanager:deploymea"
 
 
-class MEAManagerTable(tables.DataTable):
+class DeployMEABatch(tables.LinkAction):
+    name = "deploymeabatch"
+    verbose_name = _("Deploy MEAs from Manifest")
+    classes = ("ajax-modal",)
+    icon = "upload"
+    url = "horizon:mec:meamanager:deploymeabatch"
+
+
+class MEAManagerTable(utils.BulkRowUpdateMixin, utils.ScanMarkerMixin,
+                      tables.DataTable):
     STATUS_CHOICES = (
         ("ACTIVE", True),
         ("ERROR", False),
@@ -253,9 +241,46 @@ class MEAManagerTable(tables.DataTable):
     error_reason = tables.Column("error_reason",
                                  verbose_name=_("Error Reason"))
 
+    def get_rows_data(self, request, obj_ids):
+        meas = utils.get_resources_by_id(request, api.apmec.mea_list,
+                                         api.apmec.get_mea, 'mea', obj_ids)
+        return dict((mea_id, get_mea_item(mea))
+                    for mea_id, mea in meas.items())
+
     class Meta(object):
         name = "meamanager"
         verbose_name = _("MEAManager")
         status_columns = ["status", ]
         row_class = MEAUpdateRow
-        table_actions = (DeployMEA, DeleteMEA, MyFilterAction,)
+        table_actions = (DeployMEA, DeployMEABatch, DeleteMEA,
+                         utils.ExportAction, utils.ExportJSONAction,
+                         MyFilterAction,)
+
+
+class BatchResultItem(utils.BaseItem):
+    __slots__ = ('id', 'name', 'status', 'detail')
+
+    def __init__(self, row, name, status, detail):
+        self.id = row
+        self.name = name
+        self.status = status
+        self.detail = detail
+
+
+class DeployMEABatchResultsTable(tables.DataTable):
+    STATUS_DISPLAY_CHOICES = (
+        ("initiated", _("Create Initiated")),
+        ("failed", _("Failed")),
+        ("timeout", _("Sent, No Answer In Time")),
+        ("not_sent", _("Not Sent, Out Of Time")),
+    )
+
+    id = tables.Column("id", verbose_name=_("Row"))
+    name = tables.Column("name", verbose_name=_("MEA Name"))
+    status = tables.Column("status", verbose_name=_("Result"),
+                           display_choices=STATUS_DISPLAY_CHOICES)
+    detail = tables.Column("detail", verbose_name=_("MEA Id or Error"))
+
+    class Meta(object):
+        name = "deploymeabatchresults"
+        verbose_name = _("Manifest Deployment Results")
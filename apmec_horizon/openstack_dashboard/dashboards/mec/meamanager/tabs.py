@@ -17,6 +17,7 @@ from horizon import exceptions
 from horizon import tabs
 
 from apmec_horizon.openstack_dashboard import api
+from apmec_horizon.openstack_dashboard.dashboards.mec import store
 from apmec_horizon.openstack_dashboard.dashboards.mec import utils
 from apmec_horizon.openstack_dashboard.dashboards.mec.meamanager import tables
 
@@ -33,37 +34,14 @@ class MEAManagerTab(tabs.TableTab):
 
     def get_meamanager_data(self):
         try:
-            # marker = self.request.GET.get(
-            #            tables.MEAManagerTable._meta.pagination_param, None)
-
-            # instances, self._has_more = api.nova.server_list(
-            #    self.request,
-            #    search_opts={'marker': marker, 'paginate': True})
-            self._has_more = True
-            tables.MEAManagerItemList.clear_list()
-            meas = api.apmec.mea_list(self.request)
-            for mea in meas:
-                try:
-                    mea_services_str = mea['attributes']['service_type']
-                except KeyError:
-                    mea_services_str = ""
-                try:
-                    mea_desc_str = mea['description']
-                except KeyError:
-                    mea_desc_str = ""
-
-                vim = mea['placement_attr']['vim_name']
-                obj = tables.MEAManagerItem(
-                    mea['name'],
-                    mea_desc_str,
-                    mea_services_str,
-                    vim,
-                    mea['status'],
-                    mea['status'],
-                    mea['id'],
-                    mea['error_reason'])
-                tables.MEAManagerItemList.add_item(obj)
-            return tables.MEAManagerItemList.MEALIST_P
+            marker = self.request.GET.get(
+                tables.MEAManagerTable._meta.pagination_param, None)
+            table = self._tables[tables.MEAManagerTable._meta.name]
+            filters, matches = utils.get_filters(self.request, table)
+            meas, self._has_more, table.scan_marker = store.list_page(
+                self.request, 'meas', api.apmec.mea_list, marker, matches,
+                **filters)
+            return tables.get_mea_items(meas)
         except Exception:
             self._has_more = False
             error_message = _('Unable to get instances')
@@ -78,44 +56,23 @@ class MEAManagerTabs(tabs.TabGroup):
     sticky = True
 
 
-class VDUDetailTab(tabs.Tab):
+class VDUDetailTab(utils.CachedFragmentMixin, tabs.Tab):
     name = _("VDU Detail")
     slug = "VDU_Details"
     template_name = "mec/meamanager/vdu_details.html"
+    # An MEA going ACTIVE gets its VDUs without an updated_at change.
+    key_fields = ('status',)
+
+    def get_resource(self):
+        mea = self.tab_group.kwargs['mea']
+        return mea and mea['mea']
 
     def get_context_data(self, request):
         return {'mea': self.tab_group.kwargs['mea']}
 
 
-class MEAEventsTab(tabs.TableTab):
-    name = _("Events Tab")
-    slug = "events_tab"
-    table_classes = (utils.EventsTable,)
-    template_name = ("horizon/common/_detail_table.html")
-    preload = False
-
-    def has_more_data(self, table):
-        return self._has_more
-
-    def get_events_data(self):
-        try:
-            self._has_more = True
-            utils.EventItemList.clear_list()
-            events = api.apmec.events_list(self.request,
-                                            self.tab_group.kwargs['mea_id'])
-            for event in events:
-                evt_obj = utils.EventItem(
-                    event['id'], event['resource_state'],
-                    event['event_type'],
-                    event['timestamp'],
-                    event['event_details'])
-                utils.EventItemList.add_item(evt_obj)
-            return utils.EventItemList.EVTLIST_P
-        except Exception as e:
-            self._has_more = False
-            error_message = _('Unable to get events %s') % e
-            exceptions.handle(self.request, error_message)
-            return []
+class MEAEventsTab(utils.EventsTab):
+    resource_kwarg = 'mea_id'
 
 
 class MEADetailsTabs(tabs.TabGroup):
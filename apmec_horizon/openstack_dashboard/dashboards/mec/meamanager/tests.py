@@ -12,11 +12,354 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import threading
 
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test.utils import override_settings
+import mock
+import six
+
+from apmecclient.common.exceptions import NotFound
 from openstack_dashboard.test import helpers as test
 
+from apmec_horizon.openstack_dashboard import api
+from apmec_horizon.openstack_dashboard.dashboards.mec.meamanager \
+    import forms
+from apmec_horizon.openstack_dashboard.dashboards.mec.meamanager \
+    import tables
+from apmec_horizon.openstack_dashboard.dashboards.mec.meamanager \
+    import tabs
+from apmec_horizon.openstack_dashboard.dashboards.mec.meamanager \
+    import views
+from apmec_horizon.openstack_dashboard.dashboards.mec import store
+from apmec_horizon.openstack_dashboard.dashboards.mec import tosca
+from apmec_horizon.openstack_dashboard.dashboards.mec import utils
+
+MEAD_TEMPLATE = """
+topology_template:
+  inputs:
+    a:
+      type: integer
+      constraints:
+        - in_range: [1, 10]
+    flavor:
+      type: string
+      default: m1.tiny
+"""
+
 
 class MeamanagerTests(test.TestCase):
     # Unit tests for meamanager.
     def test_me(self):
         self.assertTrue(1 + 1 == 2)
+
+    def test_get_resources_by_id_uses_filtered_list(self):
+        list_func = mock.Mock(return_value=[{'id': 'a'}, {'id': 'c'}])
+        get_func = mock.Mock()
+        found = utils.get_resources_by_id(self.request, list_func, get_func,
+                                          'mea', ['a', 'b'])
+        self.assertEqual({'a': {'id': 'a'}}, found)
+        list_func.assert_called_once_with(self.request, id=['a', 'b'])
+        self.assertFalse(get_func.called)
+
+    def test_get_resources_by_id_falls_back_to_get(self):
+        list_func = mock.Mock(side_effect=Exception('unsupported filter'))
+
+        def get_func(request, obj_id):
+            if obj_id == 'b':
+                raise NotFound()
+            return {'mea': {'id': obj_id}}
+
+        found = utils.get_resources_by_id(self.request, list_func, get_func,
+                                          'mea', ['a', 'b'])
+        self.assertEqual({'a': {'id': 'a'}}, found)
+
+    def test_call_with_deadline_reports_slow_calls(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def fail():
+            raise ValueError()
+
+        outcomes = utils.call_with_deadline(
+            [lambda: 'fast', release.wait, fail], timeout=0.1)
+        self.assertEqual(('fast', None), outcomes[0])
+        self.assertIsInstance(outcomes[1][1], utils.DeadlineExceeded)
+        self.assertIsInstance(outcomes[2][1], ValueError)
+
+    def test_call_with_deadline_does_not_start_queued_calls(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        late = mock.Mock()
+
+        outcomes = utils.call_with_deadline([release.wait, late],
+                                            timeout=0.1, max_workers=1)
+        release.set()
+        self.assertIsInstance(outcomes[0][1], utils.DeadlineExceeded)
+        self.assertIsInstance(outcomes[1][1], utils.NotAttempted)
+        self.assertFalse(late.called)
+
+    def test_get_mea_items(self):
+        meas = [{'id': 'a', 'name': 'mea', 'status': 'ACTIVE',
+                 'placement_attr': {'vim_name': 'vim'},
+                 'error_reason': None}]
+        item = tables.get_mea_items(meas)[0]
+        self.assertEqual('a', item.id)
+        self.assertEqual('', item.description)
+        self.assertEqual('', item.meas)
+        self.assertEqual('vim', item.vim)
+        self.assertFalse(hasattr(item, '__dict__'))
+
+    def _filter_request(self, field, value):
+        table = tables.MEAManagerTable(self.request)
+        param_name = table._meta._filter_action.get_param_name()
+        request = self.factory.post('/', {param_name: value,
+                                          param_name + '_field': field})
+        request.session = {}
+        return request, tables.MEAManagerTable(request)
+
+    def test_get_filters_passes_api_filters(self):
+        request, table = self._filter_request('status', 'ERROR')
+        filters, matches = utils.get_filters(request, table)
+        self.assertEqual({'status': 'ERROR'}, filters)
+        self.assertIsNone(matches)
+        self.assertIn('ERROR', request.session.values())
+
+    def test_get_filters_matches_local_filters(self):
+        request, table = self._filter_request('vim', 'Edge')
+        filters, matches = utils.get_filters(request, table)
+        self.assertEqual({}, filters)
+        self.assertTrue(matches({'placement_attr': {'vim_name': 'edge-1'}}))
+        self.assertFalse(matches({'placement_attr': {'vim_name': 'core'}}))
+
+    def test_filters_are_kept_per_panel(self):
+        request, table = self._filter_request('status', 'ERROR')
+        request.horizon = {'panel': mock.Mock(slug='mesmanager')}
+        self.assertEqual({'status': 'ERROR'},
+                         utils.get_filters(request, table)[0])
+        other = self.factory.get('/')
+        other.session = request.session
+        other.horizon = {'panel': mock.Mock(slug='mecamanager')}
+        self.assertEqual(({}, None), utils.get_filters(
+            other, tables.MEAManagerTable(other)))
+
+    @mock.patch.object(store.functions, 'get_page_size', return_value=2)
+    @mock.patch.object(store, 'mirror_list', return_value=None)
+    @mock.patch.object(utils, 'get_list_snapshot')
+    def test_locally_filtered_page_is_filled(self, snapshot, mirror_list,
+                                             get_page_size):
+        meas = [{'id': str(i), 'vim': 'edge' if i % 3 else 'core'}
+                for i in range(9)]
+
+        def list_page(request, collection, list_func, marker=None,
+                      paginate=False):
+            start = int(marker) + 1 if marker else 0
+            return meas[start:start + 2], start + 2 < len(meas)
+        snapshot.side_effect = list_page
+
+        def matches(mea):
+            return mea['vim'] == 'core'
+
+        page, has_more, marker = store.list_page(self.request, 'meas', None,
+                                                 matches=matches)
+        self.assertEqual(['0', '3'], [mea['id'] for mea in page])
+        self.assertTrue(has_more)
+        self.assertIsNone(marker)
+        page, has_more, marker = store.list_page(self.request, 'meas', None,
+                                                 marker='3', matches=matches)
+        self.assertEqual(['6'], [mea['id'] for mea in page])
+        self.assertFalse(has_more)
+
+        # A filter matching little stops after APMEC_FILTER_MAX_PAGES.
+        snapshot.reset_mock()
+        with self.settings(APMEC_FILTER_MAX_PAGES=2):
+            page, has_more, marker = store.list_page(
+                self.request, 'meas', None,
+                matches=lambda mea: mea['id'] == '8')
+        self.assertEqual(([], True, '3'), (page, has_more, marker))
+        self.assertEqual(2, snapshot.call_count)
+
+    @mock.patch.object(utils.functions, 'get_page_size', return_value=2)
+    @mock.patch.object(api.apmec, 'events_list')
+    def test_events_page_refetched_after_many_new_events(self, events_list,
+                                                         get_page_size):
+        cache.clear()
+        events_list.return_value = ([{'id': 2}, {'id': 1}], False)
+        utils.get_events_page(self.request, 'mea-1')
+        events_list.side_effect = [[{'id': 5}, {'id': 4}, {'id': 3}],
+                                   ([{'id': 5}, {'id': 4}], True)]
+        self.assertEqual(([{'id': 5}, {'id': 4}], True),
+                         utils.get_events_page(self.request, 'mea-1'))
+        events_list.assert_called_with(self.request, 'mea-1', paginate=True)
+
+    @mock.patch.object(api.apmec, 'list_pages')
+    def test_export_streams_pages(self, list_pages):
+        mea = {'id': 'a', 'name': 'mea', 'status': 'ACTIVE',
+               'placement_attr': {'vim_name': 'vim'},
+               'error_reason': None}
+        list_pages.return_value = iter([[mea], [dict(mea, id='b')]])
+        request = self.factory.get('/', {'format': 'ndjson'})
+        request.session = {}
+        response = views.ExportView.as_view()(request)
+        self.assertEqual('application/x-ndjson', response['Content-Type'])
+        lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual(2, len(lines))
+        self.assertIn(b'"vim": "vim"', lines[0])
+        list_pages.assert_called_once_with(request, 'meas')
+
+    @mock.patch.object(utils, 'messages')
+    @mock.patch.object(api.apmec, 'delete_mea')
+    def test_delete_reports_partial_failure(self, delete_mea, messages):
+        delete_mea.side_effect = \
+            lambda request, mea_id: mea_id == 'b' and 1 / 0
+        table = mock.Mock()
+        table.get_object_by_id.side_effect = lambda mea_id: mea_id
+        table.get_object_display.side_effect = lambda mea_id: mea_id
+        action = tables.DeleteMEA()
+        action.handle(table, self.request, ['a', 'b', 'c'])
+        self.assertEqual(3, delete_mea.call_count)
+        self.assertEqual(['a', 'c'], action.success_ids)
+        self.assertIn('b', str(messages.error.call_args))
+        self.assertTrue(messages.info.called)
+
+    def _batch_form(self, name, content):
+        with mock.patch.object(forms, 'get_mead_and_vim_lists') as lists:
+            lists.return_value = ([{'id': 'd1', 'name': 'mead',
+                                    'updated_at': '2018-01-01T00:00:00',
+                                    'attributes': {'mead': MEAD_TEMPLATE}}],
+                                  [{'id': 'v1', 'name': 'vim'}])
+            return forms.DeployMEABatch(
+                self.request, data={},
+                files={'manifest_file': SimpleUploadedFile(name, content)})
+
+    def test_batch_manifest_csv(self):
+        form = self._batch_form(
+            'meas.csv', b'name,mead_id,vim_id,param_values\n'
+                        b'edge-1,mead,v1,"{a: 1}"\n')
+        self.assertTrue(form.is_valid(), form.errors)
+        name, mea_arg = form.cleaned_data['mea_args'][0]
+        self.assertEqual('edge-1', name)
+        self.assertEqual('d1', mea_arg['mea']['mead_id'])
+        self.assertEqual('{a: 1}',
+                         mea_arg['mea']['attributes']['param_values'])
+
+    def test_batch_manifest_reports_every_bad_row(self):
+        form = self._batch_form(
+            'meas.yaml', b'- {name: edge-1, mead_id: mead}\n'
+                         b'- {name: edge-2, mead_id: nope}\n'
+                         b'- {name: edge-1, mead_id: d1}\n')
+        self.assertFalse(form.is_valid())
+        errors = form.non_field_errors()
+        self.assertEqual(2, len(errors))
+        self.assertIn('Row 2', errors[0])
+        self.assertIn('Row 3', errors[1])
+
+    def test_batch_manifest_checks_params_against_mead_inputs(self):
+        form = self._batch_form(
+            'meas.yaml', b'- {name: edge-1, mead_id: d1,'
+                         b' param_values: {a: 11, zone: x}}\n'
+                         b'- {name: edge-2, mead_id: d1,'
+                         b' param_values: {flavor: m1.small}}\n')
+        self.assertFalse(form.is_valid())
+        errors = form.non_field_errors()
+        self.assertEqual(2, len(errors))
+        self.assertIn('zone is not an input', errors[0])
+        self.assertIn('in_range', errors[0])
+        self.assertIn('Row 2', errors[1])
+        self.assertIn('Input a is required', errors[1])
+
+    @mock.patch.object(forms, 'messages')
+    @mock.patch.object(utils, 'call_with_deadline')
+    def test_batch_results_tell_unsent_from_unanswered(self, call, messages):
+        call.return_value = [
+            ({'mea': {'id': 'm1'}}, None),
+            (None, utils.DeadlineExceeded('slow')),
+            (None, utils.NotAttempted('late'))]
+        form = self._batch_form('meas.yaml', b'[]')
+        form.handle(self.request, {'mea_args': [('a', {}), ('b', {}),
+                                                ('c', {})]})
+        self.assertIsInstance(
+            self.request.session[forms.BATCH_RESULTS_SESSION_KEY],
+            six.string_types)
+        self.assertEqual(['initiated', 'timeout', 'not_sent'],
+                         [result['status'] for result
+                          in forms.get_batch_results(self.request)])
+        self.assertIn('not sent', str(messages.error.call_args))
+
+    @mock.patch.object(forms, 'messages')
+    @mock.patch.object(utils, 'call_with_deadline')
+    def test_batch_success_counts_initiated_only(self, call, messages):
+        call.return_value = [
+            ({'mea': {'id': 'm1'}}, None),
+            (None, utils.NotAttempted('late'))]
+        form = self._batch_form('meas.yaml', b'[]')
+        form.handle(self.request, {'mea_args': [('a', {}), ('b', {})]})
+        self.assertIn('1 MEA create', str(messages.success.call_args))
+
+        messages.reset_mock()
+        call.return_value = [(None, utils.NotAttempted('late'))]
+        form.handle(self.request, {'mea_args': [('a', {})]})
+        self.assertTrue(messages.error.called)
+        self.assertFalse(messages.success.called)
+
+    def test_validate_params_types(self):
+        inputs = tosca.get_inputs(utils.load_yaml(MEAD_TEMPLATE))
+        self.assertEqual([], tosca.validate_params(inputs, {'a': 3}))
+        self.assertEqual([], tosca.validate_params(inputs, {'a': 3,
+                                                            'extra': 1}))
+        self.assertEqual([], tosca.validate_params(inputs, {'a': '5'}))
+        self.assertEqual(['Input a must be of type integer.'],
+                         [str(error) for error in
+                          tosca.validate_params(inputs, {'a': 'five'})])
+        self.assertEqual(['Input a does not satisfy in_range: [1, 10].'],
+                         [str(error) for error in
+                          tosca.validate_params(inputs, {'a': '50'})])
+
+    @mock.patch('horizon.tabs.Tab.render')
+    def test_vdu_tab_renders_again_on_status_change(self, render):
+        render.side_effect = ['pending', 'active']
+        mea = {'mea': {'id': 'fragment-mea', 'created_at': 'c',
+                       'status': 'PENDING_CREATE'}}
+        tab = tabs.VDUDetailTab(mock.Mock(kwargs={'mea': mea}),
+                                self.request)
+        self.assertEqual('pending', tab.render())
+        self.assertEqual('pending', tab.render())
+        mea['mea']['status'] = 'ACTIVE'
+        self.assertEqual('active', tab.render())
+        utils.purge_fragments('fragment-mea')
+
+    def test_yaml_cache_hits_and_evicts(self):
+        cache = utils.YAMLCache(max_bytes=20)
+        first = cache.load(u'a: [1, 2]')
+        first['a'].append(3)
+        self.assertEqual({'a': [1, 2]}, cache.load(b'a: [1, 2]'))
+        cache.load(u'b: 123456789012')
+        stats = cache.get_stats()
+        self.assertEqual(1, stats['hits'])
+        self.assertEqual(2, stats['misses'])
+        self.assertEqual(1, stats['evictions'])
+        self.assertEqual(1, stats['entries'])
+        self.assertEqual(1.0 / 3, stats['hit_rate'])
+
+    def test_list_snapshot_is_served_until_stale(self):
+        cache.clear()
+        list_func = mock.Mock(return_value=(['a'], False))
+        for _ in range(2):
+            self.assertEqual((['a'], False), utils.get_list_snapshot(
+                self.request, 'meas', list_func, paginate=True))
+        self.assertEqual(1, list_func.call_count)
+        api.apmec.invalidate_list_cache(self.request, 'meas')
+        utils.get_list_snapshot(self.request, 'meas', list_func,
+                                paginate=True)
+        self.assertEqual(2, list_func.call_count)
+
+    @override_settings(APMEC_LIST_MAX_STALENESS={'meas': 0})
+    @mock.patch.object(utils, 'messages')
+    def test_list_snapshot_is_served_when_api_fails(self, messages):
+        cache.clear()
+        list_func = mock.Mock(side_effect=[(['a'], False), Exception()])
+        for _ in range(2):
+            self.assertEqual((['a'], False), utils.get_list_snapshot(
+                self.request, 'meas', list_func, paginate=True))
+        self.assertTrue(messages.warning.called)
@@ -16,9 +16,17 @@
 from django.conf.urls import url
 
 from apmec_horizon.openstack_dashboard.dashboards.mec.meamanager import views
+from apmec_horizon.openstack_dashboard.dashboards.mec import utils
 
 urlpatterns = [
     url(r'^$', views.IndexView.as_view(), name='index'),
     url(r'^deploymea$', views.DeployMEAView.as_view(), name='deploymea'),
+    url(r'^deploymeabatch$', views.DeployMEABatchView.as_view(),
+        name='deploymeabatch'),
+    url(r'^deploymeabatch/results$', views.DeployMEABatchResultsView.as_view(),
+        name='deploymeabatchresults'),
     url(r'^(?P<mea_id>[^/]+)/$', views.DetailView.as_view(), name='detail'),
+    url(r'^export$', views.ExportView.as_view(), name='export'),
+    url(r'^(?P<mea_id>[^/]+)/events/export$',
+        utils.ExportEventsView.as_view(), name='export_events'),
 ]
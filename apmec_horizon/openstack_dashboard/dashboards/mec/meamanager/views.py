@@ -21,15 +21,19 @@ from oslo_log import log as logging
 
 from horizon import exceptions
 from horizon import forms
+from horizon import tables
 from horizon import tabs
 from horizon.utils import memoized
 
 from apmec_horizon.openstack_dashboard import api as apmec_api
+from apmec_horizon.openstack_dashboard.dashboards.mec import utils
 from apmec_horizon.openstack_dashboard.dashboards.mec.meamanager \
     import forms as project_forms
 
 from apmec_horizon.openstack_dashboard.dashboards.mec.meamanager \
     import tabs as mec_tabs
+from apmec_horizon.openstack_dashboard.dashboards.mec.meamanager \
+    import tables as mec_tables
 
 LOG = logging.getLogger(__name__)
 
@@ -44,6 +48,12 @@ class IndexView(tabs.TabbedTableView):
         return context
 
 
+class ExportView(utils.ExportView):
+    table_class = mec_tables.MEAManagerTable
+    collection = 'meas'
+    build_items = staticmethod(mec_tables.get_mea_items)
+
+
 class DeployMEAView(forms.ModalFormView):
     form_class = project_forms.DeployMEA
     template_name = 'mec/meamanager/deploy_mea.html'
@@ -75,6 +85,33 @@ class DeployMEAView(forms.ModalFormView):
         return context
 
 
+class DeployMEABatchView(forms.ModalFormView):
+    form_class = project_forms.DeployMEABatch
+    template_name = 'mec/meamanager/deploy_mea_batch.html'
+    success_url = reverse_lazy("horizon:mec:meamanager:deploymeabatchresults")
+    modal_id = "deploy_mea_batch_modal"
+    modal_header = _("Deploy MEAs from Manifest")
+    submit_label = _("Deploy MEAs")
+    submit_url = "horizon:mec:meamanager:deploymeabatch"
+
+    def get_context_data(self, **kwargs):
+        context = super(DeployMEABatchView, self).get_context_data(**kwargs)
+        context['submit_url'] = reverse(self.submit_url)
+        return context
+
+
+class DeployMEABatchResultsView(tables.DataTableView):
+    table_class = mec_tables.DeployMEABatchResultsTable
+    template_name = 'mec/meamanager/deploy_mea_batch_results.html'
+    page_title = _("Manifest Deployment Results")
+
+    def get_data(self):
+        results = project_forms.get_batch_results(self.request)
+        return [mec_tables.BatchResultItem(result['row'], result['name'],
+                                           result['status'], result['detail'])
+                for result in results]
+
+
 class DetailView(tabs.TabView):
     tab_group_class = mec_tabs.MEADetailsTabs
     template_name = 'mec/meamanager/detail.html'
@@ -10,26 +10,29 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import functools
+
 from django.forms import ValidationError
 from django.utils.translation import ugettext_lazy as _
 from oslo_log import log as logging
 
 from horizon import exceptions
 from horizon import forms
-from horizon import mecasages
+from horizon import messages
 
 from apmec_horizon.openstack_dashboard import api
+from apmec_horizon.openstack_dashboard.dashboards.mec import utils
 
 LOG = logging.getLogger(__name__)
 
 
 class DeployMECA(forms.SelfHandlingForm):
-    mca_name = forms.CharField(max_length=255, label=_("MECA Name"))
+    meca_name = forms.CharField(max_length=255, label=_("MECA Name"))
     description = forms.CharField(widget=forms.widgets.Textarea(
                                   attrs={'rows': 4}),
                                   label=_("Description"),
                                   required=False)
-    mcad_id = forms.ChoiceField(label=_("MECA Catalog Name"))
+    mecad_id = forms.ChoiceField(label=_("MECA Catalog Name"))
     vim_id = forms.ChoiceField(label=_("VIM Name"), required=False)
     source_type = forms.ChoiceField(
         label=_('Parameter Value Source'),
@@ -83,24 +86,25 @@ class DeployMECA(forms.SelfHandlingForm):
     def __init__(self, request, *args, **kwargs):
         super(DeployMECA, self).__init__(request, *args, **kwargs)
 
-        try:
-            mecad_list = api.apmec.mecad_list(request)
-            available_choices_mecad = [(meca['id'], meca['name']) for meca in
-                                     mecad_list]
-        except Exception as e:
-            available_choices_mecad = []
-            msg = _('Failed to retrieve available MECA Catalog nameca: %s') % e
-            LOG.error(msg)
+        (mecad_list, mecad_error), (vim_list, vim_error) = \
+            utils.call_with_deadline([
+                functools.partial(api.apmec.mecad_list, request),
+                functools.partial(api.apmec.vim_list, request)])
 
-        try:
-            vim_list = api.apmec.vim_list(request)
-            available_choices_vims = [(vim['id'], vim['name']) for vim in
-                                      vim_list]
+        available_choices_mecad = [(meca['id'], meca['name']) for meca in
+                                   mecad_list or []]
+        if mecad_error:
+            msg = _('Failed to retrieve available MECA Catalog names: %s') % \
+                mecad_error
+            LOG.error(msg)
+            messages.error(request, msg)
 
-        except Exception as e:
-            available_choices_vims = []
-            msg = _('Failed to retrieve available VIM nameca: %s') % e
+        available_choices_vims = [(vim['id'], vim['name']) for vim in
+                                  vim_list or []]
+        if vim_error:
+            msg = _('Failed to retrieve available VIM names: %s') % vim_error
             LOG.error(msg)
+            messages.error(request, msg)
 
         self.fields['mecad_id'].choices = [('', _('Select a MECA Catalog Name'))
                                          ]+available_choices_mecad
@@ -123,7 +127,7 @@ class DeployMECA(forms.SelfHandlingForm):
                 _("Please upload .yaml file only."))
 
         if param_file:
-            data['param_values'] = self.files['param_file'].read()
+            data['param_values'] = utils.read_upload(param_file)
         elif param_raw:
             data['param_values'] = data['direct_input']
         else:
@@ -140,7 +144,7 @@ class DeployMECA(forms.SelfHandlingForm):
             raise ValidationError(_("Only .yaml file uploads supported"))
 
         if config_file:
-            data['config_values'] = self.files['config_file'].read()
+            data['config_values'] = utils.read_upload(config_file)
         elif config_raw:
             data['config_values'] = data['config_input']
         else:
@@ -166,9 +170,9 @@ class DeployMECA(forms.SelfHandlingForm):
                 meca_attr['config'] = config_val
 
             api.apmec.create_meca(request, meca_arg)
-            mecasages.success(request,
-                             _('MECA %s create operation initiated.') %
-                             meca_name)
+            messages.success(request,
+                            _('MECA %s create operation initiated.') %
+                            meca_name)
             return True
         except Exception as e:
             exceptions.handle(request,
@@ -20,10 +20,14 @@ from horizon import tables
 
 from openstack_dashboard import policy
 from apmec_horizon.openstack_dashboard import api
+from apmec_horizon.openstack_dashboard.dashboards.mec import utils
 from apmecclient.common.exceptions import NotFound
 
 
-class MECAManagerItem(object):
+class MECAManagerItem(utils.BaseItem):
+    __slots__ = ('name', 'description', 'vim', 'status', 'id',
+                 'error_reason')
+
     def __init__(self, name, description, vim, status,
                  meca_id, error_reason):
         self.name = name
@@ -34,31 +38,31 @@ class MECAManagerItem(object):
         self.error_reason = error_reason
 
 
-class MECAManagerItemList(object):
-    MECALIST_P = []
-
-    @classmethod
-    def get_obj_given_stack_ids(cls, meca_id):
-        for obj in cls.MECALIST_P:
-            if obj.id == meca_id:
-                return obj
+def get_meca_items(mecas):
+    """Build MECAManagerItems for a list of mecas in one pass."""
+    new = MECAManagerItem
+    return [new(meca['name'], meca.get('description', ""), str(meca['vim_id']),
+                meca['status'], meca['id'], meca['error_reason'])
+            for meca in mecas]
 
-    @classmethod
-    def add_item(cls, item):
-        cls.MECALIST_P.append(item)
 
-    @classmethod
-    def clear_list(cls):
-        cls.MECALIST_P = []
+def get_meca_item(meca):
+    """Build a MECAManagerItem from a meca returned by the apmec API."""
+    return get_meca_items([meca])[0]
 
 
-class MyFilterAction(tables.FilterAction):
+class MyFilterAction(utils.ServerFilterAction):
     name = "myfilter"
+    filter_choices = (('name', _("Name ="), True),
+                      ('status', _("Status ="), True),
+                      ('vim_id', _("VIM ID ="), True),
+                      ('description', _("Description"), False))
+    local_filters = {
+        'description': lambda meca: meca.get('description'),
+    }
 
 
-class MECAUpdateRow(tables.Row):
-    ajax = True
-
+class MECAUpdateRow(utils.BulkUpdateRow):
     def can_be_selected(self, datum):
         return datum.status != 'DELETE_COMPLETE'
 
@@ -69,35 +73,11 @@ class MECAUpdateRow(tables.Row):
                 # returning 404 to the ajax call removes the
                 # row from the table on the ui
             #    raise Http404
-            item = MECAManagerItemList.get_obj_given_stack_ids(meca_id)
             meca_instance = api.apmec.get_meca(request, meca_id)
-
-            if not meca_instance and not item:
+            if not meca_instance:
                 # TODO(NAME) - bail with error
                 return None
-
-            if not meca_instance and item:
-                # API failure, just keep the current state
-                return item
-
-            meca = meca_instance['meca']
-            try:
-                meca_desc_str = meca['description']
-            except KeyError:
-                meca_desc_str = ""
-
-            vim = meca['vim_id']
-            if not item:
-                # Add an item entry
-                item = MECAManagerItem(meca['name'], meca_desc_str,
-                                     str(vim),
-                                     meca['status'], meca['id'],
-                                     meca['error_reason'])
-            else:
-                item.description = meca_desc_str
-                item.status = meca['status']
-                item.id = meca['id']
-            return item
+            return get_meca_item(meca_instance['meca'])
         except (Http404, NotFound):
             raise Http404
         except Exception as e:
@@ -105,7 +85,8 @@ class MECAUpdateRow(tables.Row):
             raise
 
 
-class DeleteMECA(policy.PolicyTargetMixin, tables.DeleteAction):
+class DeleteMECA(policy.PolicyTargetMixin, utils.ConcurrentBatchMixin,
+                 tables.DeleteAction):
     @staticmethod
     def action_present(count):
         return ungettext_lazy(
@@ -134,7 +115,8 @@ class DeployMECA(tables.LinkAction):
     url = "horizon:mec:mecamanager:deploymeca"
 
 
-class MECAManagerTable(tables.DataTable):
+class MECAManagerTable(utils.BulkRowUpdateMixin, utils.ScanMarkerMixin,
+                       tables.DataTable):
     STATUS_CHOICES = (
         ("ACTIVE", True),
         ("ERROR", False),
@@ -151,9 +133,17 @@ class MECAManagerTable(tables.DataTable):
     error_reason = tables.Column("error_reason",
                                  verbose_name=_("Error Reason"))
 
+    def get_rows_data(self, request, obj_ids):
+        mecas = utils.get_resources_by_id(request, api.apmec.meca_list,
+                                          api.apmec.get_meca, 'meca', obj_ids)
+        return dict((meca_id, get_meca_item(meca))
+                    for meca_id, meca in mecas.items())
+
     class Meta(object):
         name = "mecamanager"
         verbose_name = _("MECAManager")
         status_columns = ["status", ]
         row_class = MECAUpdateRow
-        table_actions = (DeployMECA, DeleteMECA, MyFilterAction,)
+        table_actions = (DeployMECA, DeleteMECA,
+                         utils.ExportAction, utils.ExportJSONAction,
+                         MyFilterAction,)
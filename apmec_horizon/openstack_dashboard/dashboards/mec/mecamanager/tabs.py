@@ -16,6 +16,7 @@ from horizon import tabs
 
 from apmec_horizon.openstack_dashboard import api
 from apmec_horizon.openstack_dashboard.dashboards.mec.mecamanager import tables
+from apmec_horizon.openstack_dashboard.dashboards.mec import store
 from apmec_horizon.openstack_dashboard.dashboards.mec import utils
 
 
@@ -31,25 +32,14 @@ class MECAManagerTab(tabs.TableTab):
 
     def get_mecamanager_data(self):
         try:
-            self._has_more = True
-            tables.MECAManagerItemList.clear_list()
-            mecas = api.apmec.meca_list(self.request)
-            for meca in mecas:
-                try:
-                    meca_desc_str = meca['description']
-                except KeyError:
-                    meca_desc_str = ""
-
-                vim = meca['vim_id']
-                obj = tables.MECAManagerItem(
-                    meca['name'],
-                    meca_desc_str,
-                    vim,
-                    meca['status'],
-                    meca['id'],
-                    meca['error_reason'])
-                tables.MECAManagerItemList.add_item(obj)
-            return tables.MECAManagerItemList.MECALIST_P
+            marker = self.request.GET.get(
+                tables.MECAManagerTable._meta.pagination_param, None)
+            table = self._tables[tables.MECAManagerTable._meta.name]
+            filters, matches = utils.get_filters(self.request, table)
+            mecas, self._has_more, table.scan_marker = store.list_page(
+                self.request, 'mecas', api.apmec.meca_list, marker, matches,
+                **filters)
+            return tables.get_meca_items(mecas)
         except Exception:
             self._has_more = False
             error_message = _('Unable to get instances')
@@ -64,35 +54,8 @@ class MECAManagerTabs(tabs.TabGroup):
     sticky = True
 
 
-class MECAEventsTab(tabs.TableTab):
-    name = _("Events Tab")
-    slug = "events_tab"
-    table_classes = (utils.EventsTable,)
-    template_name = ("horizon/common/_detail_table.html")
-    preload = False
-
-    def has_more_data(self, table):
-        return self._has_more
-
-    def get_events_data(self):
-        try:
-            self._has_more = True
-            utils.EventItemList.clear_list()
-            events = api.apmec.events_list(self.request,
-                                            self.tab_group.kwargs['meca_id'])
-            for event in events:
-                evt_obj = utils.EventItem(
-                    event['id'], event['resource_state'],
-                    event['event_type'],
-                    event['timecatamp'],
-                    event['event_details'])
-                utils.EventItemList.add_item(evt_obj)
-            return utils.EventItemList.EVTLIST_P
-        except Exception as e:
-            self._has_more = False
-            error_message = _('Unable to get events %s') % e
-            exceptions.handle(self.request, error_message)
-            return []
+class MECAEventsTab(utils.EventsTab):
+    resource_kwarg = 'meca_id'
 
 
 class MECADetailsTabs(tabs.TabGroup):
@@ -14,9 +14,13 @@
 from django.conf.urls import url
 
 from apmec_horizon.openstack_dashboard.dashboards.mec.mecamanager import views
+from apmec_horizon.openstack_dashboard.dashboards.mec import utils
 
 urlpatterns = [
     url(r'^$', views.IndexView.as_view(), name='index'),
     url(r'^deploymes$', views.DeployMECAView.as_view(), name='deploymes'),
     url(r'^(?P<mes_id>[^/]+)/$', views.DetailView.as_view(), name='detail'),
+    url(r'^export$', views.ExportView.as_view(), name='export'),
+    url(r'^(?P<mes_id>[^/]+)/events/export$',
+        utils.ExportEventsView.as_view(), name='export_events'),
 ]
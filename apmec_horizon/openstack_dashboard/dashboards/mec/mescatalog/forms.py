@@ -18,6 +18,8 @@ from horizon import forms
 from horizon import messages
 
 from apmec_horizon.openstack_dashboard import api
+from apmec_horizon.openstack_dashboard.dashboards.mec import tosca
+from apmec_horizon.openstack_dashboard.dashboards.mec import utils
 
 
 class OnBoardMES(forms.SelfHandlingForm):
@@ -74,11 +76,18 @@ class OnBoardMES(forms.SelfHandlingForm):
 
         try:
             if toscal_file:
-                toscal_str = self.files['toscal_file'].read()
+                if toscal_file.name.endswith('.csar'):
+                    toscal_str = utils.read_csar_definitions(toscal_file)
+                else:
+                    toscal_str = utils.read_upload(toscal_file)
             else:
                 toscal_str = data['direct_input']
-            # toscal = yaml.loads(toscal_str)
+            errors = tosca.validate(toscal_str)
+            if errors:
+                raise ValidationError(errors)
             data['tosca'] = toscal_str
+        except ValidationError:
+            raise
         except Exception as e:
             msg = _('There was a problem loading the namespace: %s.') % e
             raise forms.ValidationError(msg)
@@ -18,13 +18,20 @@ from horizon import tables
 
 from openstack_dashboard import policy
 from apmec_horizon.openstack_dashboard import api
+from apmec_horizon.openstack_dashboard.dashboards.mec import utils
 
 
-class MyFilterAction(tables.FilterAction):
+class MyFilterAction(utils.ServerFilterAction):
     name = "myfilter"
+    filter_choices = (('name', _("Name ="), True),
+                      ('description', _("Description"), False))
+    local_filters = {
+        'description': lambda mesd: mesd.get('description'),
+    }
 
 
-class DeleteMESD(policy.PolicyTargetMixin, tables.DeleteAction):
+class DeleteMESD(policy.PolicyTargetMixin, utils.ConcurrentBatchMixin,
+                 tables.DeleteAction):
     @staticmethod
     def action_present(count):
         return ungettext_lazy(
@@ -43,6 +50,7 @@ class DeleteMESD(policy.PolicyTargetMixin, tables.DeleteAction):
 
     def action(self, request, obj_id):
         api.apmec.delete_mesd(request, obj_id)
+        utils.purge_fragments(obj_id)
 
 
 class OnBoardMES(tables.LinkAction):
@@ -53,7 +61,7 @@ class OnBoardMES(tables.LinkAction):
     url = "horizon:mec:mescatalog:onboardmes"
 
 
-class MESCatalogTable(tables.DataTable):
+class MESCatalogTable(utils.ScanMarkerMixin, tables.DataTable):
     name = tables.Column('name',
                          link="horizon:mec:mescatalog:detail",
                          verbose_name=_("Name"))
@@ -65,4 +73,6 @@ class MESCatalogTable(tables.DataTable):
     class Meta(object):
         name = "mescatalog"
         verbose_name = _("MESCatalog")
-        table_actions = (OnBoardMES, DeleteMESD, MyFilterAction,)
+        table_actions = (OnBoardMES, DeleteMESD,
+                         utils.ExportAction, utils.ExportJSONAction,
+                         MyFilterAction,)
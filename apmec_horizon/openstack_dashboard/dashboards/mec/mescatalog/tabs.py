@@ -18,16 +18,26 @@ from horizon import tabs
 
 from apmec_horizon.openstack_dashboard import api
 from apmec_horizon.openstack_dashboard.dashboards.mec.mescatalog import tables
+from apmec_horizon.openstack_dashboard.dashboards.mec import store
 from apmec_horizon.openstack_dashboard.dashboards.mec import utils
 
 
-class MESCatalogItem(object):
+class MESCatalogItem(utils.BaseItem):
+    __slots__ = ('id', 'name', 'description')
+
     def __init__(self, name, description, mesd_id):
         self.id = mesd_id
         self.name = name
         self.description = description
 
 
+def get_mesd_items(mesds):
+    """Build MESCatalogItems for a list of mesds in one pass."""
+    new = MESCatalogItem
+    return [new(mesd['name'], mesd['description'], mesd['id'])
+            for mesd in mesds]
+
+
 class MESCatalogTab(tabs.TableTab):
     name = _("MESCatalog Tab")
     slug = "mescatalog_tab"
@@ -40,15 +50,14 @@ class MESCatalogTab(tabs.TableTab):
 
     def get_mescatalog_data(self):
         try:
-            self._has_more = False
-            instances = []
-            mesds = api.apmec.mesd_list(self.request)
-            for mesd in mesds:
-                item = MESCatalogItem(mesd['name'],
-                                     mesd['description'],
-                                     mesd['id'])
-                instances.append(item)
-            return instances
+            marker = self.request.GET.get(
+                tables.MESCatalogTable._meta.pagination_param, None)
+            table = self._tables[tables.MESCatalogTable._meta.name]
+            filters, matches = utils.get_filters(self.request, table)
+            mesds, self._has_more, table.scan_marker = store.list_page(
+                self.request, 'mesds', api.apmec.mesd_list, marker, matches,
+                **filters)
+            return get_mesd_items(mesds)
         except Exception:
             self._has_more = False
             error_message = _('Unable to get instances')
@@ -63,44 +72,20 @@ class MESCatalogTabs(tabs.TabGroup):
     sticky = True
 
 
-class TemplateTab(tabs.Tab):
+class TemplateTab(utils.CachedFragmentMixin, tabs.Tab):
     name = _("Template")
     slug = "template"
     template_name = ("mec/mescatalog/template.html")
 
+    def get_resource(self):
+        return self.tab_group.kwargs['mesd']['mesd']
+
     def get_context_data(self, request):
         return {'mesd': self.tab_group.kwargs['mesd']}
 
 
-class MESDEventsTab(tabs.TableTab):
-    name = _("Events Tab")
-    slug = "events_tab"
-    table_classes = (utils.EventsTable,)
-    template_name = ("horizon/common/_detail_table.html")
-    preload = False
-
-    def has_more_data(self, table):
-        return self._has_more
-
-    def get_events_data(self):
-        try:
-            self._has_more = True
-            utils.EventItemList.clear_list()
-            events = api.apmec.events_list(self.request,
-                                            self.tab_group.kwargs['mesd_id'])
-            for event in events:
-                evt_obj = utils.EventItem(
-                    event['id'], event['resource_state'],
-                    event['event_type'],
-                    event['timestamp'],
-                    event['event_details'])
-                utils.EventItemList.add_item(evt_obj)
-            return utils.EventItemList.EVTLIST_P
-        except Exception as e:
-            self._has_more = False
-            error_message = _('Unable to get events %s') % e
-            exceptions.handle(self.request, error_message)
-            return []
+class MESDEventsTab(utils.EventsTab):
+    resource_kwarg = 'mesd_id'
 
 
 class MESDDetailTabs(tabs.TabGroup):
@@ -24,8 +24,11 @@ from horizon.utils import memoized
 from openstack_dashboard import api
 
 from apmec_horizon.openstack_dashboard import api as apmec_api
+from apmec_horizon.openstack_dashboard.dashboards.mec import utils
 from apmec_horizon.openstack_dashboard.dashboards.mec.mescatalog \
     import tabs as mec_tabs
+from apmec_horizon.openstack_dashboard.dashboards.mec.mescatalog \
+    import tables as mec_tables
 
 from apmec_horizon.openstack_dashboard.dashboards.mec.mescatalog \
     import forms as project_forms
@@ -41,6 +44,12 @@ class IndexView(tabs.TabbedTableView):
         return context
 
 
+class ExportView(utils.ExportView):
+    table_class = mec_tables.MESCatalogTable
+    collection = 'mesds'
+    build_items = staticmethod(mec_tabs.get_mesd_items)
+
+
 class OnBoardMESView(forms.ModalFormView):
     form_class = project_forms.OnBoardMES
     template_name = 'mec/mescatalog/onboardmes.html'
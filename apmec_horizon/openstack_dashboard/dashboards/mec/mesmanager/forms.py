@@ -10,6 +10,8 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import functools
+
 from django.forms import ValidationError
 from django.utils.translation import ugettext_lazy as _
 from oslo_log import log as logging
@@ -19,6 +21,7 @@ from horizon import forms
 from horizon import messages
 
 from apmec_horizon.openstack_dashboard import api
+from apmec_horizon.openstack_dashboard.dashboards.mec import utils
 
 LOG = logging.getLogger(__name__)
 
@@ -83,24 +86,25 @@ class DeployMES(forms.SelfHandlingForm):
     def __init__(self, request, *args, **kwargs):
         super(DeployMES, self).__init__(request, *args, **kwargs)
 
-        try:
-            mesd_list = api.apmec.mesd_list(request)
-            available_choices_mesd = [(mes['id'], mes['name']) for mes in
-                                     mesd_list]
-        except Exception as e:
-            available_choices_mesd = []
-            msg = _('Failed to retrieve available MES Catalog names: %s') % e
-            LOG.error(msg)
+        (mesd_list, mesd_error), (vim_list, vim_error) = \
+            utils.call_with_deadline([
+                functools.partial(api.apmec.mesd_list, request),
+                functools.partial(api.apmec.vim_list, request)])
 
-        try:
-            vim_list = api.apmec.vim_list(request)
-            available_choices_vims = [(vim['id'], vim['name']) for vim in
-                                      vim_list]
+        available_choices_mesd = [(mes['id'], mes['name']) for mes in
+                                  mesd_list or []]
+        if mesd_error:
+            msg = _('Failed to retrieve available MES Catalog names: %s') % \
+                mesd_error
+            LOG.error(msg)
+            messages.error(request, msg)
 
-        except Exception as e:
-            available_choices_vims = []
-            msg = _('Failed to retrieve available VIM names: %s') % e
+        available_choices_vims = [(vim['id'], vim['name']) for vim in
+                                  vim_list or []]
+        if vim_error:
+            msg = _('Failed to retrieve available VIM names: %s') % vim_error
             LOG.error(msg)
+            messages.error(request, msg)
 
         self.fields['mesd_id'].choices = [('', _('Select a MES Catalog Name'))
                                          ]+available_choices_mesd
@@ -123,7 +127,7 @@ class DeployMES(forms.SelfHandlingForm):
                 _("Please upload .yaml file only."))
 
         if param_file:
-            data['param_values'] = self.files['param_file'].read()
+            data['param_values'] = utils.read_upload(param_file)
         elif param_raw:
             data['param_values'] = data['direct_input']
         else:
@@ -140,7 +144,7 @@ class DeployMES(forms.SelfHandlingForm):
             raise ValidationError(_("Only .yaml file uploads supported"))
 
         if config_file:
-            data['config_values'] = self.files['config_file'].read()
+            data['config_values'] = utils.read_upload(config_file)
         elif config_raw:
             data['config_values'] = data['config_input']
         else:
@@ -20,10 +20,14 @@ from horizon import tables
 
 from openstack_dashboard import policy
 from apmec_horizon.openstack_dashboard import api
+from apmec_horizon.openstack_dashboard.dashboards.mec import utils
 from apmecclient.common.exceptions import NotFound
 
 
-class MESManagerItem(object):
+class MESManagerItem(utils.BaseItem):
+    __slots__ = ('name', 'description', 'vim', 'status', 'id',
+                 'error_reason')
+
     def __init__(self, name, description, vim, status,
                  mes_id, error_reason):
         self.name = name
@@ -34,31 +38,31 @@ class MESManagerItem(object):
         self.error_reason = error_reason
 
 
-class MESManagerItemList(object):
-    MESLIST_P = []
-
-    @classmethod
-    def get_obj_given_stack_ids(cls, mes_id):
-        for obj in cls.MESLIST_P:
-            if obj.id == mes_id:
-                return obj
+def get_mes_items(mess):
+    """Build MESManagerItems for a list of mess in one pass."""
+    new = MESManagerItem
+    return [new(mes['name'], mes.get('description', ""), str(mes['vim_id']),
+                mes['status'], mes['id'], mes['error_reason'])
+            for mes in mess]
 
-    @classmethod
-    def add_item(cls, item):
-        cls.MESLIST_P.append(item)
 
-    @classmethod
-    def clear_list(cls):
-        cls.MESLIST_P = []
+def get_mes_item(mes):
+    """Build a MESManagerItem from a mes returned by the apmec API."""
+    return get_mes_items([mes])[0]
 
 
-class MyFilterAction(tables.FilterAction):
+class MyFilterAction(utils.ServerFilterAction):
     name = "myfilter"
+    filter_choices = (('name', _("Name ="), True),
+                      ('status', _("Status ="), True),
+                      ('vim_id', _("VIM ID ="), True),
+                      ('description', _("Description"), False))
+    local_filters = {
+        'description': lambda mes: mes.get('description'),
+    }
 
 
-class MESUpdateRow(tables.Row):
-    ajax = True
-
+class MESUpdateRow(utils.BulkUpdateRow):
     def can_be_selected(self, datum):
         return datum.status != 'DELETE_COMPLETE'
 
@@ -69,35 +73,11 @@ class MESUpdateRow(tables.Row):
                 # returning 404 to the ajax call removes the
                 # row from the table on the ui
             #    raise Http404
-            item = MESManagerItemList.get_obj_given_stack_ids(mes_id)
             mes_instance = api.apmec.get_mes(request, mes_id)
-
-            if not mes_instance and not item:
+            if not mes_instance:
                 # TODO(NAME) - bail with error
                 return None
-
-            if not mes_instance and item:
-                # API failure, just keep the current state
-                return item
-
-            mes = mes_instance['mes']
-            try:
-                mes_desc_str = mes['description']
-            except KeyError:
-                mes_desc_str = ""
-
-            vim = mes['vim_id']
-            if not item:
-                # Add an item entry
-                item = MESManagerItem(mes['name'], mes_desc_str,
-                                     str(vim),
-                                     mes['status'], mes['id'],
-                                     mes['error_reason'])
-            else:
-                item.description = mes_desc_str
-                item.status = mes['status']
-                item.id = mes['id']
-            return item
+            return get_mes_item(mes_instance['mes'])
         except (Http404, NotFound):
             raise Http404
         except Exception as e:
@@ -105,7 +85,8 @@ class MESUpdateRow(tables.Row):
             raise
 
 
-class DeleteMES(policy.PolicyTargetMixin, tables.DeleteAction):
+class DeleteMES(policy.PolicyTargetMixin, utils.ConcurrentBatchMixin,
+                tables.DeleteAction):
     @staticmethod
     def action_present(count):
         return ungettext_lazy(
@@ -134,7 +115,8 @@ class DeployMES(tables.LinkAction):
     url = "horizon:mec:mecamanager:deploymes"
 
 
-class MESManagerTable(tables.DataTable):
+class MESManagerTable(utils.BulkRowUpdateMixin, utils.ScanMarkerMixin,
+                      tables.DataTable):
     STATUS_CHOICES = (
         ("ACTIVE", True),
         ("ERROR", False),
@@ -151,9 +133,17 @@ class MESManagerTable(tables.DataTable):
     error_reason = tables.Column("error_reason",
                                  verbose_name=_("Error Reason"))
 
+    def get_rows_data(self, request, obj_ids):
+        mess = utils.get_resources_by_id(request, api.apmec.mes_list,
+                                         api.apmec.get_mes, 'mes', obj_ids)
+        return dict((mes_id, get_mes_item(mes))
+                    for mes_id, mes in mess.items())
+
     class Meta(object):
         name = "mecamanager"
         verbose_name = _("MESManager")
         status_columns = ["status", ]
         row_class = MESUpdateRow
-        table_actions = (DeployMES, DeleteMES, MyFilterAction,)
+        table_actions = (DeployMES, DeleteMES,
+                         utils.ExportAction, utils.ExportJSONAction,
+                         MyFilterAction,)
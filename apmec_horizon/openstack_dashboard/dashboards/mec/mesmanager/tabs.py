@@ -16,6 +16,7 @@ from horizon import tabs
 
 from apmec_horizon.openstack_dashboard import api
 from apmec_horizon.openstack_dashboard.dashboards.mec.mesmanager import tables
+from apmec_horizon.openstack_dashboard.dashboards.mec import store
 from apmec_horizon.openstack_dashboard.dashboards.mec import utils
 
 
@@ -31,25 +32,14 @@ class MESManagerTab(tabs.TableTab):
 
     def get_mesmanager_data(self):
         try:
-            self._has_more = True
-            tables.MESManagerItemList.clear_list()
-            mess = api.apmec.mes_list(self.request)
-            for mes in mess:
-                try:
-                    mes_desc_str = mes['description']
-                except KeyError:
-                    mes_desc_str = ""
-
-                vim = mes['vim_id']
-                obj = tables.MESManagerItem(
-                    mes['name'],
-                    mes_desc_str,
-                    vim,
-                    mes['status'],
-                    mes['id'],
-                    mes['error_reason'])
-                tables.MESManagerItemList.add_item(obj)
-            return tables.MESManagerItemList.MESLIST_P
+            marker = self.request.GET.get(
+                tables.MESManagerTable._meta.pagination_param, None)
+            table = self._tables[tables.MESManagerTable._meta.name]
+            filters, matches = utils.get_filters(self.request, table)
+            mess, self._has_more, table.scan_marker = store.list_page(
+                self.request, 'mess', api.apmec.mes_list, marker, matches,
+                **filters)
+            return tables.get_mes_items(mess)
         except Exception:
             self._has_more = False
             error_message = _('Unable to get instances')
@@ -64,35 +54,8 @@ class MESManagerTabs(tabs.TabGroup):
     sticky = True
 
 
-class MESEventsTab(tabs.TableTab):
-    name = _("Events Tab")
-    slug = "events_tab"
-    table_classes = (utils.EventsTable,)
-    template_name = ("horizon/common/_detail_table.html")
-    preload = False
-
-    def has_more_data(self, table):
-        return self._has_more
-
-    def get_events_data(self):
-        try:
-            self._has_more = True
-            utils.EventItemList.clear_list()
-            events = api.apmec.events_list(self.request,
-                                            self.tab_group.kwargs['mes_id'])
-            for event in events:
-                evt_obj = utils.EventItem(
-                    event['id'], event['resource_state'],
-                    event['event_type'],
-                    event['timestamp'],
-                    event['event_details'])
-                utils.EventItemList.add_item(evt_obj)
-            return utils.EventItemList.EVTLIST_P
-        except Exception as e:
-            self._has_more = False
-            error_message = _('Unable to get events %s') % e
-            exceptions.handle(self.request, error_message)
-            return []
+class MESEventsTab(utils.EventsTab):
+    resource_kwarg = 'mes_id'
 
 
 class MESDetailsTabs(tabs.TabGroup):
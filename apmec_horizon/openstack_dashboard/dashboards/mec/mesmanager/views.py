@@ -21,11 +21,14 @@ from horizon import tabs
 from horizon.utils import memoized
 
 from apmec_horizon.openstack_dashboard import api as apmec_api
+from apmec_horizon.openstack_dashboard.dashboards.mec import utils
 from apmec_horizon.openstack_dashboard.dashboards.mec.mesmanager \
     import forms as project_forms
 
 from apmec_horizon.openstack_dashboard.dashboards.mec.mesmanager \
     import tabs as mec_tabs
+from apmec_horizon.openstack_dashboard.dashboards.mec.mesmanager \
+    import tables as mec_tables
 
 LOG = logging.getLogger(__name__)
 
@@ -40,6 +43,12 @@ class IndexView(tabs.TabbedTableView):
         return context
 
 
+class ExportView(utils.ExportView):
+    table_class = mec_tables.MESManagerTable
+    collection = 'mess'
+    build_items = staticmethod(mec_tables.get_mes_items)
+
+
 class DeployMESView(forms.ModalFormView):
     form_class = project_forms.DeployMES
     template_name = 'mec/mecamanager/deploy_meca.html'
@@ -1 +1,142 @@
 /* Additional JavaScript for mec. */
+
+/*
+ * Batched status polling for MEC tables.
+ *
+ * Rows rendered with the "ajax-bulk-update" class are refreshed with one
+ * request per table (see utils.BulkRowUpdateMixin) instead of Horizon's
+ * default of one request per pending row.
+ */
+horizon.mec = {
+  // Maximum number of ids sent in one bulk refresh request.
+  bulk_chunk_size: 100,
+  bulk_timer: null,
+  bulk_decay: 0,
+
+  schedule_bulk_update: function (delay) {
+    if (horizon.mec.bulk_timer === null) {
+      horizon.mec.bulk_timer = setTimeout(horizon.mec.bulk_update, delay);
+    }
+  },
+
+  bulk_update: function () {
+    var $rows = $('tr.warning.ajax-bulk-update');
+    var interval = $rows.attr('data-update-interval');
+    var groups = {};
+    var requests = [];
+
+    horizon.mec.bulk_timer = null;
+    if ($rows.length <= 0) {
+      horizon.mec.bulk_decay = 0;
+      return;
+    }
+
+    // Do not refresh while an action menu is open, try again later.
+    if ($rows.find('.actions_column .btn-group.open').length) {
+      horizon.mec.schedule_bulk_update(interval);
+      return;
+    }
+
+    $rows.each(function () {
+      var $row = $(this);
+      var url = $row.attr('data-bulk-update-url');
+      groups[url] = groups[url] || [];
+      groups[url].push($row);
+    });
+
+    $.each(groups, function (url, rows) {
+      var i;
+      for (i = 0; i < rows.length; i += horizon.mec.bulk_chunk_size) {
+        requests.push(horizon.mec.update_rows(
+          url, rows.slice(i, i + horizon.mec.bulk_chunk_size)));
+      }
+    });
+
+    $.when.apply($, requests).always(function () {
+      var next_poll;
+      horizon.mec.bulk_decay++;
+      next_poll = interval * horizon.mec.bulk_decay;
+      // Limit the interval to 30 secs, as Horizon does.
+      if (next_poll > 30 * 1000) {
+        next_poll = 30 * 1000;
+      }
+      horizon.mec.schedule_bulk_update(next_poll);
+    });
+  },
+
+  remove_row: function ($row, $table) {
+    var row_count = horizon.datatables.update_footer_count($table, -1);
+    var colspan, template, params;
+
+    if (row_count === 0) {
+      colspan = $table.find('.table_column_header th').length;
+      template = horizon.templates.compiled_templates["#empty_row_template"];
+      params = {
+        "colspan": colspan,
+        no_items_label: gettext("No items to display.")
+      };
+      $row.replaceWith(template.render(params));
+    } else {
+      $row.remove();
+    }
+  },
+
+  update_rows: function (url, rows) {
+    var ids = $.map(rows, function ($row) {
+      return $row.attr('data-object-id');
+    });
+
+    return horizon.ajax.queue({
+      url: url,
+      data: {obj_id: ids},
+      traditional: true,
+      dataType: 'json',
+      error: function () {
+        console.log(gettext("An error occurred while updating."));
+      },
+      success: function (data) {
+        $.each(rows, function (i, $row) {
+          var $table = $row.closest('table');
+          var html = data[$row.attr('data-object-id')];
+          var $new_row;
+
+          if (html === undefined) {
+            // The object is gone, drop its row from the table.
+            horizon.mec.remove_row($row, $table);
+          } else {
+            $new_row = $(html);
+            // Only replace the row if its content has changed.
+            if ($new_row.html() === $row.html()) {
+              return;
+            }
+            if ($row.find('.table-row-multi-select:checkbox').is(':checked')) {
+              $new_row.find('.table-row-multi-select:checkbox')
+                .prop('checked', true);
+            }
+            $row.replaceWith($new_row);
+            horizon.mec.bulk_decay = 0;
+          }
+          // Reset tablesorter's and quicksearch's data cache.
+          $table.trigger("update");
+          if ($table.attr('id') in horizon.datatables.qs) {
+            horizon.datatables.qs[$table.attr('id')].cache();
+          }
+        });
+        horizon.datatables.update_actions();
+      },
+      complete: function () {
+        horizon.datatables.validate_button();
+      }
+    });
+  }
+};
+
+(function () {
+  // Horizon calls datatables.update whenever tables are (re)loaded, so
+  // piggyback on it to (re)start the batched poller as well.
+  var update = horizon.datatables.update;
+  horizon.datatables.update = function () {
+    horizon.mec.schedule_bulk_update(0);
+    return update.apply(this, arguments);
+  };
+})();
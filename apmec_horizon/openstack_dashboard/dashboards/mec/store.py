@@ -0,0 +1,540 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Local SQLite store of the apmec events feed and resource mirror.
+
+Events never change once recorded, so they are copied once into a local
+database and queried there with indexes instead of listing the whole
+feed from the API. The events of each scope, a project as seen by its
+members or its admins, are synced incrementally in ascending id order,
+so an interrupted sync resumes where it stopped.
+
+The optional resource mirror keeps the collections listed by the panels
+up to date from those events, with periodic full resyncs, so lists are
+read locally whatever the load of the API.
+"""
+
+import functools
+import itertools
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django import dispatch
+from oslo_log import log as logging
+
+from horizon.utils import functions
+
+from apmec_horizon.openstack_dashboard import api
+from apmec_horizon.openstack_dashboard.dashboards.mec import utils
+from apmecclient.common.exceptions import NotFound
+
+LOG = logging.getLogger(__name__)
+
+EVENT_FIELDS = ('id', 'resource_id', 'resource_type', 'resource_state',
+                'event_type', 'timestamp', 'event_details')
+
+_EVENT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    scope TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    resource_id TEXT,
+    resource_type TEXT,
+    resource_state TEXT,
+    event_type TEXT,
+    timestamp TEXT,
+    event_details TEXT,
+    PRIMARY KEY (scope, id)
+);
+CREATE INDEX IF NOT EXISTS events_timestamp
+    ON events (scope, timestamp, id);
+CREATE INDEX IF NOT EXISTS events_resource_id
+    ON events (scope, resource_id, timestamp, id);
+CREATE INDEX IF NOT EXISTS events_event_type
+    ON events (scope, event_type, timestamp, id);
+CREATE INDEX IF NOT EXISTS events_resource_type
+    ON events (scope, resource_type, timestamp, id);
+"""
+
+# Filters of EventStore.query and the condition each one adds.
+_FILTERS = {
+    'resource_id': 'resource_id = ?',
+    'resource_type': 'resource_type = ?',
+    'event_type': 'event_type = ?',
+    'since': 'timestamp >= ?',
+    'until': 'timestamp < ?',
+}
+
+
+class _Database(object):
+    """Tables of ``schema`` in a SQLite database file.
+
+    Each thread uses its own connection. The database runs in WAL mode so
+    the web server processes sharing the file can read while one writes.
+    """
+    schema = None
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connect(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            if self.path != ':memory:':
+                # The file holds the data of every project, so only the
+                # dashboard's own user may read it.
+                os.close(os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600))
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.row_factory = sqlite3.Row
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._upgrade(connection)
+            connection.executescript(self.schema)
+            self._local.connection = connection
+        return connection
+
+    def _upgrade(self, connection):
+        pass
+
+
+class EventStore(_Database):
+    """Events of every scope synced."""
+    schema = _EVENT_SCHEMA
+
+    def _upgrade(self, connection):
+        # Early stores keyed events by project alone, mixing what members
+        # and admins may see. They are dropped and synced again.
+        columns = [row[1] for row
+                   in connection.execute('PRAGMA table_info(events)')]
+        if columns and 'scope' not in columns:
+            with connection:
+                connection.execute('DROP TABLE events')
+
+    def last_id(self, scope):
+        """Return the id of the newest event stored for a scope."""
+        row = self._connect().execute(
+            'SELECT MAX(id) FROM events WHERE scope = ?',
+            (scope,)).fetchone()
+        return row[0]
+
+    def add(self, scope, events):
+        """Store events of a scope, skipping those already stored."""
+        connection = self._connect()
+        with connection:
+            connection.executemany(
+                'INSERT OR IGNORE INTO events (scope, %s) '
+                'VALUES (?, %s)' % (', '.join(EVENT_FIELDS),
+                                    ', '.join('?' * len(EVENT_FIELDS))),
+                [(scope,) + tuple(_column(event.get(field))
+                                  for field in EVENT_FIELDS)
+                 for event in events])
+
+    def query(self, scope, marker=None, limit=None, **filters):
+        """Return the stored events of a scope, newest first.
+
+        ``filters`` are any of resource_id, resource_type, event_type and
+        the time window bounds since and until. ``marker`` is the id of
+        the last event of the previous page.
+        """
+        conditions = ['scope = ?']
+        params = [scope]
+        for name, value in sorted(filters.items()):
+            if value:
+                conditions.append(_FILTERS[name])
+                params.append(value)
+        if marker is not None:
+            conditions.append('(timestamp < (SELECT timestamp FROM events '
+                              'WHERE scope = ? AND id = ?) OR '
+                              '(timestamp = (SELECT timestamp FROM events '
+                              'WHERE scope = ? AND id = ?) AND id < ?))')
+            params.extend((scope, marker, scope, marker, marker))
+        sql = ('SELECT %s FROM events WHERE %s '
+               'ORDER BY timestamp DESC, id DESC' %
+               (', '.join(EVENT_FIELDS), ' AND '.join(conditions)))
+        if limit is not None:
+            sql += ' LIMIT %d' % limit
+        return [dict(row) for row in self._connect().execute(sql, params)]
+
+    def changed_resources(self, scope, resource_type, after=None):
+        """Return the ids of the resources with events after an event."""
+        sql = ('SELECT DISTINCT resource_id FROM events '
+               'WHERE scope = ? AND resource_type = ?')
+        params = [scope, resource_type]
+        if after is not None:
+            sql += ' AND id > ?'
+            params.append(after)
+        return [row[0] for row in self._connect().execute(sql, params)]
+
+
+_MIRROR_SCHEMA = """
+CREATE TABLE IF NOT EXISTS resources (
+    scope TEXT NOT NULL,
+    collection TEXT NOT NULL,
+    id TEXT NOT NULL,
+    name TEXT,
+    status TEXT,
+    body TEXT NOT NULL,
+    PRIMARY KEY (scope, collection, id)
+);
+CREATE INDEX IF NOT EXISTS resources_name
+    ON resources (scope, collection, name, id);
+CREATE INDEX IF NOT EXISTS resources_status
+    ON resources (scope, collection, status, id);
+CREATE TABLE IF NOT EXISTS mirror_state (
+    scope TEXT NOT NULL,
+    collection TEXT NOT NULL,
+    synced_at REAL NOT NULL,
+    event_id INTEGER,
+    generation TEXT,
+    PRIMARY KEY (scope, collection)
+);
+CREATE TABLE IF NOT EXISTS mirror_writes (
+    scope TEXT NOT NULL,
+    collection TEXT NOT NULL,
+    generation TEXT NOT NULL,
+    PRIMARY KEY (scope, collection)
+);
+"""
+
+# Collections mirrored and the resource type of their events.
+RESOURCE_TYPES = {
+    'meas': 'mea',
+    'meads': 'mead',
+    'vims': 'vim',
+    'mess': 'mes',
+    'mesds': 'mesd',
+    'mecas': 'meca',
+}
+
+
+class ResourceMirror(_Database):
+    """Local copy of the apmec collections listed by the MEC panels.
+
+    Rows keep the API dict as JSON. Name and status are also columns,
+    indexed for the filters the panels pass to the API. Writes made
+    through the dashboard change the generation of a collection, kept in
+    the database so that every web server process sharing it sees them.
+    """
+    schema = _MIRROR_SCHEMA
+
+    def _upgrade(self, connection):
+        columns = [row[1] for row
+                   in connection.execute('PRAGMA table_info(mirror_state)')]
+        if columns and 'generation' not in columns:
+            with connection:
+                connection.execute(
+                    'ALTER TABLE mirror_state ADD COLUMN generation TEXT')
+
+    def get_state(self, scope, collection):
+        """Return when a collection was last fully synced, up to which
+        event it has been kept in sync since, and the generation it was
+        last read at.
+        """
+        row = self._connect().execute(
+            'SELECT synced_at, event_id, generation FROM mirror_state '
+            'WHERE scope = ? AND collection = ?',
+            (scope, collection)).fetchone()
+        return tuple(row) if row else None
+
+    def get_generation(self, scope, collection):
+        """Return a token changed by each dashboard write to a collection."""
+        row = self._connect().execute(
+            'SELECT generation FROM mirror_writes '
+            'WHERE scope = ? AND collection = ?',
+            (scope, collection)).fetchone()
+        return row[0] if row else ''
+
+    def mark_written(self, scope, collection):
+        """Change the generation of a collection the dashboard wrote to."""
+        connection = self._connect()
+        with connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO mirror_writes '
+                '(scope, collection, generation) VALUES (?, ?, ?)',
+                (scope, collection, uuid.uuid4().hex))
+
+    def replace(self, scope, collection, items, event_id, generation=None):
+        """Replace a whole collection, as listed after event ``event_id``."""
+        connection = self._connect()
+        with connection:
+            connection.execute(
+                'DELETE FROM resources WHERE scope = ? AND collection = ?',
+                (scope, collection))
+            self._upsert(connection, scope, collection, items)
+            connection.execute(
+                'INSERT OR REPLACE INTO mirror_state '
+                '(scope, collection, synced_at, event_id, generation) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (scope, collection, time.time(), event_id, generation))
+
+    def update(self, scope, collection, items, deleted_ids, event_id,
+               generation=None):
+        """Apply the changes found up to event ``event_id``."""
+        connection = self._connect()
+        with connection:
+            connection.executemany(
+                'DELETE FROM resources '
+                'WHERE scope = ? AND collection = ? AND id = ?',
+                [(scope, collection, item_id) for item_id in deleted_ids])
+            self._upsert(connection, scope, collection, items)
+            connection.execute(
+                'UPDATE mirror_state SET event_id = ?, generation = ? '
+                'WHERE scope = ? AND collection = ?',
+                (event_id, generation, scope, collection))
+
+    def _upsert(self, connection, scope, collection, items):
+        connection.executemany(
+            'INSERT OR REPLACE INTO resources '
+            '(scope, collection, id, name, status, body) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            [(scope, collection, item['id'], item.get('name'),
+              item.get('status'), json.dumps(item)) for item in items])
+
+    def list(self, scope, collection, marker=None, limit=None, **filters):
+        """Return a page of a collection in id order, like the API.
+
+        Name and status filters use the indexes; other filters compare
+        the stored API dicts.
+        """
+        conditions = ['scope = ?', 'collection = ?']
+        params = [scope, collection]
+        for name in ('name', 'status'):
+            value = filters.pop(name, None)
+            if value:
+                conditions.append('%s = ?' % name)
+                params.append(value)
+        if marker:
+            conditions.append('id > ?')
+            params.append(marker)
+        cursor = self._connect().execute(
+            'SELECT body FROM resources WHERE %s ORDER BY id' %
+            ' AND '.join(conditions), params)
+
+        items = []
+        for row in cursor:
+            item = json.loads(row[0])
+            if all(u'%s' % item.get(name) == u'%s' % value
+                   for name, value in filters.items()):
+                items.append(item)
+                if limit is not None and len(items) >= limit:
+                    break
+        return items
+
+
+def _column(value):
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, sort_keys=True)
+    return u'%s' % value
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def _private_dir():
+    """Return a directory of the temp dir only this user may access."""
+    path = os.path.join(tempfile.gettempdir(),
+                        'apmec_horizon-%d' % os.getuid())
+    try:
+        os.mkdir(path, 0o700)
+    except OSError:
+        if not os.path.isdir(path):
+            raise
+    info = os.lstat(path)
+    if info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise RuntimeError('%s is not a private directory, set '
+                           'APMEC_EVENT_STORE_PATH elsewhere' % path)
+    return path
+
+
+def get_event_store():
+    """Return the event store at APMEC_EVENT_STORE_PATH.
+
+    By default the store is kept in a private directory of the temp dir.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            path = getattr(settings, 'APMEC_EVENT_STORE_PATH', None)
+            _store = EventStore(path or os.path.join(
+                _private_dir(), 'apmec_horizon_events.sqlite3'))
+        return _store
+
+
+_mirror = None
+
+
+def get_mirror():
+    """Return the resource mirror, kept alongside the event store."""
+    global _mirror
+    path = get_event_store().path
+    with _store_lock:
+        if _mirror is None:
+            _mirror = ResourceMirror(path)
+        return _mirror
+
+
+@dispatch.receiver(api.apmec.lists_invalidated)
+def _mark_mirror_written(sender, request, resources, **kwargs):
+    if not getattr(settings, 'APMEC_MIRROR_ENABLED', False):
+        return
+    mirror = get_mirror()
+    project_id = request.user.project_id
+    for collection in set(resources) & set(RESOURCE_TYPES):
+        # Both scopes of the project, as utils.get_scope() names them.
+        for scope in (project_id, '%s/admin' % project_id):
+            try:
+                mirror.mark_written(scope, collection)
+            except sqlite3.Error as e:
+                LOG.warning("Unable to mark the %s mirror of %s as "
+                            "written: %s", collection, scope, e)
+
+
+def sync_events(request, store=None):
+    """Copy the events recorded since the last sync into the store.
+
+    Pages are stored as they arrive. The sync stops after
+    APMEC_EVENT_SYNC_TIMEOUT seconds and the next one resumes from the
+    newest stored event. Return whether the store caught up.
+    """
+    store = store or get_event_store()
+    scope = utils.get_scope(request)
+    since = store.last_id(scope)
+    deadline = time.time() + getattr(settings, 'APMEC_EVENT_SYNC_TIMEOUT', 5)
+
+    params = {'sort_key': 'id', 'sort_dir': 'asc'}
+    if since is not None:
+        params['marker'] = since
+    for events in api.apmec.list_pages(request, 'events', **params):
+        if since is not None:
+            # Servers without pagination send the whole feed every time.
+            events = [event for event in events if event['id'] > since]
+        store.add(scope, events)
+        if time.time() > deadline:
+            LOG.debug("sync_events(): stopped at the time limit, "
+                      "scope=%s", scope)
+            return False
+    return True
+
+
+def reconcile(request, collection, mirror=None, event_store=None):
+    """Bring the mirror of a collection up to date with the API.
+
+    A collection never synced, or last fully synced more than
+    APMEC_MIRROR_RESYNC_INTERVAL seconds ago, is listed again in full.
+    Otherwise only the resources with new events are fetched again.
+    """
+    mirror = mirror or get_mirror()
+    event_store = event_store or get_event_store()
+    scope = utils.get_scope(request)
+    state = mirror.get_state(scope, collection)
+    # Read before the API, so a write made meanwhile bumps it again.
+    generation = mirror.get_generation(scope, collection)
+
+    # Events are synced first, so changes made while the collection is
+    # read are picked up by the next reconcile.
+    sync_events(request, event_store)
+    event_id = event_store.last_id(scope)
+
+    resync_interval = getattr(settings, 'APMEC_MIRROR_RESYNC_INTERVAL', 600)
+    if state is None or time.time() - state[0] > resync_interval:
+        items = [item for page in api.apmec.list_pages(request, collection)
+                 for item in page]
+        mirror.replace(scope, collection, items, event_id, generation)
+        LOG.debug("reconcile(): full sync, scope=%s, collection=%s, "
+                  "items=%d", scope, collection, len(items))
+        return
+
+    resource_type = RESOURCE_TYPES[collection]
+    get_func = getattr(api.apmec, 'get_%s' % resource_type)
+    items, deleted_ids = [], []
+    for resource_id in event_store.changed_resources(scope, resource_type,
+                                                     state[1]):
+        try:
+            items.append(get_func(request, resource_id)[resource_type])
+        except NotFound:
+            deleted_ids.append(resource_id)
+    mirror.update(scope, collection, items, deleted_ids, event_id,
+                  generation)
+    LOG.debug("reconcile(): scope=%s, collection=%s, updated=%d, "
+              "deleted=%d", scope, collection, len(items), len(deleted_ids))
+
+
+def mirror_list(request, collection, marker=None, **filters):
+    """Return a page of a mirrored collection, and whether more exist.
+
+    Only with APMEC_MIRROR_ENABLED set. Listing schedules a reconcile in
+    the background. None is returned, and the caller lists through the
+    API, while the mirror is off, the collection not yet synced, or the
+    dashboard wrote to the collection since the last reconcile.
+    """
+    if not getattr(settings, 'APMEC_MIRROR_ENABLED', False):
+        return None
+    scope = utils.get_scope(request)
+    # At most one reconcile of a collection runs per scope, and at most
+    # one starts every APMEC_MIRROR_SYNC_INTERVAL seconds.
+    utils.run_in_background(
+        ('reconcile', scope, collection),
+        functools.partial(reconcile, request, collection),
+        getattr(settings, 'APMEC_MIRROR_SYNC_INTERVAL', 10))
+    mirror = get_mirror()
+    state = mirror.get_state(scope, collection)
+    if state is None or state[2] != mirror.get_generation(scope,
+                                                          collection):
+        return None
+    page_size = functions.get_page_size(request)
+    items = mirror.list(scope, collection, marker=marker,
+                        limit=page_size + 1, **filters)
+    return items[:page_size], len(items) > page_size
+
+
+def list_page(request, collection, list_func, marker=None, matches=None,
+              **params):
+    """Return a page of a collection for a panel, and how to list more.
+
+    The result is the items, whether more exist, and the marker of the
+    next page. Pages come from the mirror when it is usable, else from
+    the list snapshot of ``list_func``. ``matches``, the predicate of a
+    local filter, drops items from each page fetched, so further pages
+    are fetched until the page is full or the listing ends, but at most
+    APMEC_FILTER_MAX_PAGES per call. When that many pages matched too
+    little, the page found so far is returned with the id of the last
+    item scanned as the next marker; otherwise the marker is None and
+    the next page starts after the last item returned.
+    """
+    page_size = functions.get_page_size(request)
+    max_pages = getattr(settings, 'APMEC_FILTER_MAX_PAGES', 5)
+    items = []
+    for scanned in itertools.count(1):
+        listing = mirror_list(request, collection, marker, **params)
+        if listing is None:
+            listing = utils.get_list_snapshot(
+                request, collection, list_func, marker=marker,
+                paginate=True, **params)
+        page, has_more = listing
+        if matches is None:
+            return page, has_more, None
+        items.extend(item for item in page if matches(item))
+        if len(items) > page_size:
+            return items[:page_size], True, None
+        if not has_more or not page:
+            return items, False, None
+        marker = page[-1]['id']
+        if scanned >= max_pages:
+            return items, True, marker
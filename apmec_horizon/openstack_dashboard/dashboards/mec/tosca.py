@@ -0,0 +1,547 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Local pre-flight checks of TOSCA templates.
+
+Templates are checked against the structure of the TOSCA simple profile
+and the MEC node types before they are sent to apmec, so that obvious
+mistakes are reported with their line and column without an API round
+trip. The checks are deliberately conservative: anything they accept may
+still be rejected by the server, but nothing valid is rejected here.
+"""
+
+import hashlib
+import re
+import time
+
+import six
+import yaml
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import translation
+from django.utils.translation import ugettext_lazy as _
+from oslo_log import log as logging
+
+from apmec_horizon.openstack_dashboard import api
+from apmec_horizon.openstack_dashboard.dashboards.mec import utils
+
+LOG = logging.getLogger(__name__)
+
+_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+ANY = {'type': 'any'}
+STRING = {'type': 'str'}
+MAP = {'type': 'map'}
+LIST = {'type': 'list'}
+
+NODE_TEMPLATE = {
+    'type': 'map',
+    'required': ('type',),
+    'keys': {
+        'type': STRING,
+        'description': STRING,
+        'metadata': MAP,
+        'directives': LIST,
+        'properties': MAP,
+        'attributes': MAP,
+        'requirements': {'type': 'list', 'items': {'type': 'map',
+                                                   'length': 1}},
+        'capabilities': MAP,
+        'interfaces': MAP,
+        'artifacts': MAP,
+        'node_filter': MAP,
+        'copy': STRING,
+    },
+}
+
+PARAMETER = {
+    'type': 'map',
+    'keys': {
+        'type': STRING,
+        'description': STRING,
+        'value': ANY,
+        'default': ANY,
+        'required': {'type': 'bool'},
+        'status': STRING,
+        'constraints': LIST,
+        'entry_schema': ANY,
+    },
+}
+
+TOPOLOGY_TEMPLATE = {
+    'type': 'map',
+    'required': ('node_templates',),
+    'keys': {
+        'description': STRING,
+        'inputs': {'type': 'map', 'values': PARAMETER},
+        'node_templates': {'type': 'map', 'values': NODE_TEMPLATE},
+        'relationship_templates': MAP,
+        'groups': MAP,
+        'policies': ANY,
+        'outputs': {'type': 'map', 'values': PARAMETER},
+        'substitution_mappings': MAP,
+    },
+}
+
+SERVICE_TEMPLATE = {
+    'type': 'map',
+    'required': ('tosca_definitions_version',),
+    'keys': {
+        'tosca_definitions_version': STRING,
+        'tosca_default_namespace': STRING,
+        'template_name': STRING,
+        'template_author': STRING,
+        'template_version': ANY,
+        'description': STRING,
+        'metadata': MAP,
+        'dsl_definitions': ANY,
+        'repositories': MAP,
+        'imports': LIST,
+        'artifact_types': MAP,
+        'data_types': MAP,
+        'capability_types': MAP,
+        'interface_types': MAP,
+        'relationship_types': MAP,
+        'node_types': MAP,
+        'group_types': MAP,
+        'policy_types': MAP,
+        'topology_template': TOPOLOGY_TEMPLATE,
+    },
+}
+
+# Properties and requirements every template of a MEC node type must
+# declare.
+NODE_TYPE_PROPERTIES = {
+    'tosca.nodes.mec.VL': ('network_name', 'vendor'),
+}
+NODE_TYPE_REQUIREMENTS = {
+    'tosca.nodes.mec.CP.Tacker': ('virtualBinding',),
+}
+
+_NODE_CLASSES = {
+    'map': yaml.MappingNode,
+    'list': yaml.SequenceNode,
+}
+_NULL_TAG = 'tag:yaml.org,2002:null'
+_SCALAR_TAGS = {
+    'str': ('tag:yaml.org,2002:str',),
+    'bool': ('tag:yaml.org,2002:bool',),
+}
+_TYPE_NAMES = {
+    'map': _('a mapping'),
+    'list': _('a list'),
+    'str': _('a string'),
+    'bool': _('true or false'),
+}
+
+
+def _error(node, message):
+    # Marks count from zero, editors from one.
+    return node.start_mark.line + 1, node.start_mark.column + 1, message
+
+
+def _format(line, column, message):
+    return _("Line %(line)d, column %(column)d: %(message)s") % {
+        'line': line, 'column': column, 'message': message}
+
+
+def _compile(schema):
+    """Turn a schema into a function checking a YAML node against it."""
+    kind = schema['type']
+    if kind == 'any':
+        return lambda node, path, errors: None
+
+    node_class = _NODE_CLASSES.get(kind, yaml.ScalarNode)
+    tags = _SCALAR_TAGS.get(kind)
+    keys = dict((key, _compile(sub))
+                for key, sub in schema.get('keys', {}).items())
+    values = _compile(schema['values']) if 'values' in schema else None
+    items = _compile(schema['items']) if 'items' in schema else None
+    required = schema.get('required', ())
+    length = schema.get('length')
+
+    def check(node, path, errors):
+        # Empty values are left for the server to judge.
+        if isinstance(node, yaml.ScalarNode) and node.tag == _NULL_TAG:
+            return
+        if not isinstance(node, node_class) or \
+                (tags and node.tag not in tags):
+            errors.append(_error(node, _("%(path)s must be %(type)s.") % {
+                'path': path, 'type': _TYPE_NAMES[kind]}))
+            return
+        if kind == 'list':
+            for index, item in enumerate(node.value):
+                if items:
+                    items(item, '%s[%d]' % (path, index), errors)
+            return
+        if kind != 'map':
+            return
+
+        if length is not None and len(node.value) != length:
+            message = _("%(path)s must have exactly %(length)d key.") % {
+                'path': path, 'length': length}
+            errors.append(_error(node, message))
+        seen = set()
+        for key_node, value_node in node.value:
+            key = key_node.value
+            key_path = '%s.%s' % (path, key)
+            if key in seen:
+                errors.append(_error(key_node,
+                                     _("Duplicate key %s.") % key_path))
+            seen.add(key)
+            if key in keys:
+                keys[key](value_node, key_path, errors)
+            elif values:
+                values(value_node, key_path, errors)
+            elif keys:
+                errors.append(_error(key_node,
+                                     _("Unknown key %s.") % key_path))
+        for key in required:
+            if key not in seen:
+                message = _("%(path)s is missing %(key)s.") % {
+                    'path': path, 'key': key}
+                errors.append(_error(node, message))
+    return check
+
+
+_validators = {}
+
+
+def _get_validator(name, schema):
+    # Schemas are compiled on first use and kept for the process lifetime.
+    validator = _validators.get(name)
+    if validator is None:
+        validator = _validators[name] = _compile(schema)
+    return validator
+
+
+def _mapping(node, key):
+    if isinstance(node, yaml.MappingNode):
+        for key_node, value_node in node.value:
+            if key_node.value == key:
+                return value_node
+    return None
+
+
+def _walk(node):
+    yield node
+    if isinstance(node, yaml.MappingNode):
+        for key_node, value_node in node.value:
+            for child in _walk(value_node):
+                yield child
+    elif isinstance(node, yaml.SequenceNode):
+        for item in node.value:
+            for child in _walk(item):
+                yield child
+
+
+def _check_references(root, errors):
+    # Requirements must target declared node templates, and get_input
+    # must name a declared input.
+    topology = _mapping(root, 'topology_template')
+    templates = _mapping(topology, 'node_templates')
+    if not isinstance(templates, yaml.MappingNode):
+        return
+    node_names = set(key_node.value for key_node, value in templates.value)
+    inputs = _mapping(topology, 'inputs')
+    input_names = set(key_node.value for key_node, value
+                      in getattr(inputs, 'value', None) or ())
+
+    for name_node, template in templates.value:
+        node_type = _mapping(template, 'type')
+        requirements = _mapping(template, 'requirements')
+        declared = set()
+        if isinstance(requirements, yaml.SequenceNode):
+            for requirement in requirements.value:
+                if not isinstance(requirement, yaml.MappingNode):
+                    continue
+                for key_node, target in requirement.value:
+                    declared.add(key_node.value)
+                    if isinstance(target, yaml.MappingNode):
+                        target = _mapping(target, 'node')
+                    # Dotted targets name node types rather than templates.
+                    if isinstance(target, yaml.ScalarNode) and \
+                            '.' not in target.value and \
+                            target.value not in node_names:
+                        errors.append(_error(target, _(
+                            "Requirement %(req)s of %(node)s targets "
+                            "unknown node template %(target)s.") % {
+                                'req': key_node.value,
+                                'node': name_node.value,
+                                'target': target.value}))
+        if isinstance(node_type, yaml.ScalarNode):
+            properties = _mapping(template, 'properties')
+            names = set(key_node.value for key_node, value
+                        in getattr(properties, 'value', None) or ())
+            for needed in NODE_TYPE_PROPERTIES.get(node_type.value, ()):
+                if needed not in names:
+                    errors.append(_error(template, _(
+                        "%(node)s of type %(type)s requires property "
+                        "%(prop)s.") % {'node': name_node.value,
+                                        'type': node_type.value,
+                                        'prop': needed}))
+            for needed in NODE_TYPE_REQUIREMENTS.get(node_type.value, ()):
+                if needed not in declared:
+                    errors.append(_error(template, _(
+                        "%(node)s of type %(type)s requires "
+                        "%(req)s.") % {'node': name_node.value,
+                                       'type': node_type.value,
+                                       'req': needed}))
+
+    for node in _walk(topology):
+        get_input = _mapping(node, 'get_input')
+        if isinstance(get_input, yaml.ScalarNode) and \
+                get_input.value not in input_names:
+            message = _("Input %s is not declared in "
+                        "topology_template.inputs.") % get_input.value
+            errors.append(_error(get_input, message))
+
+
+def _parse_error(error):
+    # Reader errors and some scanner errors come without a mark.
+    mark = getattr(error, 'problem_mark', None) or \
+        getattr(error, 'context_mark', None)
+    message = getattr(error, 'problem', None) or six.text_type(error)
+    if mark is None:
+        return message
+    return _format(mark.line + 1, mark.column + 1, message)
+
+
+def validate(content, key=None):
+    """Return the problems found in a TOSCA template, in document order.
+
+    ``content`` is the YAML text of the template and ``key`` the SHA-256
+    of its bytes, when already known. An empty list means the template
+    passed the local checks. The problems are cached in the YAML cache
+    under that key, with the parsed document of a valid template, so
+    neither a resubmitted template nor the load_yaml() that follows is
+    parsed again.
+    """
+    if isinstance(content, six.text_type):
+        content = content.encode('utf-8')
+    key = key or hashlib.sha256(content).hexdigest()
+    yaml_cache = utils.get_yaml_cache()
+    checks_key = '%s:%s' % (key, translation.get_language())
+    errors = yaml_cache.get_checks(checks_key)
+    if errors is None:
+        errors = _validate(content, key, yaml_cache)
+        yaml_cache.put_checks(checks_key, errors)
+    return list(errors)
+
+
+def _validate(content, key, yaml_cache):
+    start = time.time()
+    try:
+        # Undecodable bytes are reported while the loader is created.
+        loader = _LOADER(content)
+    except yaml.YAMLError as e:
+        return [_parse_error(e)]
+    try:
+        try:
+            root = loader.get_single_node()
+        except yaml.YAMLError as e:
+            return [_parse_error(e)]
+        if root is None:
+            return [_("The template is empty.")]
+
+        errors = []
+        _get_validator('service_template', SERVICE_TEMPLATE)(
+            root, 'template', errors)
+        if not errors:
+            _check_references(root, errors)
+        if not errors:
+            # The node tree is built already, so the document is cheap.
+            try:
+                doc = loader.construct_document(root)
+            except yaml.YAMLError:
+                pass
+            else:
+                yaml_cache.put(key, doc, len(content), time.time() - start)
+    finally:
+        loader.dispose()
+    errors.sort(key=lambda error: error[:2])
+    return [_format(*error) for error in errors]
+
+
+def validate_upload(upload):
+    """Return the problems found in an uploaded template, and its key.
+
+    The upload is hashed chunk by chunk and only read when its checks
+    are not cached. The key is then passed to utils.load_yaml_upload().
+    """
+    utils.check_upload_size(upload.name, upload.size)
+    key = utils.hash_upload(upload)
+    errors = utils.get_yaml_cache().get_checks(
+        '%s:%s' % (key, translation.get_language()))
+    if errors is None:
+        errors = validate(utils.read_upload(upload), key)
+    return list(errors), key
+
+
+def get_inputs(template):
+    """Return the ``topology_template.inputs`` of a parsed template."""
+    if not isinstance(template, dict):
+        return {}
+    topology = template.get('topology_template') or {}
+    inputs = topology.get('inputs') if isinstance(topology, dict) else None
+    if not isinstance(inputs, dict):
+        return {}
+    return dict((name, definition) for name, definition in inputs.items()
+                if isinstance(definition, dict))
+
+
+def _mead_inputs_key(mead):
+    # The version in the key retires the schema of an updated MEAD.
+    return 'apmec:mead-inputs:%s:%s' % (
+        mead['id'], mead.get('updated_at') or mead.get('created_at'))
+
+
+def _extract_mead_inputs(mead):
+    template = (mead.get('attributes') or {}).get('mead')
+    if isinstance(template, six.string_types):
+        template = utils.load_yaml(template)
+    return get_inputs(template)
+
+
+def cache_mead_inputs(meads):
+    """Extract and cache the input schemas of listed MEADs.
+
+    Only MEADs whose current version is not cached yet are parsed.
+    """
+    keys = dict((_mead_inputs_key(mead), mead) for mead in meads
+                if mead.get('attributes'))
+    if not keys:
+        return
+    missing = set(keys) - set(cache.get_many(list(keys)))
+    schemas = {}
+    for key in missing:
+        try:
+            schemas[key] = _extract_mead_inputs(keys[key])
+        except yaml.YAMLError as e:
+            LOG.debug("Unable to read the inputs of MEAD %s: %s",
+                      keys[key]['id'], e)
+    cache.set_many(schemas, getattr(settings, 'APMEC_MEAD_INPUTS_TTL',
+                                    86400))
+
+
+def get_mead_inputs(request, mead):
+    """Return the input schema of a MEAD, as listed by mead_list.
+
+    The MEAD is fetched with its template when its schema is not cached.
+    """
+    key = _mead_inputs_key(mead)
+    inputs = cache.get(key)
+    if inputs is None:
+        if not mead.get('attributes'):
+            mead = api.apmec.get_mead(request, mead['id'])['mead']
+        inputs = _extract_mead_inputs(mead)
+        cache.set(key, inputs, getattr(settings, 'APMEC_MEAD_INPUTS_TTL',
+                                       86400))
+    return inputs
+
+
+def _instance_of(*types):
+    def coerce(value):
+        if not isinstance(value, types) or isinstance(value, bool):
+            raise ValueError(value)
+        return value
+    return coerce
+
+
+def _to_integer(value):
+    # As toscaparser's validate_integer, which also takes "5" and 5.0.
+    if not isinstance(value, six.integer_types):
+        value = int(value)
+    return value
+
+
+def _to_boolean(value):
+    # As toscaparser's validate_boolean, which also takes 'true'/'false'.
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, six.string_types) and \
+            value.lower() in ('true', 'false'):
+        return value.lower() == 'true'
+    raise ValueError(value)
+
+
+# Each function returns the value as the server will read it, or raises
+# ValueError or TypeError for a value of another type.
+_COERCIONS = {
+    'string': _instance_of(*six.string_types),
+    'integer': _to_integer,
+    'float': _instance_of(float, *six.integer_types),
+    'boolean': _to_boolean,
+    'list': _instance_of(list),
+    'map': _instance_of(dict),
+}
+
+_CONSTRAINTS = {
+    'equal': lambda value, arg: value == arg,
+    'greater_than': lambda value, arg: value > arg,
+    'greater_or_equal': lambda value, arg: value >= arg,
+    'less_than': lambda value, arg: value < arg,
+    'less_or_equal': lambda value, arg: value <= arg,
+    'in_range': lambda value, arg: arg[0] <= value <= arg[1],
+    'valid_values': lambda value, arg: value in arg,
+    'length': lambda value, arg: len(value) == arg,
+    'min_length': lambda value, arg: len(value) >= arg,
+    'max_length': lambda value, arg: len(value) <= arg,
+    'pattern': lambda value, arg: re.match('(?:%s)$' % arg, value),
+}
+
+
+def validate_params(inputs, params):
+    """Return the problems of parameter values against an input schema.
+
+    ``params`` is the parsed parameter value mapping. Types and
+    constraints this check does not know are left to the server, and
+    values of undeclared inputs are ignored, as toscaparser does.
+    """
+    errors = []
+    unknown = sorted(set(params) - set(inputs))
+    if unknown:
+        LOG.debug("Ignoring parameters not declared as inputs: %s",
+                  ', '.join(unknown))
+
+    for name, definition in sorted(inputs.items()):
+        if name not in params:
+            if 'default' not in definition and \
+                    definition.get('required', True) is not False:
+                errors.append(_("Input %s is required.") % name)
+            continue
+        value = params[name]
+        input_type = definition.get('type')
+        coerce = _COERCIONS.get(input_type)
+        try:
+            value = coerce(value) if coerce else value
+        except (TypeError, ValueError):
+            errors.append(_("Input %(name)s must be of type %(type)s.") %
+                          {'name': name, 'type': input_type})
+            continue
+        for constraint in definition.get('constraints') or ():
+            if not isinstance(constraint, dict) or len(constraint) != 1:
+                continue
+            (operator, arg), = constraint.items()
+            test = _CONSTRAINTS.get(operator)
+            try:
+                passed = test is None or test(value, arg)
+            except (TypeError, ValueError, IndexError, re.error):
+                # A constraint not applying to this type of value.
+                continue
+            if not passed:
+                errors.append(_("Input %(name)s does not satisfy "
+                                "%(constraint)s: %(arg)s.") %
+                              {'name': name, 'constraint': operator,
+                               'arg': arg})
+    return errors
@@ -0,0 +1,22 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from django.conf.urls import url
+
+from apmec_horizon.openstack_dashboard.dashboards.mec import views
+
+urlpatterns = [
+    url(r'^metrics$', views.MetricsView.as_view(), name='metrics'),
+    url(r'^traces$', views.TraceView.as_view(), name='traces'),
+    url(r'^profiles/(?P<filename>[^/]+)$', views.ProfileView.as_view(),
+        name='profile'),
+]
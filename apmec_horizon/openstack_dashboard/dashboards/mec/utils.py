@@ -13,12 +13,891 @@
 # under the License.
 
 
+from collections import OrderedDict
+import contextlib
+import copy
+import csv
+import datetime
+import functools
+import hashlib
+import json
+import mmap
+import threading
+import time
+import zipfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.urlresolvers import reverse
+from django.forms import ValidationError
+from django import http
+from django import shortcuts
+from django.utils.http import urlencode
+from django.utils.http import urlquote_plus
+from django.utils import timesince
+from django.utils import translation
 from django.utils.translation import ugettext_lazy as _
+from django.views import generic
+import futurist
+from futurist import waiters
+from oslo_log import log as logging
+import six
+import yaml
 
+from horizon import exceptions
+from horizon import messages
 from horizon import tables
+from horizon import tabs
+from horizon.utils import functions
+
+from apmec_horizon.openstack_dashboard import api
+from apmecclient.common.exceptions import NotFound
+
+LOG = logging.getLogger(__name__)
+
+BULK_ROW_UPDATE = "bulk_row_update"
+# Upper bound on the ids sent in one filtered list call, keeping the
+# upstream query string well below common URL length limits.
+BULK_LOOKUP_CHUNK = 50
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the thread pool shared by the MEC dashboard panels."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = futurist.ThreadPoolExecutor(
+                max_workers=getattr(settings, 'APMEC_DASHBOARD_WORKERS', 8))
+    return _executor
+
+
+def call_in_parallel(funcs):
+    """Run the given callables on the shared executor.
+
+    The results are returned in the order of ``funcs``. An exception
+    raised by any of the callables is re-raised here.
+    """
+    futures = [get_executor().submit(func) for func in funcs]
+    return [future.result() for future in futures]
+
+
+class DeadlineExceeded(Exception):
+    """The call was made, but gave no answer before the deadline."""
+
+
+class NotAttempted(Exception):
+    """The call was not made, the deadline passed first."""
+
+
+_RUNNING = object()
+
+
+def call_with_deadline(funcs, timeout=None, max_workers=None):
+    """Run the given callables concurrently, waiting at most ``timeout``.
+
+    Returns one ``(result, error)`` pair per callable, in order. At most
+    ``max_workers`` (APMEC_BULK_ACTION_WORKERS by default) run at once,
+    so a large batch leaves room on the shared executor for the other
+    requests. Once ``timeout`` seconds (APMEC_DASHBOARD_CALL_TIMEOUT by
+    default) have passed, calls still running are abandoned and reported
+    with a DeadlineExceeded error; calls not started yet are not made at
+    all and reported with a NotAttempted error.
+    """
+    if timeout is None:
+        timeout = getattr(settings, 'APMEC_DASHBOARD_CALL_TIMEOUT', 10)
+    if max_workers is None:
+        max_workers = getattr(settings, 'APMEC_BULK_ACTION_WORKERS', 4)
+    results = [None] * len(funcs)
+    pending = list(reversed(list(enumerate(funcs))))
+    lock = threading.Lock()
+    stopped = []
+
+    def worker():
+        while True:
+            with lock:
+                if stopped or not pending:
+                    return
+                index, func = pending.pop()
+                results[index] = _RUNNING
+            try:
+                outcome = (func(), None)
+            except Exception as e:
+                outcome = (None, e)
+            with lock:
+                results[index] = outcome
+
+    workers = [get_executor().submit(worker)
+               for i in range(min(max_workers, len(funcs)))]
+    waiters.wait_for_all(workers, timeout)
+    with lock:
+        stopped.append(True)
+        outcomes = list(results)
+    for future in workers:
+        future.cancel()
+
+    for index, outcome in enumerate(outcomes):
+        if outcome is None:
+            outcomes[index] = (None, NotAttempted(
+                _('Not attempted within %s seconds') % timeout))
+        elif outcome is _RUNNING:
+            outcomes[index] = (None, DeadlineExceeded(
+                _('No response within %s seconds') % timeout))
+    return outcomes
+
+
+_background = {}
+_background_lock = threading.Lock()
+
+
+def run_in_background(key, func, interval=0):
+    """Run ``func`` on the shared executor, once at a time per ``key``.
+
+    Nothing is started while a run for ``key`` is in progress, or within
+    ``interval`` seconds of the start of the previous one. Errors are
+    logged, as nobody waits for the result.
+    """
+    with _background_lock:
+        started_at, future = _background.get(key, (0, None))
+        if (future and not future.done()) or \
+                time.time() - started_at < interval:
+            return
+        if len(_background) > 1024:
+            for done_key in [k for k, (t, f) in _background.items()
+                             if f.done()]:
+                del _background[done_key]
+        _background[key] = (time.time(), get_executor().submit(
+            _run_quietly, key, func))
+
+
+def _run_quietly(key, func):
+    try:
+        func()
+    except Exception:
+        LOG.exception("Background task %s failed", key)
+
+
+def get_scope(request):
+    """Return the scope of what the API shows the user of a request.
+
+    Admins see the resources and events of every project, so what they
+    are shown is stored apart from what project members are shown.
+    """
+    return '%s%s' % (request.user.project_id,
+                     '/admin' if request.user.is_superuser else '')
+
+
+def get_list_snapshot(request, resource, list_func, **params):
+    """Return ``list_func(request, **params)``, stale while revalidating.
+
+    The last good listing is kept in the Django cache. Younger than
+    APMEC_LIST_MAX_STALENESS[resource] seconds (30 by default), it is
+    served at once and refreshed in the background once older than
+    APMEC_LIST_REFRESH_AFTER seconds. An older listing is fetched again,
+    and should the API fail the last good one is served instead, for up
+    to APMEC_LIST_SNAPSHOT_TTL seconds. Writes through the dashboard
+    make the listings they affect stale at once.
+    """
+    params_hash = hashlib.sha1(json.dumps(
+        params, sort_keys=True, default=six.text_type).encode('utf-8'))
+    key = 'apmec:snapshot:%s:%s:%s' % (resource, get_scope(request),
+                                       params_hash.hexdigest())
+    generation = api.apmec.get_list_cache_generation(request, resource)
+    snapshot = cache.get(key)
+
+    def refresh():
+        result = list_func(request, **params)
+        cache.set(key, (time.time(), generation, result),
+                  getattr(settings, 'APMEC_LIST_SNAPSHOT_TTL', 86400))
+        return result
+
+    if snapshot:
+        taken_at, snapshot_generation, result = snapshot
+        age = time.time() - taken_at
+        max_staleness = getattr(settings, 'APMEC_LIST_MAX_STALENESS',
+                                {}).get(resource, 30)
+        if snapshot_generation == generation and age < max_staleness:
+            if age >= getattr(settings, 'APMEC_LIST_REFRESH_AFTER', 5):
+                run_in_background(key, refresh)
+                messages.info(request, _("Showing the list as of %s ago "
+                                         "while it is refreshed.") %
+                              timesince.timesince(
+                                  datetime.datetime.fromtimestamp(taken_at)))
+            return result
+
+    try:
+        return refresh()
+    except Exception as e:
+        if not snapshot:
+            raise
+        LOG.warning("Unable to list %s, serving the last good listing: "
+                    "%s", resource, e)
+        messages.warning(request, _("Unable to refresh the list; showing it "
+                                    "as of %s ago.") %
+                         timesince.timesince(
+                             datetime.datetime.fromtimestamp(snapshot[0])))
+        return snapshot[2]
+
+
+def get_resources_by_id(request, list_func, get_func, resource, obj_ids):
+    """Look up several resources by id with as few API calls as possible.
+
+    The ids are resolved with filtered ``list_func`` calls. Should the
+    filtered listing fail, the resources are fetched one by one through
+    ``get_func`` on the shared executor instead. Ids that no longer exist
+    are left out of the returned dict.
+    """
+    wanted = set(obj_ids)
+    found = {}
+    try:
+        for start in range(0, len(obj_ids), BULK_LOOKUP_CHUNK):
+            chunk = obj_ids[start:start + BULK_LOOKUP_CHUNK]
+            for obj in list_func(request, id=chunk):
+                if obj['id'] in wanted:
+                    found[obj['id']] = obj
+        return found
+    except Exception as e:
+        LOG.debug("Filtered %s lookup failed, falling back to one call "
+                  "per id: %s", resource, e)
+
+    def _get(obj_id):
+        try:
+            return get_func(request, obj_id)[resource]
+        except NotFound:
+            return None
+
+    objs = call_in_parallel([functools.partial(_get, obj_id)
+                             for obj_id in obj_ids])
+    return dict((obj['id'], obj) for obj in objs if obj)
+
+
+# libyaml parses several times faster than the pure Python loader.
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+class YAMLCache(object):
+    """Process-wide LRU cache of parsed YAML documents.
+
+    Documents are keyed on the SHA-256 of their bytes, so a template or
+    parameter file submitted again after a validation error is not
+    parsed again. The cached documents add up to at most ``max_bytes``
+    of YAML source. The problems tosca.validate() found in a document
+    are kept under the same key, for the latest ``max_checks`` ones.
+    """
+
+    def __init__(self, max_bytes, max_checks=1024):
+        self.max_bytes = max_bytes
+        self.max_checks = max_checks
+        self._docs = OrderedDict()
+        self._checks = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0,
+                      'parse_seconds': 0.0}
+
+    def get(self, key):
+        """Return whether ``key`` is cached, and a copy of its document."""
+        with self._lock:
+            entry = self._docs.pop(key, None)
+            if entry is None:
+                return False, None
+            # Re-insert to mark the entry as most recently used.
+            self._docs[key] = entry
+            self.stats['hits'] += 1
+        # Callers get their own copy to modify as they please.
+        return True, copy.deepcopy(entry[0])
+
+    def load(self, content, key=None):
+        if isinstance(content, six.text_type):
+            content = content.encode('utf-8')
+        if key is None:
+            key = hashlib.sha256(content).hexdigest()
+        found, doc = self.get(key)
+        if found:
+            return doc
+
+        start = time.time()
+        doc = yaml.load(content, Loader=_YAML_LOADER)
+        self.put(key, doc, len(content), time.time() - start)
+        return copy.deepcopy(doc)
+
+    def put(self, key, doc, size, elapsed):
+        """Cache a document parsed from ``size`` bytes in ``elapsed``."""
+        LOG.debug("Parsed %d bytes of YAML in %.3fs", size, elapsed)
+        with self._lock:
+            self.stats['misses'] += 1
+            self.stats['parse_seconds'] += elapsed
+            if size <= self.max_bytes and key not in self._docs:
+                self._docs[key] = (doc, size)
+                self._size += size
+                while self._size > self.max_bytes:
+                    evicted, (evicted_doc, evicted_size) = \
+                        self._docs.popitem(last=False)
+                    self._size -= evicted_size
+                    self.stats['evictions'] += 1
+
+    def get_checks(self, key):
+        """Return the problems cached for ``key``, or None."""
+        with self._lock:
+            errors = self._checks.pop(key, None)
+            if errors is not None:
+                self._checks[key] = errors
+            return errors
+
+    def put_checks(self, key, errors):
+        with self._lock:
+            self._checks.pop(key, None)
+            self._checks[key] = list(errors)
+            while len(self._checks) > self.max_checks:
+                self._checks.popitem(last=False)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats, entries=len(self._docs),
+                         bytes=self._size)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = float(stats['hits']) / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._docs.clear()
+            self._checks.clear()
+            self._size = 0
+
+
+_yaml_cache = YAMLCache(getattr(settings, 'APMEC_YAML_CACHE_BYTES',
+                                16 * 1024 * 1024))
+
+
+def load_yaml(content):
+    """Parse a YAML document, through the shared parse cache."""
+    return _yaml_cache.load(content)
+
+
+def load_yaml_upload(upload, key=None):
+    """Parse an uploaded YAML file through the shared parse cache.
+
+    The upload is hashed chunk by chunk first, unless its ``key`` is
+    given, so a file already in the cache is never read into memory as a
+    whole.
+    """
+    check_upload_size(upload.name, upload.size)
+    key = key or hash_upload(upload)
+    found, doc = _yaml_cache.get(key)
+    if found:
+        return doc
+    return _yaml_cache.load(upload.read(), key=key)
+
+
+def get_yaml_cache():
+    """Return the shared YAML parse cache."""
+    return _yaml_cache
+
+
+def get_yaml_cache_stats():
+    """Return the hit, miss, eviction and parse time counters."""
+    return _yaml_cache.get_stats()
+
+
+def _fragment_index_key(resource_id):
+    return 'apmec:fragments:%s' % resource_id
+
+
+class CachedFragmentMixin(object):
+    """Cache the rendered HTML of a detail tab in the Django cache.
+
+    Subclasses return the API dict of the resource shown from
+    ``get_resource``. Its id and ``updated_at`` key the fragment, so a
+    changed resource is rendered again. Fields changing without an
+    ``updated_at`` bump, such as a status, are listed in ``key_fields``.
+    """
+    key_fields = ()
+
+    def get_resource(self):
+        raise NotImplementedError
+
+    def render(self):
+        if not self.load:
+            return ''
+        resource = self.get_resource()
+        if not resource or 'id' not in resource:
+            return super(CachedFragmentMixin, self).render()
+
+        key = 'apmec:fragment:%s:%s:%s:%s' % (
+            self.slug, resource['id'],
+            ':'.join('%s' % resource.get(field) for field in
+                     ('updated_at', 'created_at') + tuple(self.key_fields)),
+            translation.get_language())
+        html = cache.get(key)
+        if html is None:
+            html = super(CachedFragmentMixin, self).render()
+            ttl = getattr(settings, 'APMEC_FRAGMENT_CACHE_TTL', 3600)
+            cache.set(key, html, ttl)
+            # The keys of a resource are indexed so deleting it can purge
+            # every version and language rendered.
+            index_key = _fragment_index_key(resource['id'])
+            index = cache.get(index_key) or []
+            if key not in index:
+                cache.set(index_key, index + [key], ttl)
+        return html
+
+
+def purge_fragments(resource_id):
+    """Drop the cached fragments of a deleted resource."""
+    index_key = _fragment_index_key(resource_id)
+    cache.delete_many((cache.get(index_key) or []) + [index_key])
+
+
+def check_upload_size(name, size, max_size=None):
+    """Reject a file larger than ``max_size`` before reading any of it.
+
+    ``max_size`` defaults to APMEC_UPLOAD_MAX_SIZE, sized for templates
+    and parameter files. Templates onboarded in bulk keep their own
+    limit, APMEC_MEAD_MAX_TEMPLATE_SIZE.
+    """
+    if max_size is None:
+        max_size = getattr(settings, 'APMEC_UPLOAD_MAX_SIZE',
+                           10 * 1024 * 1024)
+    if size > max_size:
+        raise ValidationError(_("%(name)s is larger than %(max)d bytes.") %
+                              {'name': name, 'max': max_size})
+
+
+def hash_upload(upload):
+    """Return the SHA-256 of an upload, read one chunk at a time."""
+    digest = hashlib.sha256()
+    for chunk in upload.chunks():
+        digest.update(chunk)
+    upload.seek(0)
+    return digest.hexdigest()
+
+
+def read_upload(upload):
+    """Return the content of a size checked template or parameter file."""
+    check_upload_size(upload.name, upload.size)
+    upload.seek(0)
+    return upload.read()
+
 
+class _MappedFile(object):
+    # zipfile asks for seekable(), which mmap objects lack before 3.13.
+    def __init__(self, mapped):
+        self._mapped = mapped
+
+    def seekable(self):
+        return True
+
+    def __getattr__(self, name):
+        return getattr(self._mapped, name)
+
+
+@contextlib.contextmanager
+def open_zip(upload):
+    """Open an uploaded zip archive without reading its payload.
+
+    Django spools large uploads to disk. Those are mapped with mmap, so
+    reading the zip index and single entries only pages in what is
+    needed. Archives are limited to APMEC_ARCHIVE_MAX_SIZE bytes.
+    """
+    check_upload_size(upload.name, upload.size,
+                      getattr(settings, 'APMEC_ARCHIVE_MAX_SIZE',
+                              512 * 1024 * 1024))
+    mapped = None
+    try:
+        if hasattr(upload, 'temporary_file_path') and upload.size:
+            with open(upload.temporary_file_path(), 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            archive = zipfile.ZipFile(_MappedFile(mapped))
+        else:
+            archive = zipfile.ZipFile(upload)
+    except zipfile.BadZipfile as e:
+        if mapped is not None:
+            mapped.close()
+        raise ValidationError(_("Unable to read %(name)s: %(error)s") %
+                              {'name': upload.name, 'error': e})
+    try:
+        yield archive
+    finally:
+        archive.close()
+        if mapped is not None:
+            mapped.close()
+
+
+def read_csar_definitions(upload):
+    """Return the entry definitions template of an uploaded CSAR.
+
+    The template is found through the Entry-Definitions of
+    TOSCA-Metadata/TOSCA.meta, or else as the only YAML file at the root
+    of the archive. No other entry is read.
+    """
+    with open_zip(upload) as archive:
+        names = archive.namelist()
+        entry = None
+        if 'TOSCA-Metadata/TOSCA.meta' in names:
+            meta = archive.read('TOSCA-Metadata/TOSCA.meta')
+            for line in meta.decode('utf-8').splitlines():
+                key, sep, value = line.partition(':')
+                if key.strip() == 'Entry-Definitions':
+                    entry = value.strip()
+        else:
+            root = [name for name in names if '/' not in name and
+                    name.endswith(('.yaml', '.yml'))]
+            if len(root) == 1:
+                entry = root[0]
+        if entry not in names:
+            raise ValidationError(_("No entry definitions found in %s.") %
+                                  upload.name)
+        check_upload_size(entry, archive.getinfo(entry).file_size)
+        return archive.read(entry)
+
+
+class ConcurrentBatchMixin(object):
+    """Run a batch action on the selected objects concurrently.
+
+    Horizon calls ``action`` for one object after the other, which for a
+    few hundred terminations outlasts the request timeout. Here the calls
+    go through the shared executor, at most APMEC_BULK_ACTION_WORKERS at
+    a time, and the request waits at most APMEC_BULK_ACTION_TIMEOUT
+    seconds for all of them to be accepted. The outcome is then reported
+    per object as horizon would, telling calls without an answer from
+    the ones never made.
+    """
+
+    def handle(self, table, request, obj_ids):
+        allowed = []
+        not_allowed = []
+        for datum_id in obj_ids:
+            datum = table.get_object_by_id(datum_id)
+            datum_display = table.get_object_display(datum) or datum_id
+            if table._filter_action(self, request, datum):
+                allowed.append((datum_id, datum, datum_display))
+            else:
+                not_allowed.append(datum_display)
+                LOG.warning('Permission denied to %(action)s: "%(name)s"',
+                            {'action': self._get_action_name(past=True),
+                             'name': datum_display})
+
+        outcomes = call_with_deadline(
+            [functools.partial(self.action, request, datum_id)
+             for datum_id, datum, datum_display in allowed],
+            timeout=getattr(settings, 'APMEC_BULK_ACTION_TIMEOUT', 45))
+
+        success = []
+        failure = []
+        timed_out = []
+        not_attempted = []
+        for (datum_id, datum, datum_display), (result, error) in zip(
+                allowed, outcomes):
+            if error is None:
+                self.update(request, datum)
+                self.success_ids.append(datum_id)
+                success.append(datum_display)
+                continue
+            LOG.warning('Action %(action)s failed for "%(name)s": '
+                        '%(reason)s',
+                        {'action': self._get_action_name(past=True),
+                         'name': datum_display, 'reason': error})
+            if isinstance(error, DeadlineExceeded):
+                timed_out.append(datum_display)
+            elif isinstance(error, NotAttempted):
+                not_attempted.append(datum_display)
+            else:
+                failure.append(datum_display)
+
+        success_message_level = messages.success
+        for objs, msg in ((not_allowed,
+                           _('You are not allowed to %(action)s: %(objs)s')),
+                          (failure, _('Unable to %(action)s: %(objs)s')),
+                          (timed_out, _('No answer in time to %(action)s: '
+                                        '%(objs)s. Their status shows once '
+                                        'the table refreshes.')),
+                          (not_attempted, _('Ran out of time before trying '
+                                            'to %(action)s: %(objs)s. Select '
+                                            'them and try again.'))):
+            if objs:
+                messages.error(request, msg % {
+                    'action': self._get_action_name(objs).lower(),
+                    'objs': functions.lazy_join(", ", objs)})
+                success_message_level = messages.info
+        if success:
+            success_message_level(request, _('%(action)s: %(objs)s') % {
+                'action': self._get_action_name(success, past=True),
+                'objs': functions.lazy_join(", ", success)})
+        return shortcuts.redirect(self.get_success_url(request))
+
+
+class ServerFilterAction(tables.FilterAction):
+    """Filter action applied on the server rather than in the browser.
+
+    ``filter_choices`` flagged as API filters are passed as query params
+    to the list call. Other fields are looked up through
+    ``local_filters``, a map of field to a function of the API dict, and
+    matched as case-insensitive substrings while the rows are built.
+    """
+    filter_type = "server"
+    local_filters = {}
+
+    def filter(self, table, data, filter_string):
+        # Rows are filtered before they are built, see get_filters.
+        return data
+
+
+def get_filters(request, table):
+    """Return the API query params and local predicate of a table filter.
+
+    Filter values submitted through the filter form are kept in the
+    session, so the filter sticks across reloads and pagination. They
+    are keyed on the panel too, as tables of different panels may share
+    a name.
+    """
+    action = table._meta._filter_action
+    if action is None or action.filter_type != 'server':
+        return {}, None
+
+    param_name = action.get_param_name()
+    field_param = '%s_field' % param_name
+    panel = getattr(request, 'horizon', {}).get('panel')
+    prefix = 'mec:%s:' % getattr(panel, 'slug', '')
+    for param in (param_name, field_param):
+        if param in request.POST:
+            request.session[prefix + param] = request.POST[param]
+    field = request.session.get(prefix + field_param)
+    value = request.session.get(prefix + param_name, '').strip()
+    if not field or not value:
+        return {}, None
+
+    if action.is_api_filter(field):
+        return {field: value}, None
+    getter = action.local_filters.get(field)
+    if getter is None:
+        return {}, None
+    value = value.lower()
+    return {}, lambda obj: value in (getter(obj) or '').lower()
+
+
+class BulkUpdateRow(tables.Row):
+    """Row whose status is polled together with the rest of its table.
+
+    Pending rows are tagged with ``ajax-bulk-update`` instead of Horizon's
+    ``ajax-update`` so that mec.js refreshes them all with one request
+    per table rather than one request per row.
+    """
+    ajax = True
+
+    def load_cells(self, datum=None):
+        super(BulkUpdateRow, self).load_cells(datum)
+        if "ajax-update" in self.classes:
+            self.classes.remove("ajax-update")
+            self.classes.append("ajax-bulk-update")
+            self.attrs['data-object-id'] = self.table.get_object_id(
+                self.datum)
+            self.attrs['data-bulk-update-url'] = self.get_bulk_update_url()
+
+    def get_bulk_update_url(self):
+        table_url = self.table.get_absolute_url()
+        params = urlencode(OrderedDict([
+            ("action", BULK_ROW_UPDATE),
+            ("table", self.table.name),
+        ]))
+        return "%s?%s" % (table_url, params)
+
+
+class BulkRowUpdateMixin(object):
+    """DataTable mixin answering the batched row polls of BulkUpdateRow.
+
+    Tables using it implement ``get_rows_data`` and get back a JSON object
+    mapping each requested id to its freshly rendered row. Ids missing
+    from the response no longer exist and are dropped from the page.
+    """
+
+    def get_rows_data(self, request, obj_ids):
+        """Return a dict mapping the given ids to their row data."""
+        raise NotImplementedError
+
+    def maybe_preempt(self):
+        request = self.request
+        if (request.GET.get('action') != BULK_ROW_UPDATE or
+                request.GET.get('table') != self.name):
+            return super(BulkRowUpdateMixin, self).maybe_preempt()
+
+        obj_ids = request.GET.getlist('obj_id')
+        try:
+            data = self.get_rows_data(request, obj_ids)
+        except Exception:
+            error = exceptions.handle(request, ignore=True)
+            return http.HttpResponse(status=error.status_code)
+
+        rows = {}
+        for obj_id in obj_ids:
+            datum = data.get(obj_id)
+            if datum is not None:
+                rows[obj_id] = self._meta.row_class(self, datum).render()
+        return http.JsonResponse(rows)
+
+
+class ScanMarkerMixin(object):
+    """DataTable mixin resuming a filtered listing where its scan stopped.
+
+    store.list_page() scans a bounded number of pages for the rows of a
+    local filter. When it stops before the page is full, the tab sets
+    ``scan_marker`` to the last item scanned, and the next page starts
+    there rather than after the last row shown.
+    """
+    scan_marker = None
+
+    def get_marker(self):
+        if self.scan_marker:
+            return urlquote_plus(self.scan_marker)
+        return super(ScanMarkerMixin, self).get_marker()
+
+
+class ExportAction(tables.LinkAction):
+    """Link to the streamed export of a table.
+
+    The export view is looked up by the ``url`` name in the namespace of
+    the panel serving the page, with the URL kwargs of the page.
+    """
+    name = "export_csv"
+    verbose_name = _("Export CSV")
+    icon = "download"
+    url = "export"
+    export_format = "csv"
+
+    def get_link_url(self, datum=None):
+        match = self.table.request.resolver_match
+        url = reverse('%s:%s' % (match.namespace, self.url),
+                      kwargs=match.kwargs)
+        return "?".join([url, urlencode({'format': self.export_format})])
+
+
+class ExportJSONAction(ExportAction):
+    name = "export_json"
+    verbose_name = _("Export JSON")
+    export_format = "ndjson"
+
+
+class ExportEventsAction(ExportAction):
+    url = "export_events"
+
+
+class ExportEventsJSONAction(ExportJSONAction):
+    url = "export_events"
+
+
+class _Echo(object):
+    # File-like object handing back what csv.writer writes to it.
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if not isinstance(value, six.string_types):
+        value = six.text_type(value)
+    if six.PY2 and isinstance(value, six.text_type):
+        value = value.encode('utf-8')
+    return value
+
+
+class ExportView(generic.View):
+    """Stream the rows of a table as CSV or NDJSON.
+
+    Subclasses set ``table_class``, the apmec ``collection`` listed and
+    ``build_items``, the row builder of the table. The collection is
+    walked one API page at a time, so memory use does not grow with
+    the size of the export.
+    """
+    table_class = None
+    collection = None
+    build_items = None
+
+    def get_params(self):
+        return {}
+
+    def get(self, request, *args, **kwargs):
+        table = self.table_class(request, **kwargs)
+        filters, matches = get_filters(request, table)
+        params = dict(self.get_params(), **filters)
+        pages = api.apmec.list_pages(request, self.collection, **params)
+        try:
+            # Fetch the first page before streaming, while an error can
+            # still be reported to the user.
+            first = next(pages, [])
+        except Exception:
+            index = reverse('%s:index' % request.resolver_match.namespace)
+            exceptions.handle(request, _('Unable to export %s.') %
+                              table._meta.verbose_name, redirect=index)
+
+        columns = [column for column in table.columns.values()
+                   if not column.auto]
+        rows = self.get_rows(columns, first, pages, matches)
+        if request.GET.get('format') == 'ndjson':
+            content, content_type = self.to_ndjson(columns, rows), \
+                'application/x-ndjson'
+            extension = 'ndjson'
+        else:
+            content, content_type = self.to_csv(columns, rows), 'text/csv'
+            extension = 'csv'
+        response = http.StreamingHttpResponse(content,
+                                              content_type=content_type)
+        response['Content-Disposition'] = (
+            'attachment; filename="%s.%s"' % (table.name, extension))
+        return response
+
+    def get_rows(self, columns, first, pages, matches):
+        page = first
+        while page is not None:
+            if matches:
+                page = [obj for obj in page if matches(obj)]
+            for item in self.build_items(page):
+                yield [column.get_raw_data(item) for column in columns]
+            try:
+                page = next(pages, None)
+            except Exception:
+                # The response has started, all we can do is cut it short.
+                LOG.exception("Export of %s aborted", self.collection)
+                return
+
+    def to_csv(self, columns, rows):
+        writer = csv.writer(_Echo())
+        yield writer.writerow([_csv_value(column.verbose_name)
+                               for column in columns])
+        for row in rows:
+            yield writer.writerow([_csv_value(value) for value in row])
+
+    def to_ndjson(self, columns, rows):
+        names = [column.name for column in columns]
+        for row in rows:
+            yield json.dumps(dict(zip(names, row)),
+                             default=six.text_type) + "\n"
+
+
+class BaseItem(object):
+    """Base of the table row items of the MEC panels.
+
+    Subclasses list their attributes in ``__slots__``, so rows carry no
+    per-instance ``__dict__``. That keeps large listings small in memory
+    and quick to build.
+    """
+    __slots__ = ()
+
+    def __getstate__(self):
+        return dict((name, getattr(self, name, None))
+                    for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+
+class EventItem(BaseItem):
+    __slots__ = ('id', 'resource_state', 'event_type', 'timestamp',
+                 'event_details')
 
-class EventItem(object):
     def __init__(self, id, state, type, timestamp, details):
         self.id = id
         self.resource_state = state
@@ -27,16 +906,12 @@ class EventItem(object):
         self.event_details = details
 
 
-class EventItemList(object):
-    EVTLIST_P = []
-
-    @classmethod
-    def add_item(cls, item):
-        cls.EVTLIST_P.append(item)
-
-    @classmethod
-    def clear_list(cls):
-        cls.EVTLIST_P = []
+def get_event_items(events):
+    """Build EventItems for a list of events in one pass."""
+    new = EventItem
+    return [new(event['id'], event['resource_state'], event['event_type'],
+                event['timestamp'], event['event_details'])
+            for event in events]
 
 
 class EventsTable(tables.DataTable):
@@ -52,3 +927,85 @@ class EventsTable(tables.DataTable):
 
     class Meta(object):
         name = "events"
+        pagination_param = "events_marker"
+        table_actions = (ExportEventsAction, ExportEventsJSONAction,)
+
+    def get_pagination_string(self):
+        # The detail pages hold the events in a tab, which the "more" link
+        # has to select again.
+        pagination = super(EventsTable, self).get_pagination_string()
+        tab_query = getattr(self, 'tab_query', None)
+        return '&'.join((tab_query, pagination)) if tab_query else pagination
+
+
+class ExportEventsView(ExportView):
+    """Stream the events of the resource named in the URL."""
+    table_class = EventsTable
+    collection = 'events'
+    build_items = staticmethod(get_event_items)
+
+    def get_params(self):
+        return {'resource_id': list(self.kwargs.values())[0]}
+
+
+def get_events_page(request, resource_id, marker=None):
+    """Return a page of the events of a resource and if older ones exist.
+
+    The newest page shown is kept in the Django cache. Showing it again
+    only fetches the events recorded since, as events never change,
+    unless there are a page of them or more.
+    """
+    if marker:
+        return api.apmec.events_list(request, resource_id, marker=marker,
+                                     paginate=True)
+
+    page_size = functions.get_page_size(request)
+    key = 'apmec:events:%s:%s:%s' % (request.user.project_id, resource_id,
+                                     page_size)
+    cached = cache.get(key)
+    newer = None
+    if cached and cached[0]:
+        events, has_more = cached
+        newer = api.apmec.events_list(request, resource_id,
+                                      since=events[0]['id'])
+    if newer is not None and len(newer) <= page_size:
+        events = newer + events
+        has_more = has_more or len(events) > page_size
+        events = events[:page_size]
+    else:
+        # A page or more of newer events replaces the cached page.
+        events, has_more = api.apmec.events_list(request, resource_id,
+                                                 paginate=True)
+    cache.set(key, (events, has_more),
+              getattr(settings, 'APMEC_EVENTS_CACHE_TTL', 3600))
+    return events, has_more
+
+
+class EventsTab(tabs.TableTab):
+    """Events of the resource a detail page shows, newest first.
+
+    ``resource_kwarg`` names the tab group kwarg holding the resource id.
+    """
+    name = _("Events Tab")
+    slug = "events_tab"
+    table_classes = (EventsTable,)
+    template_name = ("horizon/common/_detail_table.html")
+    preload = False
+    resource_kwarg = None
+
+    def has_more_data(self, table):
+        return self._has_more
+
+    def get_events_data(self):
+        table = self._tables[EventsTable._meta.name]
+        table.tab_query = self.get_query_string()
+        try:
+            events, self._has_more = get_events_page(
+                self.request, self.tab_group.kwargs[self.resource_kwarg],
+                self.request.GET.get(EventsTable._meta.pagination_param))
+            return get_event_items(events)
+        except Exception as e:
+            self._has_more = False
+            error_message = _('Unable to get events %s') % e
+            exceptions.handle(self.request, error_message)
+            return []
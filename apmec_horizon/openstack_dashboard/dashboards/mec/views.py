@@ -0,0 +1,84 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django import http
+from django.views import generic
+
+from openstack_dashboard import policy
+
+from apmec_horizon.openstack_dashboard import api
+from apmec_horizon.openstack_dashboard.api import metrics
+from apmec_horizon.openstack_dashboard.api import trace
+from apmec_horizon.openstack_dashboard.dashboards.mec import utils
+from apmec_horizon.openstack_dashboard import profiling
+
+
+def get_gauges():
+    """Return the single-flight and YAML cache counters as gauges."""
+    gauges = []
+    for name, counters in sorted(api.apmec.get_single_flight_stats().items()):
+        for counter, value in sorted(counters.items()):
+            gauges.append(('apmec_single_flight_%s_%s' % (name, counter),
+                           'Single-flight %s of %s.' % (counter, name),
+                           value))
+    for counter, value in sorted(utils.get_yaml_cache_stats().items()):
+        gauges.append(('apmec_yaml_cache_%s' % counter,
+                       'YAML parse cache %s.' % counter.replace('_', ' '),
+                       value))
+    return gauges
+
+
+def check_admin(request):
+    if not policy.check((("identity", "admin_required"),), request):
+        raise PermissionDenied()
+
+
+class MetricsView(generic.View):
+    """Expose the API call metrics of this process to Prometheus."""
+
+    def get(self, request, *args, **kwargs):
+        check_admin(request)
+        return http.HttpResponse(metrics.registry.render(get_gauges()),
+                                 content_type='text/plain; version=0.0.4')
+
+
+class TraceView(generic.View):
+    """Return the API call traces of the user's latest requests as JSON."""
+
+    def get(self, request, *args, **kwargs):
+        if not getattr(settings, 'APMEC_TRACE_PANEL', False):
+            raise http.Http404()
+        return http.JsonResponse({'traces': trace.get_history(request)})
+
+
+class ProfileView(generic.View):
+    """Serve a profile saved by ProfilerMiddleware.
+
+    The text summary is shown inline, the pstats file and the
+    tracemalloc snapshot are downloaded.
+    """
+
+    def get(self, request, filename, *args, **kwargs):
+        check_admin(request)
+        path = profiling.get_profile_path(filename)
+        if path is None:
+            raise http.Http404()
+        if filename.endswith('.txt'):
+            return http.FileResponse(open(path, 'rb'),
+                                     content_type='text/plain')
+        response = http.FileResponse(open(path, 'rb'),
+                                     content_type='application/octet-stream')
+        response['Content-Disposition'] = ('attachment; filename="%s"' %
+                                           filename)
+        return response
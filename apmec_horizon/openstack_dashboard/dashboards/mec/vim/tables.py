@@ -20,13 +20,24 @@ from horizon import tables
 
 from openstack_dashboard import policy
 from apmec_horizon.openstack_dashboard import api
+from apmec_horizon.openstack_dashboard.dashboards.mec import utils
 
 
-class MyFilterAction(tables.FilterAction):
+class MyFilterAction(utils.ServerFilterAction):
     name = "myfilter"
+    filter_choices = (('name', _("Name ="), True),
+                      ('status', _("Status ="), True),
+                      ('type', _("Type ="), True),
+                      ('auth_url', _("Auth URL"), False),
+                      ('description', _("Description"), False))
+    local_filters = {
+        'auth_url': lambda vim: vim.get('auth_url'),
+        'description': lambda vim: vim.get('description'),
+    }
 
 
-class DeleteVIMLink(policy.PolicyTargetMixin, tables.DeleteAction):
+class DeleteVIMLink(policy.PolicyTargetMixin, utils.ConcurrentBatchMixin,
+                    tables.DeleteAction):
     @staticmethod
     def action_present(count):
         return ungettext_lazy(
@@ -55,7 +66,7 @@ class RegisterVIMLink(tables.LinkAction):
     url = "horizon:mec:vim:registervim"
 
 
-class VIMTable(tables.DataTable):
+class VIMTable(utils.ScanMarkerMixin, tables.DataTable):
     name = tables.Column('name', verbose_name=_("Name"),
                          link="horizon:mec:vim:detail",)
     description = tables.Column('description', verbose_name=_("Description"))
@@ -69,4 +80,6 @@ class VIMTable(tables.DataTable):
     class Meta(object):
         name = "vim"
         verbose_name = _("VIM")
-        table_actions = (RegisterVIMLink, DeleteVIMLink, MyFilterAction,)
+        table_actions = (RegisterVIMLink, DeleteVIMLink,
+                         utils.ExportAction, utils.ExportJSONAction,
+                         MyFilterAction,)
@@ -19,11 +19,15 @@ from horizon import exceptions
 from horizon import tabs
 
 from apmec_horizon.openstack_dashboard import api
-from apmec_horizon.openstack_dashboard.dashboards.mec import utils  # noqa
+from apmec_horizon.openstack_dashboard.dashboards.mec import store
+from apmec_horizon.openstack_dashboard.dashboards.mec import utils
 from apmec_horizon.openstack_dashboard.dashboards.mec.vim import tables
 
 
-class VIMItem(object):
+class VIMItem(utils.BaseItem):
+    __slots__ = ('id', 'name', 'description', 'regions', 'auth_url', 'user',
+                 'project', 'status')
+
     def __init__(self, name, description, regions, vim_id, auth_url,
                  user, project, status):
         self.id = vim_id
@@ -36,6 +40,18 @@ class VIMItem(object):
         self.status = status
 
 
+def get_vim_items(vims):
+    """Build VIMItems for a list of vims in one pass."""
+    new = VIMItem
+    return [new(vim.get('name', ''), vim.get('description', ''),
+                ','.join(vim['placement_attr']['regions']),
+                vim.get('id', ''), vim.get('auth_url', ''),
+                vim['auth_cred']['username'] or vim['auth_cred']['user_id'],
+                vim['vim_project']['name'] or vim['vim_project']['id'],
+                vim['status'])
+            for vim in vims]
+
+
 class VIMTab(tabs.TableTab):
     name = _("VIM Tab")
     slug = "vim_tab"
@@ -48,27 +64,14 @@ class VIMTab(tabs.TableTab):
 
     def get_vim_data(self):
         try:
-            self._has_more = False
-            instances = []
-            vims = api.apmec.vim_list(self.request)
-            for vim in vims:
-                auth_cred = vim['auth_cred']
-                placement_attr = vim['placement_attr']
-                vim_regions = ','.join(placement_attr['regions'])
-                user = auth_cred['username'] if auth_cred[
-                    'username'] else auth_cred['user_id']
-                project_info = vim['vim_project']
-                project = project_info['name'] if project_info[
-                    'name'] else project_info['id']
-                status = vim["status"]
-                item = VIMItem(name=vim.get('name', ''),
-                               description=vim.get('description', ''),
-                               regions=vim_regions,
-                               vim_id=vim.get('id', ''),
-                               auth_url=vim.get('auth_url', ''),
-                               user=user, project=project, status=status)
-                instances.append(item)
-            return instances
+            marker = self.request.GET.get(
+                tables.VIMTable._meta.pagination_param, None)
+            table = self._tables[tables.VIMTable._meta.name]
+            filters, matches = utils.get_filters(self.request, table)
+            vims, self._has_more, table.scan_marker = store.list_page(
+                self.request, 'vims', api.apmec.vim_list, marker, matches,
+                **filters)
+            return get_vim_items(vims)
         except Exception:
             self._has_more = False
             error_message = _('Unable to fetch vim list')
@@ -77,35 +80,8 @@ class VIMTab(tabs.TableTab):
             return []
 
 
-class VIMEventsTab(tabs.TableTab):
-    name = _("Events Tab")
-    slug = "events_tab"
-    table_classes = (utils.EventsTable,)
-    template_name = ("horizon/common/_detail_table.html")
-    preload = False
-
-    def has_more_data(self, table):
-        return self._has_more
-
-    def get_events_data(self):
-        try:
-            self._has_more = True
-            utils.EventItemList.clear_list()
-            events = api.apmec.events_list(self.request,
-                                            self.tab_group.kwargs['vim_id'])
-            for event in events:
-                evt_obj = utils.EventItem(
-                    event['id'], event['resource_state'],
-                    event['event_type'],
-                    event['timestamp'],
-                    event['event_details'])
-                utils.EventItemList.add_item(evt_obj)
-            return utils.EventItemList.EVTLIST_P
-        except Exception as e:
-            self._has_more = False
-            error_message = _('Unable to get events %s') % e
-            exceptions.handle(self.request, error_message)
-            return []
+class VIMEventsTab(utils.EventsTab):
+    resource_kwarg = 'vim_id'
 
 
 class VIMTabs(tabs.TabGroup):
@@ -23,11 +23,14 @@ from horizon import tabs
 from horizon.utils import memoized
 
 from apmec_horizon.openstack_dashboard import api as apmec_api
+from apmec_horizon.openstack_dashboard.dashboards.mec import utils
 from apmec_horizon.openstack_dashboard.dashboards.mec.vim \
     import forms as project_forms
 
 from apmec_horizon.openstack_dashboard.dashboards.mec.vim \
     import tabs as vim_tabs
+from apmec_horizon.openstack_dashboard.dashboards.mec.vim \
+    import tables as vim_tables
 
 
 class IndexView(tabs.TabbedTableView):
@@ -40,6 +43,12 @@ class IndexView(tabs.TabbedTableView):
         return context
 
 
+class ExportView(utils.ExportView):
+    table_class = vim_tables.VIMTable
+    collection = 'vims'
+    build_items = staticmethod(vim_tabs.get_vim_items)
+
+
 class RegisterVIMView(forms.ModalFormView):
     form_class = project_forms.RegisterVim
     template_name = 'mec/vim/registervim.html'
@@ -0,0 +1,105 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.urlresolvers import reverse
+from django.utils.deprecation import MiddlewareMixin
+from oslo_log import log as logging
+
+from openstack_dashboard import policy
+
+from apmec_horizon.openstack_dashboard.api import trace
+from apmec_horizon.openstack_dashboard import profiling
+
+LOG = logging.getLogger(__name__)
+
+
+class ApiTraceMiddleware(MiddlewareMixin):
+    """Trace the apmec API calls made while serving each request.
+
+    The calls are summed up in a Server-Timing header, which browser
+    developer tools show next to the request. Identical calls made more
+    than once in a request are flagged and logged. With
+    APMEC_TRACE_PANEL set, the latest traces of each session are also
+    kept for the JSON debug panel at mec/traces.
+    """
+
+    def process_request(self, request):
+        setattr(request, trace.ATTRIBUTE, trace.Trace(request.path))
+
+    def process_response(self, request, response):
+        request_trace = getattr(request, trace.ATTRIBUTE, None)
+        if request_trace is None or not request_trace.calls:
+            return response
+        response['Server-Timing'] = request_trace.server_timing()
+        repeated = request_trace.repeated_calls()
+        if repeated:
+            LOG.warning("%(path)s repeated apmec calls: %(calls)s",
+                        {'path': request_trace.path,
+                         'calls': ', '.join('%s x%d' % item for item
+                                            in sorted(repeated.items()))})
+        if getattr(settings, 'APMEC_TRACE_PANEL', False):
+            trace.save(request, request_trace)
+        return response
+
+
+class ProfilerMiddleware(MiddlewareMixin):
+    """Profile single requests of the MEC panels on demand.
+
+    An admin asks for a profile with the apmec_profile query parameter
+    or the X-Apmec-Profile header, set to "cpu", "memory" or "all". The
+    view and the rendering of its response then run under cProfile
+    and/or tracemalloc. The response links to the summary in its
+    X-Apmec-Profile header.
+
+    The middleware removes itself unless APMEC_PROFILING_ENABLED is
+    set, so that it costs nothing when unused.
+    """
+
+    param = 'apmec_profile'
+    header = 'HTTP_X_APMEC_PROFILE'
+
+    def __init__(self, get_response=None):
+        if not getattr(settings, 'APMEC_PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed()
+        super(ProfilerMiddleware, self).__init__(get_response)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        value = request.GET.get(self.param) or request.META.get(self.header)
+        if not value:
+            return None
+        # Only the panel views, which are namespaced horizon:mec:<panel>.
+        namespaces = getattr(request.resolver_match, 'namespaces', [])
+        if namespaces[:2] != ['horizon', 'mec'] or len(namespaces) < 3:
+            return None
+        if not policy.check((("identity", "admin_required"),), request):
+            LOG.warning("Profile of %s refused: not an admin",
+                        request.path)
+            return None
+        request.apmec_profile = profiling.Profile(
+            profiling.parse_kinds(value))
+        request.apmec_profile.start()
+        return None
+
+    def process_response(self, request, response):
+        profile = getattr(request, 'apmec_profile', None)
+        if profile is None:
+            return response
+        filenames = profile.stop('%s %s' % (request.method,
+                                            request.get_full_path()))
+        url = reverse('horizon:mec:profile', args=[filenames[0]])
+        response['X-Apmec-Profile'] = url
+        LOG.info("Profile of %(path)s saved: %(files)s",
+                 {'path': request.path, 'files': ', '.join(filenames)})
+        return response
@@ -0,0 +1,142 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+
+"""Profiling of single dashboard requests under cProfile and tracemalloc.
+
+A Profile is started before the view is called and stopped once the
+response is rendered. Its results are saved in the profile directory: a
+pstats file, a tracemalloc snapshot and a text summary of the top
+entries of each.
+"""
+
+import cProfile
+import errno
+import os
+import pstats
+import re
+import tempfile
+import threading
+import time
+import uuid
+
+from django.conf import settings
+import six
+
+try:
+    import tracemalloc
+except ImportError:
+    # Python 2 has no tracemalloc, only CPU profiles are available there.
+    tracemalloc = None
+
+KINDS = ('cpu', 'memory')
+FILENAME_RE = re.compile(r'^[0-9]{14}-[0-9a-f]{8}\.(pstats|snapshot|txt)$')
+
+# tracemalloc traces the whole process, so one memory profile at a time.
+_memory_lock = threading.Lock()
+
+
+def parse_kinds(value):
+    """Return the profilers asked for by a switch value.
+
+    The value is a comma separated list of "cpu" and "memory", or "all";
+    any other value asks for a CPU profile.
+    """
+    names = set(value.lower().replace(' ', '').split(','))
+    kinds = [kind for kind in KINDS if kind in names or 'all' in names]
+    return kinds or ['cpu']
+
+
+def get_profile_dir():
+    path = getattr(settings, 'APMEC_PROFILE_DIR', None) or os.path.join(
+        tempfile.gettempdir(), 'apmec_horizon_profiles')
+    try:
+        os.makedirs(path)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+    return path
+
+
+def get_profile_path(filename):
+    """Return the path of a saved profile file, or None for a bad name."""
+    if not FILENAME_RE.match(filename):
+        return None
+    path = os.path.join(get_profile_dir(), filename)
+    return path if os.path.isfile(path) else None
+
+
+class Profile(object):
+    """Profile the calls made in the current thread, and allocations."""
+
+    def __init__(self, kinds):
+        self.kinds = kinds
+        self.name = '%s-%s' % (time.strftime('%Y%m%d%H%M%S'),
+                               uuid.uuid4().hex[:8])
+        self.profiler = None
+        self.memory = False
+        self.started = None
+
+    def start(self):
+        if ('memory' in self.kinds and tracemalloc is not None and
+                _memory_lock.acquire(False)):
+            if tracemalloc.is_tracing():
+                _memory_lock.release()
+            else:
+                tracemalloc.start(getattr(settings, 'APMEC_PROFILE_FRAMES',
+                                          10))
+                self.memory = True
+        if 'cpu' in self.kinds:
+            self.profiler = cProfile.Profile()
+        self.started = time.time()
+        if self.profiler:
+            self.profiler.enable()
+
+    def stop(self, description):
+        """Stop profiling and save the results, returning the file names.
+
+        The text summary comes first.
+        """
+        if self.profiler:
+            self.profiler.disable()
+        elapsed = time.time() - self.started
+        snapshot = None
+        if self.memory:
+            try:
+                snapshot = tracemalloc.take_snapshot()
+            finally:
+                tracemalloc.stop()
+                _memory_lock.release()
+
+        directory = get_profile_dir()
+        top = getattr(settings, 'APMEC_PROFILE_TOP', 25)
+        filenames = [self.name + '.txt']
+        summary = ['%s: %.3f s' % (description, elapsed)]
+        if self.profiler:
+            filenames.append(self.name + '.pstats')
+            self.profiler.dump_stats(os.path.join(directory, filenames[-1]))
+            stream = six.StringIO()
+            stats = pstats.Stats(self.profiler, stream=stream)
+            stats.sort_stats('cumulative').print_stats(top)
+            summary.append(stream.getvalue())
+        if snapshot is not None:
+            filenames.append(self.name + '.snapshot')
+            snapshot.dump(os.path.join(directory, filenames[-1]))
+            summary.append('Top %d allocations by line, all threads:' % top)
+            summary.extend('%s' % stat for stat
+                           in snapshot.statistics('lineno')[:top])
+        elif 'memory' in self.kinds:
+            summary.append('No memory profile: tracemalloc is unavailable '
+                           'or already tracing.')
+        with open(os.path.join(directory, filenames[0]), 'w') as f:
+            f.write('\n'.join(summary) + '\n')
+        return filenames
@@ -0,0 +1,323 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import os
+import shutil
+import tempfile
+import threading
+
+from django.core.cache import cache
+from django import http
+from django.core.exceptions import MiddlewareNotUsed
+from django.test.utils import override_settings
+import mock
+
+from openstack_dashboard.test import helpers as test
+
+from apmec_horizon.openstack_dashboard.api import apmec
+from apmec_horizon.openstack_dashboard.api import metrics
+from apmec_horizon.openstack_dashboard.api import trace
+from apmec_horizon.openstack_dashboard import middleware
+from apmec_horizon.openstack_dashboard import profiling
+
+
+class ClientPoolTests(test.TestCase):
+    def test_get_returns_cached_client(self):
+        pool = apmec.ClientPool(max_size=2, max_ttl=60)
+        client = object()
+        pool.put('key', client, 30)
+        self.assertIs(client, pool.get('key'))
+
+    def test_least_recently_used_is_evicted(self):
+        pool = apmec.ClientPool(max_size=2, max_ttl=60)
+        pool.put('a', 'client-a', 30)
+        pool.put('b', 'client-b', 30)
+        pool.get('a')
+        pool.put('c', 'client-c', 30)
+        self.assertIsNone(pool.get('b'))
+        self.assertEqual('client-a', pool.get('a'))
+        self.assertEqual('client-c', pool.get('c'))
+
+    def test_expired_token_is_not_pooled(self):
+        pool = apmec.ClientPool(max_size=2, max_ttl=60)
+        pool.put('key', object(), -1)
+        self.assertIsNone(pool.get('key'))
+
+
+@override_settings(APMEC_LIST_CACHE_TTL={'meas': 30})
+class ListCacheTests(test.TestCase):
+    def setUp(self):
+        super(ListCacheTests, self).setUp()
+        cache.clear()
+        self.client_mock = mock.Mock()
+        self.client_mock.list_meas.return_value = {'meas': [{'id': 'a'}]}
+        patcher = mock.patch.object(apmec, 'apmecclient',
+                                    return_value=self.client_mock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_list_is_cached_per_params(self):
+        apmec.mea_list(self.request)
+        apmec.mea_list(self.request)
+        apmec.mea_list(self.request, status='ERROR')
+        self.assertEqual(2, self.client_mock.list_meas.call_count)
+
+    def test_write_invalidates_list(self):
+        apmec.mea_list(self.request)
+        apmec.delete_mea(self.request, 'a')
+        apmec.mea_list(self.request)
+        self.assertEqual(2, self.client_mock.list_meas.call_count)
+
+    @override_settings(APMEC_LIST_CACHE_TTL={})
+    def test_uncached_resource(self):
+        apmec.mea_list(self.request)
+        apmec.mea_list(self.request)
+        self.assertEqual(2, self.client_mock.list_meas.call_count)
+
+
+class SingleFlightTests(test.TestCase):
+    def test_concurrent_calls_are_coalesced(self):
+        flights = apmec.SingleFlight()
+        release = threading.Event()
+        calls = []
+        results = []
+
+        def upstream():
+            calls.append(1)
+            release.wait()
+            return {'meas': []}
+
+        def caller():
+            results.append(flights.do('mea_list', 'key', upstream))
+
+        leader = threading.Thread(target=caller)
+        leader.start()
+        while not flights._flights:
+            pass
+        follower = threading.Thread(target=caller)
+        follower.start()
+        while not flights._flights['key'].waiters:
+            pass
+        release.set()
+        leader.join()
+        follower.join()
+
+        self.assertEqual(1, len(calls))
+        self.assertEqual([{'meas': []}, {'meas': []}], results)
+        self.assertIsNot(results[0], results[1])
+        self.assertEqual(1, flights.stats['mea_list']['coalesced'])
+
+    def test_error_is_not_cached(self):
+        flights = apmec.SingleFlight()
+
+        def upstream():
+            raise ValueError()
+
+        self.assertRaises(ValueError, flights.do, 'mea_list', 'key', upstream)
+        self.assertEqual('ok', flights.do('mea_list', 'key', lambda: 'ok'))
+
+
+class MetricsTests(test.TestCase):
+    def setUp(self):
+        super(MetricsTests, self).setUp()
+        self.client_mock = mock.Mock()
+        for target, name, value in (
+                (apmec, 'apmecclient', self.client_mock),
+                (apmec, '_endpoint', 'http://apmec:9896')):
+            patcher = mock.patch.object(target, name, return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        metrics.registry.clear()
+        self.addCleanup(metrics.registry.clear)
+
+    def test_call_duration_and_items(self):
+        self.client_mock.show_vim.return_value = {'vim': {}}
+        apmec.get_vim(self.request, 'vim-id')
+        output = metrics.registry.render()
+        self.assertIn('# TYPE apmec_api_call_duration_seconds histogram',
+                      output)
+        self.assertIn('apmec_api_call_duration_seconds_count{'
+                      'endpoint="http://apmec:9896",function="get_vim"} 1',
+                      output)
+        self.assertIn('apmec_api_call_duration_seconds_bucket{'
+                      'endpoint="http://apmec:9896",function="get_vim",'
+                      'le="+Inf"} 1', output)
+        self.assertNotIn('apmec_api_call_items_count', output)
+
+    def test_errors_are_counted(self):
+        self.client_mock.show_vim.side_effect = ValueError()
+        self.assertRaises(ValueError, apmec.get_vim, self.request, 'vim-id')
+        self.assertIn('apmec_api_call_errors_total{'
+                      'endpoint="http://apmec:9896",error="ValueError",'
+                      'function="get_vim"} 1', metrics.registry.render())
+
+    def test_each_page_is_recorded(self):
+        self.client_mock.list_meas.return_value = iter(
+            [{'meas': [{'id': 'a'}, {'id': 'b'}]}, {'meas': [{'id': 'c'}]}])
+        self.assertEqual(2, len(list(apmec.list_pages(self.request,
+                                                      'meas'))))
+        output = metrics.registry.render()
+        self.assertIn('apmec_api_call_duration_seconds_count{'
+                      'endpoint="http://apmec:9896",function="list_pages"} 2',
+                      output)
+        self.assertIn('apmec_api_call_items_sum{'
+                      'endpoint="http://apmec:9896",function="list_pages"} 3',
+                      output)
+
+
+class TraceTests(test.TestCase):
+    def setUp(self):
+        super(TraceTests, self).setUp()
+        self.client_mock = mock.Mock()
+        self.client_mock.show_vim.return_value = {'vim': {}}
+        patcher = mock.patch.object(apmec, 'apmecclient',
+                                    return_value=self.client_mock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.middleware = middleware.ApiTraceMiddleware(
+            lambda request: http.HttpResponse())
+        self.middleware.process_request(self.request)
+
+    def test_repeated_calls_are_flagged(self):
+        apmec.get_vim(self.request, 'vim-1')
+        apmec.get_vim(self.request, 'vim-2')
+        apmec.get_vim(self.request, 'vim-1')
+        request_trace = getattr(self.request, trace.ATTRIBUTE)
+        self.assertEqual([False, False, True],
+                         [call['repeated'] for call in request_trace.calls])
+        self.assertEqual({"get_vim('vim-1')": 2},
+                         request_trace.repeated_calls())
+
+    def test_bodies_are_not_recorded(self):
+        self.client_mock.create_vim.return_value = {'vim': {}}
+        vim_arg = {'vim': {'auth_cred': {'password': 'secret'}}}
+        apmec.create_vim(self.request, vim_arg)
+        apmec.create_vim(self.request, vim_arg)
+        request_trace = getattr(self.request, trace.ATTRIBUTE)
+        self.assertEqual({'create_vim(...)': 2},
+                         request_trace.repeated_calls())
+        self.assertNotIn('secret', repr(request_trace.as_dict()))
+
+    def test_server_timing_header(self):
+        apmec.get_vim(self.request, 'vim-1')
+        apmec.get_vim(self.request, 'vim-1')
+        response = self.middleware.process_response(self.request,
+                                                    http.HttpResponse())
+        self.assertIn('desc="2 calls, 1 repeated"', response['Server-Timing'])
+        self.assertIn('apmec-get_vim;dur=', response['Server-Timing'])
+
+    def test_no_header_without_calls(self):
+        response = self.middleware.process_response(self.request,
+                                                    http.HttpResponse())
+        self.assertFalse(response.has_header('Server-Timing'))
+
+
+class ProfilerTests(test.TestCase):
+    def setUp(self):
+        super(ProfilerTests, self).setUp()
+        self.profile_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.profile_dir)
+
+    def test_disabled_middleware_is_not_used(self):
+        self.assertRaises(MiddlewareNotUsed, middleware.ProfilerMiddleware,
+                          lambda request: http.HttpResponse())
+
+    def test_parse_kinds(self):
+        self.assertEqual(['memory'], profiling.parse_kinds('memory'))
+        self.assertEqual(['cpu', 'memory'], profiling.parse_kinds('all'))
+        self.assertEqual(['cpu'], profiling.parse_kinds('1'))
+
+    def test_cpu_profile_is_saved(self):
+        with self.settings(APMEC_PROFILE_DIR=self.profile_dir):
+            profile = profiling.Profile(['cpu'])
+            profile.start()
+            sorted(range(1000))
+            filenames = profile.stop('GET /mec/meamanager/')
+            self.assertEqual(['.txt', '.pstats'],
+                             [os.path.splitext(name)[1]
+                              for name in filenames])
+            with open(profiling.get_profile_path(filenames[0])) as f:
+                self.assertIn('GET /mec/meamanager/', f.read())
+            self.assertIsNone(profiling.get_profile_path('../secret.txt'))
+
+
+class PaginationTests(test.TestCase):
+    def setUp(self):
+        super(PaginationTests, self).setUp()
+        patcher = mock.patch.object(apmec.utils, 'get_page_size',
+                                    return_value=2)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _list(self, meas, marker=None):
+        list_func = mock.Mock(return_value=iter([{'meas': meas}]))
+        result = apmec._list_resources(self.request, list_func, 'meas',
+                                       marker=marker, paginate=True)
+        return result, list_func
+
+    def test_page_with_more_data(self):
+        (meas, has_more), list_func = self._list(
+            [{'id': 'a'}, {'id': 'b'}, {'id': 'c'}], marker='m')
+        self.assertEqual([{'id': 'a'}, {'id': 'b'}], meas)
+        self.assertTrue(has_more)
+        list_func.assert_called_once_with(retrieve_all=False, limit=3,
+                                          marker='m')
+
+    def test_last_page(self):
+        (meas, has_more), _ = self._list([{'id': 'a'}])
+        self.assertEqual([{'id': 'a'}], meas)
+        self.assertFalse(has_more)
+
+    def test_marker_ignored_by_server(self):
+        (meas, has_more), _ = self._list(
+            [{'id': 'a'}, {'id': 'b'}, {'id': 'c'}, {'id': 'd'}],
+            marker='b')
+        self.assertEqual([{'id': 'c'}, {'id': 'd'}], meas)
+        self.assertFalse(has_more)
+
+
+class EventsListTests(test.TestCase):
+    def setUp(self):
+        super(EventsListTests, self).setUp()
+        # A server without sorting or pagination lists every event.
+        self.events = [{'id': event_id} for event_id in range(1, 6)]
+        self.client_mock = mock.Mock()
+        self.client_mock.list_events.side_effect = \
+            lambda retrieve_all=True, **params: (
+                {'events': list(self.events)} if retrieve_all
+                else iter([{'events': list(self.events)}]))
+        for target, name, value in (
+                (apmec, 'apmecclient', self.client_mock),
+                (apmec.utils, 'get_page_size', 2)):
+            patcher = mock.patch.object(target, name, return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _ids(self, events):
+        return [event['id'] for event in events]
+
+    def test_pages_newest_first(self):
+        events, has_more = apmec.events_list(self.request, 'r',
+                                             paginate=True)
+        self.assertEqual([5, 4], self._ids(events))
+        self.assertTrue(has_more)
+        events, has_more = apmec.events_list(self.request, 'r', marker='2',
+                                             paginate=True)
+        self.assertEqual([1], self._ids(events))
+        self.assertFalse(has_more)
+
+    def test_since_lists_newer_events(self):
+        self.assertEqual([5, 4], self._ids(
+            apmec.events_list(self.request, 'r', since=3)))
+        self.client_mock.list_events.assert_called_with(
+            retrieve_all=False, resource_id='r', sort_key='id',
+            sort_dir='asc', marker=3, limit=3)